@@ -0,0 +1,103 @@
+import numpy as np
+
+"""
+Frame-to-frame Alert Engine
+---------------------------
+- Compares each frame's temperature / burning / online arrays with the previous
+  frame using whole-array operations and reports only transitions: risk level
+  changes, new ignitions, sensors lost and restored
+- Risk levels use the same bands as FireSimData._calculate_risk_level; a level
+  rises as soon as its threshold is reached but only falls once the temperature
+  is `hysteresis` degrees below it, so a reading hovering on a threshold does
+  not flap
+- De-duplication: the same event (sensor, kind, target level) is not repeated
+  within `dedup_window` (in the caller's clock units: seconds or steps)
+- Risk changes are only reported when either side is at least `min_level`
+- Python only touches the few sensors that actually produce an event
+"""
+
+RISK_LEVELS = ("LOW", "MODERATE", "HIGH", "CRITICAL", "EXTREME")
+RISK_THRESHOLDS = (30.0, 60.0, 100.0, 300.0)  # C where MODERATE, HIGH, CRITICAL, EXTREME start
+HYSTERESIS_C = 5.0
+DEDUP_WINDOW = 10.0
+
+
+def risk_levels(temperature, thresholds=RISK_THRESHOLDS):
+    """Risk level index (0 = LOW ... 4 = EXTREME) of every temperature"""
+    return np.searchsorted(np.asarray(thresholds), np.asarray(temperature, dtype=np.float64), side='right')
+
+
+class AlertEngine:
+    """Transition events of a fixed set of sensors, one frame at a time"""
+
+    def __init__(self, sensor_ids, lat, lon, hysteresis=HYSTERESIS_C, dedup_window=DEDUP_WINDOW, min_level=0):
+        self.sensor_ids = list(sensor_ids)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.thresholds = np.asarray(RISK_THRESHOLDS)
+        self.hysteresis = hysteresis
+        self.dedup_window = dedup_window
+        self.min_level = min_level
+        count = len(self.sensor_ids)
+        # Baseline before the first frame: calm, not burning, online
+        self.level = np.zeros(count, dtype=np.int64)
+        self.burning = np.zeros(count, dtype=bool)
+        self.online = np.ones(count, dtype=bool)
+        # Last time each event was sent, per sensor (risk changes: per target level too)
+        self.risk_sent = np.full((len(RISK_LEVELS), count), -np.inf)
+        self.ignition_sent = np.full(count, -np.inf)
+        self.lost_sent = np.full(count, -np.inf)
+        self.restored_sent = np.full(count, -np.inf)
+        self.suppressed = 0  # Events held back by the de-duplication window
+
+    def _due(self, sent, rows, now):
+        """Subset of rows whose last identical event is outside the window; marks them sent"""
+        due = rows[now - sent[rows] >= self.dedup_window]
+        self.suppressed += len(rows) - len(due)
+        sent[due] = now
+        return due
+
+    def _event(self, kind, row, temperature, **fields):
+        return {
+            'kind': kind,
+            'sensor_id': self.sensor_ids[row],
+            'lat': float(self.lat[row]),
+            'lon': float(self.lon[row]),
+            'temperature': round(float(temperature[row]), 1),
+            **fields,
+        }
+
+    def update(self, now, temperature, burning=None, online=None):
+        """Take the next frame (arrays in sensor order); returns its transition events"""
+        temperature = np.asarray(temperature, dtype=np.float64).ravel()
+        rising = np.searchsorted(self.thresholds, temperature, side='right')
+        falling = np.searchsorted(self.thresholds - self.hysteresis, temperature, side='right')
+        level = np.where(rising > self.level, rising, np.where(falling < self.level, falling, self.level))
+        events = []
+
+        changed = np.flatnonzero((level != self.level) & (np.maximum(level, self.level) >= self.min_level))
+        if len(changed):
+            # Escalations first, the most severe first
+            changed = changed[np.lexsort((self.level[changed] - level[changed], -level[changed]))]
+            due = changed[now - self.risk_sent[level[changed], changed] >= self.dedup_window]
+            self.suppressed += len(changed) - len(due)
+            self.risk_sent[level[due], due] = now
+            events += [self._event('risk_change', row, temperature,
+                                   **{'from': RISK_LEVELS[self.level[row]], 'to': RISK_LEVELS[level[row]]})
+                       for row in due]
+        self.level = level
+
+        if burning is not None:
+            burning = np.asarray(burning, dtype=bool).ravel()
+            ignited = self._due(self.ignition_sent, np.flatnonzero(burning & ~self.burning), now)
+            events += [self._event('ignition', row, temperature) for row in ignited]
+            self.burning = burning
+
+        if online is not None:
+            online = np.asarray(online, dtype=bool).ravel()
+            lost = self._due(self.lost_sent, np.flatnonzero(self.online & ~online), now)
+            restored = self._due(self.restored_sent, np.flatnonzero(online & ~self.online), now)
+            events += [self._event('sensor_lost', row, temperature) for row in lost]
+            events += [self._event('sensor_restored', row, temperature) for row in restored]
+            self.online = online
+        return events
@@ -0,0 +1,141 @@
+import glob
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+
+"""
+Simulation Checkpoints
+----------------------
+- A checkpoint directory holds one meta.npz (static terrain, update stream, sensors)
+  plus one segment_XXXXXX.npz per checkpoint
+- Each segment stores only the steps produced since the previous checkpoint
+  (zlib-compressed; integer fields in narrow dtypes, floats at full precision so a
+  resumed run replays bit-identical steps) and the live loop state needed to continue:
+  grid, burn timer, wind, wind base, update_stream position, RNG state, metrics
+- Files are written on a background thread and renamed into place atomically,
+  so a crash mid-write never leaves a half-written checkpoint behind
+"""
+
+META_FILE = "meta.npz"
+SEGMENT_PATTERN = "segment_*.npz"
+
+
+class CheckpointWriter:
+    """Writes checkpoint files on a single background thread"""
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.error = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._worker, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, filename, arrays):
+        """Queue arrays to be saved as <directory>/<filename>"""
+        self._queue.put((filename, arrays))
+
+    def flush(self):
+        """Block until every queued checkpoint is on disk
+
+        Raises the first unreported write error, so callers learn that a
+        checkpoint they queued never made it to disk.
+        """
+        self._queue.join()
+        self.raise_error()
+
+    def raise_error(self):
+        """Raise (and clear) the first write error since the last one was reported"""
+        error, self.error = self.error, None
+        if error is not None:
+            raise error
+
+    def _worker(self):
+        while True:
+            filename, arrays = self._queue.get()
+            path = os.path.join(self.directory, filename)
+            tmp_path = path + ".tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    np.savez_compressed(f, **arrays)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                if self.error is None:
+                    self.error = e
+                print(f"❌ Checkpoint write failed for {path}: {e}")
+            finally:
+                self._queue.task_done()
+
+
+def segment_filename(end_step):
+    return f"segment_{end_step:06d}.npz"
+
+
+def pack_rng_state():
+    """Capture NumPy's global RNG so a resumed run draws the same numbers"""
+    name, keys, pos, has_gauss, cached_gaussian = np.random.get_state()
+    return {
+        "rng_keys": keys.copy(),
+        "rng_pos": np.array(pos),
+        "rng_has_gauss": np.array(has_gauss),
+        "rng_cached_gaussian": np.array(cached_gaussian),
+    }
+
+
+def unpack_rng_state(data):
+    np.random.set_state((
+        "MT19937",
+        data["rng_keys"],
+        int(data["rng_pos"]),
+        int(data["rng_has_gauss"]),
+        float(data["rng_cached_gaussian"]),
+    ))
+
+
+def pack_json(obj):
+    return np.frombuffer(json.dumps(obj).encode("utf-8"), dtype=np.uint8)
+
+
+def unpack_json(array):
+    return json.loads(array.tobytes().decode("utf-8"))
+
+
+def has_checkpoint(directory):
+    return os.path.exists(os.path.join(directory, META_FILE)) and bool(
+        glob.glob(os.path.join(directory, SEGMENT_PATTERN)))
+
+
+def load_checkpoint(directory):
+    """Load meta plus every segment, concatenating the per-step history
+
+    Returns (meta, head, history) where head is the loop state stored in the
+    latest segment and history holds the stacked per-step arrays.
+    """
+    with np.load(os.path.join(directory, META_FILE)) as f:
+        meta = {key: f[key] for key in f.files}
+
+    paths = sorted(glob.glob(os.path.join(directory, SEGMENT_PATTERN)))
+    if not paths:
+        raise FileNotFoundError(f"No checkpoint segments in {directory}")
+
+    history = {"grids": [], "burn_timers": [], "wind_fields": [], "temperatures": [], "spread_history": []}
+    head = None
+    expected_start = 0
+    for path in paths:
+        with np.load(path) as f:
+            start, end = int(f["start_step"]), int(f["end_step"])
+            if start != expected_start:
+                raise ValueError(f"Checkpoint segment {path} starts at step {start}, expected {expected_start}")
+            expected_start = end
+            for key in ("grids", "burn_timers", "wind_fields", "temperatures"):
+                history[key].append(f[key])
+            history["spread_history"].extend(unpack_json(f["spread_history"]))
+            head = {key: f[key] for key in f.files if key.startswith("head_") or key.startswith("rng_")}
+            head["end_step"] = end
+
+    for key in ("grids", "burn_timers", "wind_fields", "temperatures"):
+        history[key] = np.concatenate(history[key])
+    return meta, head, history
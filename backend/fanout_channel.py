@@ -0,0 +1,52 @@
+import json
+import struct
+
+import numpy as np
+
+"""
+Fan-out Channel
+---------------
+- Length-prefixed messages between the simulation process and the fan-out
+  worker processes, over a local (Unix domain) socket
+- A message is a JSON header plus any number of binary blobs, so a frame the
+  simulation process encoded once reaches every worker byte for byte, without
+  being decoded or re-serialized
+- Layout: u32 header length, u32 blob count, UTF-8 JSON header, then
+  (u32 length, bytes) per blob
+- NumPy arrays travel as raw blobs; the header lists their names and dtypes
+"""
+
+PREFIX = struct.Struct("<II")
+LENGTH = struct.Struct("<I")
+
+
+def write_message(writer, header, blobs=()):
+    """Queue one message on an asyncio StreamWriter"""
+    payload = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    parts = [PREFIX.pack(len(payload), len(blobs)), payload]
+    for blob in blobs:
+        parts.append(LENGTH.pack(len(blob)))
+        parts.append(blob)
+    writer.writelines(parts)
+
+
+async def read_message(reader):
+    """(header, blobs) of the next message; raises asyncio.IncompleteReadError at EOF"""
+    header_length, blob_count = PREFIX.unpack(await reader.readexactly(PREFIX.size))
+    header = json.loads(await reader.readexactly(header_length))
+    blobs = []
+    for _ in range(blob_count):
+        length, = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+        blobs.append(await reader.readexactly(length))
+    return header, blobs
+
+
+def pack_arrays(arrays):
+    """(specs, blobs) for a dict of NumPy arrays; specs go in the header"""
+    specs = [[name, array.dtype.str] for name, array in arrays.items()]
+    return specs, [np.ascontiguousarray(array).tobytes() for array in arrays.values()]
+
+
+def unpack_arrays(specs, blobs):
+    """Arrays from pack_arrays(), read from the leading blobs"""
+    return {name: np.frombuffer(blob, dtype=dtype) for (name, dtype), blob in zip(specs, blobs)}
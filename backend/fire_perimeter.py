@@ -0,0 +1,192 @@
+import numpy as np
+
+"""
+Fire Perimeter Extraction
+-------------------------
+- Marching squares over a boolean cell mask (BURNING, or BURNING | ASH) of a
+  FireSimData grid; contours run through the midpoints of the edges between
+  cell centres, so a lone cell becomes a small diamond
+- Segments are oriented with the masked cells on their left: exterior rings
+  come out counter-clockwise and holes clockwise, as GeoJSON (RFC 7946) wants.
+  Diagonally touching cells belong to the same polygon
+- Incremental: a ring that does not pass through a square next to a changed
+  cell is kept as is, simplified coordinates included; only the rings broken by
+  the change and the changed squares themselves are re-traced
+- Rings are simplified with Douglas-Peucker (tolerance in cells), rings smaller
+  than min_area cells are dropped, and the rest is emitted as a GeoJSON
+  MultiPolygon with rounded lon/lat
+"""
+
+COORD_DECIMALS = 6  # ~0.1 m
+
+
+def _segment_table():
+    """case -> [((dx, dy), (dx, dy))] directed segments between edge midpoints, in doubled units"""
+    # Square corners counter-clockwise from the south-west one, and the midpoint of
+    # the edge that leaves each corner (S, E, N, W)
+    midpoints = ((1, 0), (2, 1), (1, 2), (0, 1))
+    table = []
+    for case in range(16):
+        corners = [(case >> bit) & 1 for bit in range(4)]
+        exits = [k for k in range(4) if corners[k] and not corners[(k + 1) % 4]]
+        enters = [k for k in range(4) if not corners[k] and corners[(k + 1) % 4]]
+        segments = []
+        for k in exits:
+            # Join each exit with the next entry counter-clockwise: masked cells stay
+            # on the left, and the two masked corners of a saddle stay connected
+            entry = next((k + step) % 4 for step in range(1, 4) if (k + step) % 4 in enters)
+            segments.append((midpoints[k], midpoints[entry]))
+        table.append(segments)
+    return table
+
+
+SEGMENTS = _segment_table()
+
+
+def simplify_ring(xy, tolerance):
+    """Douglas-Peucker on a closed ring (first point not repeated); keeps at least 3 points"""
+    n = len(xy)
+    if n <= 4 or tolerance <= 0:
+        return xy
+    # Anchor at point 0 and the point farthest from it; index n closes the ring
+    far = int(np.argmax(((xy - xy[0]) ** 2).sum(axis=1)))
+    closed = np.vstack([xy, xy[:1]])
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[far] = True
+    stack = [(0, far), (far, n)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, direction = closed[first], closed[last] - closed[first]
+        offsets = closed[first + 1:last] - start
+        length = np.hypot(*direction)
+        if length == 0:
+            distance = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distance = np.abs(direction[0] * offsets[:, 1] - direction[1] * offsets[:, 0]) / length
+        k = int(np.argmax(distance))
+        if distance[k] > tolerance:
+            index = first + 1 + k
+            keep[index] = True
+            stack += [(first, index), (index, last)]
+    return xy[keep] if keep.sum() >= 3 else xy
+
+
+class Ring:
+    """One closed contour, as edge-midpoint lattice points (doubled, padded grid units)"""
+
+    def __init__(self, points, columns):
+        self.points = points
+        xy = np.array(points, dtype=np.int64)
+        following = np.roll(xy, -1, axis=0)
+        # Each segment lies inside one square; the rounded-down mean of its ends finds it
+        self.squares = ((xy[:, 1] + following[:, 1]) // 4) * columns + (xy[:, 0] + following[:, 0]) // 4
+        # Shoelace area in cells: positive for exteriors, negative for holes
+        self.area = float((xy[:, 0] * following[:, 1] - following[:, 0] * xy[:, 1]).sum()) / 8
+        self.xy = xy
+        self.following = following
+        self.coordinates = None  # Simplified, closed [[lon, lat], ...], filled on first use
+        self.owner = None  # Holes: the exterior ring around them
+
+    def contains(self, x, y):
+        """Even-odd test of a lattice point against this ring"""
+        xs, ys = self.xy[:, 0], self.xy[:, 1]
+        next_xs, next_ys = self.following[:, 0], self.following[:, 1]
+        crosses = (ys > y) != (next_ys > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            at = xs + (y - ys) * (next_xs - xs) / (next_ys - ys)
+        return bool(np.count_nonzero(crosses & (x < at)) % 2)
+
+
+class FirePerimeter:
+    """Perimeter rings of one mask as it changes from step to step"""
+
+    def __init__(self, shape, geo, tolerance=0.5, min_area=0.0):
+        height, width = shape
+        self.geo = geo  # (origin_lat, origin_lon, cell_lat, cell_lon) of cell (0, 0)'s centre
+        self.tolerance = tolerance  # Douglas-Peucker tolerance, in cells
+        self.min_area = min_area  # Rings enclosing less (in cells) are left out of the output
+        self.mask = np.zeros((height + 2, width + 2), dtype=bool)  # Zero border closes every ring
+        self.columns = width + 1  # Squares per row
+        self.rings = []
+        self.retraced = 0  # Rings traced by the last update
+
+    def update(self, mask):
+        """Follow the mask to its new state; returns False when nothing changed"""
+        padded = np.zeros_like(self.mask)
+        padded[1:-1, 1:-1] = mask
+        changed = padded != self.mask
+        if not changed.any():
+            self.retraced = 0
+            return False
+        self.mask = padded
+        # Squares with a changed corner cell
+        dirty = (changed[:-1, :-1] | changed[:-1, 1:] | changed[1:, :-1] | changed[1:, 1:]).ravel()
+
+        kept = []
+        next_point = {}
+        for ring in self.rings:
+            stale = dirty[ring.squares]
+            if not stale.any():
+                kept.append(ring)
+                continue
+            # Untouched stretches of a broken ring are reused, not recomputed
+            count = len(ring.points)
+            for index in np.flatnonzero(~stale):
+                next_point[ring.points[index]] = ring.points[(index + 1) % count]
+
+        m = padded.view(np.uint8)
+        cases = (m[:-1, :-1] | m[:-1, 1:] << 1 | m[1:, 1:] << 2 | m[1:, :-1] << 3).ravel()
+        for square in np.flatnonzero(dirty & (cases != 0) & (cases != 15)):
+            row, col = divmod(int(square), self.columns)
+            x, y = 2 * col, 2 * row
+            for (x0, y0), (x1, y1) in SEGMENTS[cases[square]]:
+                next_point[(x + x0, y + y0)] = (x + x1, y + y1)
+
+        traced = []
+        while next_point:
+            start, point = next_point.popitem()
+            points = [start]
+            while point != start:
+                points.append(point)
+                point = next_point.pop(point)
+            traced.append(Ring(points, self.columns))
+        self.rings = kept + traced
+        self.retraced = len(traced)
+        return True
+
+    def ring_coordinates(self, ring):
+        if ring.coordinates is None:
+            origin_lat, origin_lon, cell_lat, cell_lon = self.geo
+            # Lattice points are doubled and offset by the one-cell border
+            xy = simplify_ring(ring.xy / 2.0 - 1.0, self.tolerance)
+            lon = np.round(origin_lon + xy[:, 0] * cell_lon, COORD_DECIMALS)
+            lat = np.round(origin_lat + xy[:, 1] * cell_lat, COORD_DECIMALS)
+            coordinates = np.column_stack([lon, lat]).tolist()
+            ring.coordinates = coordinates + coordinates[:1]
+        return ring.coordinates
+
+    def polygons(self):
+        """[[exterior, hole, ...], ...] with each hole under the smallest exterior around it"""
+        exteriors = sorted((ring for ring in self.rings if ring.area > 0), key=lambda ring: ring.area)
+        polygons = {ring: [ring] for ring in exteriors}
+        for hole in (ring for ring in self.rings if ring.area < 0 and -ring.area >= self.min_area):
+            # A hole keeps its exterior for as long as both rings survive unchanged
+            if hole.owner not in polygons:
+                x, y = hole.points[0]
+                hole.owner = next((ring for ring in exteriors if ring.contains(x, y)), None)
+            if hole.owner is not None:
+                polygons[hole.owner].append(hole)
+        return [polygons[ring] for ring in exteriors if ring.area >= self.min_area]
+
+    def feature(self, properties):
+        """GeoJSON Feature with a MultiPolygon of the current rings"""
+        return {
+            'type': 'Feature',
+            'properties': properties,
+            'geometry': {
+                'type': 'MultiPolygon',
+                'coordinates': [[self.ring_coordinates(ring) for ring in polygon] for polygon in self.polygons()],
+            },
+        }
@@ -0,0 +1,145 @@
+import math
+
+import numpy as np
+
+"""
+Fire Influence Raster
+---------------------
+- Coarse lat/lon grid over the sensor network; every fire is folded into it once,
+  when it starts, instead of being checked against the sensors on every tick
+- All fires grow at the same rate, so the moment a fire's detection disk (radius r)
+  or heat ring (radius 2r) reaches a cell is fixed when the fire starts. Each cell
+  keeps the fire that reaches it first for each band: overlapping fires merge into
+  one footprint and the union of their disks is preserved
+- Fires started in a cell that already holds a fire merge into that fire
+  (earliest start, strongest intensity)
+- A tick samples each sensor's cell once, so its cost depends on the sensor
+  count, not on how many fires have been started
+- Sensors sit anywhere in their cell, and near the edge of a footprint another
+  fire can reach a sensor before the cell's owner does. A fire reaches any point
+  of a cell at most half a cell diagonal (of growth) apart from its centre, so
+  only sensors within that margin of the footprint edge are checked against
+  every fire; the detection and heat flags are those of the per-fire check
+"""
+
+
+class FireInfluenceRaster:
+    """Merged fire footprints on a uniform lat/lon grid"""
+
+    def __init__(self, min_lat, min_lon, max_lat, max_lon, cell_size, start_radius, growth_rate):
+        self.cell_size = cell_size
+        self.start_radius = start_radius  # Fire radius (degrees) at ignition
+        self.growth_rate = growth_rate  # Radius growth in degrees per second
+        self.origin_lat = min_lat
+        self.origin_lon = min_lon
+        self.rows = max(1, math.ceil((max_lat - min_lat) / cell_size))
+        self.cols = max(1, math.ceil((max_lon - min_lon) / cell_size))
+        self.center_lat = (min_lat + (np.arange(self.rows) + 0.5) * cell_size)[:, None]
+        self.center_lon = (min_lon + (np.arange(self.cols) + 0.5) * cell_size)[None, :]
+        self.clear()
+
+    def clear(self):
+        """Drop every fire"""
+        self.fire_lat = np.empty(0)
+        self.fire_lon = np.empty(0)
+        self.fire_start = np.empty(0)
+        self.fire_intensity = np.empty(0)
+        self.fire_cells = {}  # Ignition cell -> fire id
+        shape = (self.rows, self.cols)
+        self.detect_time = np.full(shape, np.inf)  # When the first detection disk reaches each cell
+        self.detect_owner = np.full(shape, -1, dtype=np.int32)  # Fire whose disk gets there first
+        self.heat_time = np.full(shape, np.inf)
+        self.heat_owner = np.full(shape, -1, dtype=np.int32)
+
+    def cell_of(self, lat, lon):
+        """Flat cell index for each (lat, lon), clamped onto the grid"""
+        i = np.clip(np.floor((lat - self.origin_lat) / self.cell_size).astype(np.int64), 0, self.rows - 1)
+        j = np.clip(np.floor((lon - self.origin_lon) / self.cell_size).astype(np.int64), 0, self.cols - 1)
+        return i * self.cols + j
+
+    def add_fire(self, lat, lon, intensity, start_time):
+        """Fold a fire into the footprints; returns (fire id, merged into an existing fire)"""
+        key = (math.floor((lat - self.origin_lat) / self.cell_size),
+               math.floor((lon - self.origin_lon) / self.cell_size))
+        fire_id = self.fire_cells.get(key)
+        if fire_id is not None:
+            # The earlier fire in this cell reaches everywhere first; keep the strongest intensity
+            self.fire_intensity[fire_id] = max(self.fire_intensity[fire_id], intensity)
+            return fire_id, True
+
+        fire_id = len(self.fire_lat)
+        self.fire_cells[key] = fire_id
+        self.fire_lat = np.append(self.fire_lat, lat)
+        self.fire_lon = np.append(self.fire_lon, lon)
+        self.fire_start = np.append(self.fire_start, start_time)
+        self.fire_intensity = np.append(self.fire_intensity, intensity)
+
+        distance = np.hypot(self.center_lat - lat, self.center_lon - lon)
+        detect_time = start_time + np.maximum(distance - self.start_radius, 0) / self.growth_rate
+        heat_time = start_time + np.maximum(distance / 2 - self.start_radius, 0) / self.growth_rate
+        first = detect_time < self.detect_time
+        self.detect_time[first] = detect_time[first]
+        self.detect_owner[first] = fire_id
+        first = heat_time < self.heat_time
+        self.heat_time[first] = heat_time[first]
+        self.heat_owner[first] = fire_id
+        return fire_id, False
+
+    EXACT_BATCH = 4096  # Edge sensors checked against every fire per pass
+
+    def _first_fire(self, lat, lon, scale):
+        """(fire, arrival time) of the fire whose disk (radius * scale) reaches each point first"""
+        best = np.empty(len(lat), dtype=np.int64)
+        arrival = np.empty(len(lat))
+        for start in range(0, len(lat), self.EXACT_BATCH):
+            part = slice(start, start + self.EXACT_BATCH)
+            distance = np.hypot(lat[part, None] - self.fire_lat, lon[part, None] - self.fire_lon)
+            times = self.fire_start + np.maximum(distance / scale - self.start_radius, 0) / self.growth_rate
+            best[part] = np.argmin(times, axis=1)
+            arrival[part] = times[np.arange(len(best[part])), best[part]]
+        return best, arrival
+
+    def _band(self, cells, lat, lon, now, owner_map, time_map, scale):
+        """(rows, fire, distance, radius) of the points inside some fire's disk (radius * scale)"""
+        owner = owner_map.flat[cells]
+        rows = np.flatnonzero(owner >= 0)
+        owner = owner[rows]
+        distance, radius = self._reach(owner, lat[rows], lon[rows], now)
+        inside = distance <= scale * radius
+        # Outside the owner's disk but within the cell margin of the footprint: another fire may reach it
+        margin = self.cell_size * math.sqrt(0.5) / (scale * self.growth_rate)
+        edge = np.flatnonzero(~inside & (time_map.flat[cells[rows]] - margin <= now))
+        if len(edge):
+            fire, arrival = self._first_fire(lat[rows[edge]], lon[rows[edge]], scale)
+            reached = arrival <= now
+            edge, fire = edge[reached], fire[reached]
+            owner[edge] = fire
+            distance[edge], radius[edge] = self._reach(fire, lat[rows[edge]], lon[rows[edge]], now)
+            inside[edge] = True
+        return rows[inside], owner[inside], distance[inside], radius[inside]
+
+    def _reach(self, owner, lat, lon, now):
+        """(distance, radius) from each point to its owning fire at time now"""
+        distance = np.hypot(lat - self.fire_lat[owner], lon - self.fire_lon[owner])
+        radius = self.start_radius + self.growth_rate * (now - self.fire_start[owner])
+        return distance, radius
+
+    def sample(self, cells, lat, lon, now):
+        """(intensity, heat factor) at each point, -1 where no fire reaches it
+
+        cells are the points' flat cell indices (see cell_of). Intensity is set
+        inside any detection disk, the heat factor inside any heat ring; both come
+        from the fire reaching the cell centre first, or for points at the edge of
+        the footprint from the fire reaching the point itself first.
+        """
+        intensity = np.full(len(cells), -1.0)
+        heat = np.full(len(cells), -1.0)
+        if not len(self.fire_lat):
+            return intensity, heat
+
+        rows, owner, _, _ = self._band(cells, lat, lon, now, self.detect_owner, self.detect_time, 1)
+        intensity[rows] = self.fire_intensity[owner]
+
+        rows, _, distance, radius = self._band(cells, lat, lon, now, self.heat_owner, self.heat_time, 2)
+        heat[rows] = 1 - distance / (2 * radius)
+        return intensity, heat
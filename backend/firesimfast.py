@@ -3,9 +3,10 @@ import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QHBoxLayout, QLabel
-from PyQt5.QtGui import QPainter, QColor, QFont
-from PyQt5.QtCore import QTimer
+from PyQt5.QtGui import QPainter, QColor, QFont, QImage
+from PyQt5.QtCore import QTimer, QThread, QRectF, QLineF
 import threading
+import time
 """
 Wildfire Cellular Automata Model
 --------------------------------
@@ -15,6 +16,12 @@ Wildfire Cellular Automata Model
 - Elevation is modeled as a diagonal valley.
 - Wind changes smoothly over time and space.
 - Visualization overlays fire state, elevation (blue), and wind vectors.
+- Grids are drawn as one image: states and temperatures are mapped through RGBA
+  lookup tables into a NumPy buffer that QImage wraps without copying, then
+  blitted scaled in a single drawImage call.
+- The simulation runs in a worker QThread and publishes each step into a
+  single-slot mailbox; the viewer redraws at a fixed rate from the newest frame
+  and skips stale ones, so a slow model or renderer never stalls the other.
 """
 
 # --- Model Parameters ---
@@ -29,6 +36,20 @@ VEG = 1      # Vegetation (can burn)
 BURNING = 2  # Burning
 ASH = 3      # Burned out
 
+# --- Display ---
+STATE_RGBA = np.array([
+    [139, 69, 19, 255],   # EMPTY: Brown
+    [34, 139, 34, 255],   # VEG: Forest green
+    [255, 69, 0, 255],    # BURNING: Orange red
+    [47, 79, 79, 255],    # ASH: Dark slate gray
+], dtype=np.uint8)
+GRID_LINE_MIN_CELL = 4    # px; smaller cells are drawn without borders
+LABEL_MIN_CELL = 12       # px; smaller cells are drawn without temperature labels
+WIND_ARROW_SPACING = 60   # px between drawn wind vectors
+STEP_INTERVAL_MS = 400    # Pause between simulation steps, unless running uncapped
+DISPLAY_INTERVAL_MS = 100 # Viewer refresh period
+PLOT_INTERVAL_MS = 2000   # Matplotlib figure refresh period (a redraw blocks the GUI for a few 100 ms)
+
 # --- Initialize Grid and Maps ---
 grid = np.full((size, size), VEG, dtype=int)      # All vegetation
 burn_timer = np.zeros((size, size), dtype=int)    # Burn timers
@@ -182,6 +203,30 @@ def calculate_temperature(grid, burn_timer, step):
     
     return temperature
 
+def lut_image(lut, index):
+    """
+    Map an index array through an RGBA lookup table of shape (n, 4) into an image.
+    Returns (buffer, image); the QImage wraps the buffer without copying, so keep both alive.
+    """
+    height, width = index.shape
+    buffer = np.take(lut.view(np.uint32).ravel(), index)
+    image = QImage(buffer.data, width, height, width * 4, QImage.Format_RGBA8888)
+    return buffer, image
+
+def fit_cell_size(cell_size, shape, width, height):
+    """Cell size in px (at most cell_size) that fits a grid of shape into width x height, at least 1 px for the grid"""
+    rows, cols = shape
+    return max(min(cell_size, width / cols, height / rows), 1 / max(rows, cols))
+
+def draw_cell_borders(qp, shape, cell, x0, y0):
+    """Grid lines between cells, in one drawLines call; skipped when cells are too small"""
+    if cell < GRID_LINE_MIN_CELL:
+        return
+    rows, cols = shape
+    lines = [QLineF(x0, y0 + i * cell, x0 + cols * cell, y0 + i * cell) for i in range(rows + 1)]
+    lines += [QLineF(x0 + j * cell, y0, x0 + j * cell, y0 + rows * cell) for j in range(cols + 1)]
+    qp.drawLines(lines)
+
 class TemperatureHeatmapWidget(QWidget):
     def __init__(self):
         super().__init__()
@@ -193,6 +238,11 @@ class TemperatureHeatmapWidget(QWidget):
         
         # Temperature color mapping
         self.temp_colors = self.generate_temperature_colors()
+        # Same colours as a lookup table indexed by temperature / 10 (rounded, clamped to 20-900°C)
+        self.temp_rgba = np.array([self.temp_colors[min(max(10 * k, 20), 900)].getRgb() for k in range(91)],
+                                  dtype=np.uint8)
+        self.legend_buffer, self.legend_image = lut_image(self.temp_rgba, np.arange(90, 1, -1).reshape(-1, 1))
+        self.image_source = None  # Temperature array the cached image was mapped from
         
     def generate_temperature_colors(self):
         """Generate color mapping for temperatures"""
@@ -249,33 +299,41 @@ class TemperatureHeatmapWidget(QWidget):
         self.step = step
         self.update()
     
+    def temperature_image(self):
+        """Temperature grid as an image, re-mapped only when the data changed"""
+        if self.image_source is not self.temperature:
+            index = np.multiply(self.temperature, 0.1, dtype=np.float32)
+            np.clip(index, 2, 90, out=index)
+            index += 0.5  # Truncating below rounds to the nearest 10°C
+            self.image_buffer, self.image = lut_image(self.temp_rgba, index.astype(np.uint8))
+            self.image_source = self.temperature
+        return self.image
+    
     def paintEvent(self, event):
         qp = QPainter(self)
+        rows, cols = self.temperature.shape
+        cell = fit_cell_size(self.cell_size, self.temperature.shape, self.width() - 200, self.height() - 100)
         
         # Draw temperature grid
-        for i in range(size):
-            for j in range(size):
-                temp = self.temperature[i, j]
-                color = self.get_temperature_color(temp)
-                qp.setBrush(color)
-                qp.setPen(QColor(50, 50, 50))  # Dark border
-                qp.drawRect(j * self.cell_size, i * self.cell_size, 
-                           self.cell_size, self.cell_size)
-                
-                # Draw temperature text for every 3rd cell to avoid clutter
-                if i % 3 == 0 and j % 3 == 0:
-                    qp.setPen(QColor(255, 255, 255))  # White text
-                    font = QFont()
-                    font.setPointSize(8)
-                    qp.setFont(font)
-                    temp_text = f"{int(temp)}"
-                    qp.drawText(j * self.cell_size + 2, i * self.cell_size + 12, temp_text)
+        qp.drawImage(QRectF(0, 0, cols * cell, rows * cell), self.temperature_image())
+        qp.setPen(QColor(50, 50, 50))  # Dark border
+        draw_cell_borders(qp, self.temperature.shape, cell, 0, 0)
+        
+        # Draw temperature text for every 3rd cell to avoid clutter
+        if cell >= LABEL_MIN_CELL:
+            qp.setPen(QColor(255, 255, 255))  # White text
+            font = QFont()
+            font.setPointSize(8)
+            qp.setFont(font)
+            for i in range(0, rows, 3):
+                for j in range(0, cols, 3):
+                    qp.drawText(int(j * cell) + 2, int(i * cell) + 12, f"{int(self.temperature[i, j])}")
         
         # Draw color scale legend
-        legend_x = size * self.cell_size + 20
+        legend_x = int(cols * cell) + 20
         legend_y = 50
         legend_width = 30
-        legend_height = size * self.cell_size - 100
+        legend_height = int(rows * cell) - 100
         
         qp.setPen(QColor(255, 255, 255))
         font = QFont()
@@ -285,12 +343,7 @@ class TemperatureHeatmapWidget(QWidget):
         qp.drawText(legend_x, 30, "Temperature (°C)")
         
         # Draw temperature scale
-        for i in range(legend_height):
-            temp = 20 + (880 * i) / legend_height  # 20°C to 900°C
-            color = self.get_temperature_color(temp)
-            qp.setBrush(color)
-            qp.setPen(color)
-            qp.drawRect(legend_x, legend_y + legend_height - i, legend_width, 2)
+        qp.drawImage(QRectF(legend_x, legend_y, legend_width, legend_height), self.legend_image)
         
         # Draw scale labels
         qp.setPen(QColor(255, 255, 255))
@@ -319,13 +372,20 @@ class TemperatureHeatmap:
     def __init__(self):
         self.fig, (self.ax1, self.ax2) = plt.subplots(1, 2, figsize=(16, 7))
         self.temperature_history = []
+        self.step_history = []  # Step of each history entry; the viewer may skip steps
         self.im = None
         self.colorbar = None
         self.heatmap_widget = TemperatureHeatmapWidget()
         
-    def update_temperature(self, temperature, step):
-        """Update temperature data and plot"""
+    def update_temperature(self, temperature, step, redraw=True):
+        """Update temperature data and plot; with redraw=False only the history and the PyQt widget"""
         self.temperature_history.append(temperature.copy())
+        self.step_history.append(step)
+        
+        # Update PyQt widget
+        self.heatmap_widget.update_temperature(temperature, step)
+        if not redraw:
+            return
         
         # Update matplotlib heatmap
         if self.im is None:
@@ -364,7 +424,7 @@ class TemperatureHeatmap:
             mean_temps = [np.mean(temp) for temp in self.temperature_history]
             min_temps = [np.min(temp) for temp in self.temperature_history]
             
-            time_steps = range(len(self.temperature_history))
+            time_steps = self.step_history
             
             self.ax2.plot(time_steps, max_temps, 'r-', label='Max Temperature', linewidth=2)
             self.ax2.plot(time_steps, mean_temps, 'orange', label='Mean Temperature', linewidth=2)
@@ -376,9 +436,6 @@ class TemperatureHeatmap:
             self.ax2.legend()
             self.ax2.grid(True, alpha=0.3)
         
-        # Update PyQt widget
-        self.heatmap_widget.update_temperature(temperature, step)
-        
         plt.tight_layout()
         plt.draw()
         plt.pause(0.01)
@@ -399,7 +456,7 @@ class TemperatureHeatmap:
         mean_temps = [np.mean(temp) for temp in self.temperature_history]
         min_temps = [np.min(temp) for temp in self.temperature_history]
         
-        time_steps = range(len(self.temperature_history))
+        time_steps = self.step_history
         
         ax.plot(time_steps, max_temps, 'r-', label='Max Temperature', linewidth=2)
         ax.plot(time_steps, mean_temps, 'orange', label='Mean Temperature', linewidth=2)
@@ -414,6 +471,83 @@ class TemperatureHeatmap:
         plt.tight_layout()
         plt.show()
         
+class FrameSlot:
+    """Single-slot mailbox between the simulation thread and the viewer: a new frame replaces an unread one"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.frame = None
+        self.dropped = 0  # Frames replaced before the viewer took them
+    
+    def put(self, frame):
+        with self.lock:
+            if self.frame is not None:
+                self.dropped += 1
+            self.frame = frame
+    
+    def take(self):
+        """Newest frame, or None when nothing new was published since the last take"""
+        with self.lock:
+            frame, self.frame = self.frame, None
+        return frame
+
+class SimulationWorker(QThread):
+    """Runs the fire spread model off the GUI thread, publishing every step to a FrameSlot"""
+    def __init__(self, frames):
+        super().__init__()
+        self.frames = frames
+        self.grid = grid
+        self.grid_serial_time = {"1": self.grid}        #dicitonary storing the map states over unit time
+        self.burn_timer = burn_timer
+        self.elevation = elevation
+        self.fuel_type = fuel_type
+        self.wind_speed = wind_speed
+        self.base = np.array([1.0, 0.2])
+        self.step = 0
+        self.uncapped = False  # Step as fast as possible instead of every STEP_INTERVAL_MS
+    
+    def advance(self):
+        """Run one simulation step and publish its frame"""
+        # Update wind field
+        self.wind_speed, self.base = wind_field(self.wind_speed, self.step, self.base)
+        new_grid = self.grid.copy()
+        new_timer = self.burn_timer.copy()
+        
+        for i in range(size):
+            for j in range(size):
+                if self.grid[i, j] == BURNING:
+                    for di, dj in [(-1,0), (1,0), (0,-1), (0,1)]:
+                        ni, nj = i + di, j + dj
+                        if 0 <= ni < size and 0 <= nj < size:
+                            if self.grid[ni, nj] == VEG:
+                                # Use ignite_prob_f for ignition probability
+                                prob = ignite_prob_f(i, j, ni, nj, self.elevation, 
+                                                   self.wind_speed, self.fuel_type)
+                                if np.random.rand() < prob:
+                                    new_grid[ni, nj] = BURNING
+                                    new_timer[ni, nj] = burn_time
+                    new_timer[i, j] -= 1
+                    if new_timer[i, j] <= 0:
+                        new_grid[i, j] = ASH
+        
+        self.grid, self.burn_timer = new_grid, new_timer
+        self.grid_serial_time[str(self.step + 2)] = self.grid
+        
+        # Calculate temperature; every array in the frame is new, so the viewer can keep it
+        temperature = calculate_temperature(self.grid, self.burn_timer, self.step)
+        self.frames.put({
+            'step': self.step,
+            'grid': self.grid,
+            'wind_speed': self.wind_speed,
+            'temperature': temperature,
+        })
+        self.step += 1
+    
+    def run(self):
+        while self.step < steps and not self.isInterruptionRequested():
+            self.advance()
+            if not self.uncapped:
+                self.msleep(STEP_INTERVAL_MS)
+
 class FireSimWidget(QWidget):
     def __init__(self):
         super().__init__()
@@ -437,6 +571,12 @@ class FireSimWidget(QWidget):
         self.temp_heatmap_btn.clicked.connect(self.show_heatmap_widget)
         button_layout.addWidget(self.temp_heatmap_btn)
         
+        # Toggle between a paced simulation and one running as fast as it can
+        self.uncapped_btn = QPushButton("Run Uncapped")
+        self.uncapped_btn.setCheckable(True)
+        self.uncapped_btn.toggled.connect(self.set_uncapped)
+        button_layout.addWidget(self.uncapped_btn)
+        
         layout.addLayout(button_layout)
         
         # Add status label
@@ -445,51 +585,55 @@ class FireSimWidget(QWidget):
         
         self.setLayout(layout)
         
-        self.grid = grid
-        self.grid_serial_time = {"1": self.grid}        #dicitonary storing the map states over unit time
-        self.burn_timer = burn_timer
-        self.elevation = elevation
-        self.fuel_type = fuel_type
-        self.wind_speed = wind_speed
-        self.base = np.array([1.0, 0.2])
+        # Simulation thread and the frame it last published
+        self.frames = FrameSlot()
+        self.worker = SimulationWorker(self.frames)
+        self.grid = self.worker.grid
+        self.grid_serial_time = self.worker.grid_serial_time
+        self.wind_speed = self.worker.wind_speed
         self.step = 0
+        self.image_source = None  # Grid the cached image was mapped from
+        self.showing_frame = False  # plt.pause runs the event loop; don't re-enter show_latest_frame
+        self.last_plot = float('-inf')  # When the matplotlib figure was last redrawn
         
         # Initialize temperature heatmap
         self.temp_heatmap = TemperatureHeatmap()
         
         self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_sim)
-        self.timer.start(400)  # ms
+        self.timer.timeout.connect(self.show_latest_frame)
+        self.timer.start(DISPLAY_INTERVAL_MS)
+        self.worker.start()
         
         # Show temperature heatmap window
         plt.ion()  # Turn on interactive mode
         plt.show()
 
+    def state_image(self):
+        """Cell states as an image, re-mapped only when the grid changed"""
+        if self.image_source is not self.grid:
+            self.image_buffer, self.image = lut_image(STATE_RGBA, self.grid)
+            self.image_source = self.grid
+        return self.image
+
     def paintEvent(self, event):
         qp = QPainter(self)
-        colors = {
-            EMPTY: QColor(139, 69, 19),   # Brown
-            VEG: QColor(34, 139, 34),     # Forest green
-            BURNING: QColor(255, 69, 0),  # Orange red
-            ASH: QColor(47, 79, 79)       # Dark slate gray
-        }
+        rows, cols = self.grid.shape
         
         # Draw grid (offset by button height)
         y_offset = 80
-        for i in range(size):
-            for j in range(size):
-                qp.setBrush(colors[self.grid[i, j]])
-                qp.setPen(QColor(0, 0, 0))  # Black border
-                qp.drawRect(j*self.cell_size, i*self.cell_size + y_offset, 
-                           self.cell_size, self.cell_size)
+        cell = fit_cell_size(self.cell_size, self.grid.shape, self.width(), self.height() - y_offset)
+        qp.drawImage(QRectF(0, y_offset, cols * cell, rows * cell), self.state_image())
+        qp.setPen(QColor(0, 0, 0))  # Black border
+        draw_cell_borders(qp, self.grid.shape, cell, 0, y_offset)
         
-        # Draw wind vectors
+        # Draw wind vectors (every 4th cell, or sparser when cells are small)
         qp.setPen(QColor(100, 100, 200))
         wind_scale = 4
-        for i in range(0, size, 4):
-            for j in range(0, size, 4):
-                x = j * self.cell_size + self.cell_size // 2
-                y = i * self.cell_size + self.cell_size // 2 + y_offset
+        stride = max(4, int(np.ceil(WIND_ARROW_SPACING / cell)))
+        for i in range(0, rows, stride):
+            for j in range(0, cols, stride):
+                x = int(j * cell + cell / 2)
+                y = int(i * cell + cell / 2) + y_offset
                 dx = int(self.wind_speed[i, j, 0] * wind_scale)
                 dy = int(self.wind_speed[i, j, 1] * wind_scale)
                 qp.drawLine(x, y, x + dx, y + dy)
@@ -498,47 +642,46 @@ class FireSimWidget(QWidget):
                     qp.drawEllipse(x + dx - 2, y + dy - 2, 4, 4)
                     qp.setPen(QColor(100, 100, 200))
 
-    def update_sim(self):
-        if self.step >= steps:
-            self.timer.stop()
+    def show_latest_frame(self):
+        """Draw the newest published frame; frames published since the last refresh are skipped"""
+        if self.showing_frame:
+            return
+        finished = self.worker.isFinished()
+        frame = self.frames.take()
+        if frame is None:
+            if finished:
+                self.timer.stop()
             return
+        self.showing_frame = True
+        try:
+            self.grid, self.wind_speed, self.step = frame['grid'], frame['wind_speed'], frame['step']
+            temperature = frame['temperature']
+            now = time.monotonic()
+            redraw = now - self.last_plot >= PLOT_INTERVAL_MS / 1000 or self.step == steps - 1
+            if redraw:
+                self.last_plot = now
+            self.temp_heatmap.update_temperature(temperature, self.step, redraw)
             
-        # Update wind field
-        self.wind_speed, self.base = wind_field(self.wind_speed, self.step, self.base)
-        new_grid = self.grid.copy()
-        new_timer = self.burn_timer.copy()
-        
-        for i in range(size):
-            for j in range(size):
-                if self.grid[i, j] == BURNING:
-                    for di, dj in [(-1,0), (1,0), (0,-1), (0,1)]:
-                        ni, nj = i + di, j + dj
-                        if 0 <= ni < size and 0 <= nj < size:
-                            if self.grid[ni, nj] == VEG:
-                                # Use ignite_prob_f for ignition probability
-                                prob = ignite_prob_f(i, j, ni, nj, self.elevation, 
-                                                   self.wind_speed, self.fuel_type)
-                                if np.random.rand() < prob:
-                                    new_grid[ni, nj] = BURNING
-                                    new_timer[ni, nj] = burn_time
-                    new_timer[i, j] -= 1
-                    if new_timer[i, j] <= 0:
-                        new_grid[i, j] = ASH
-        
-        self.grid, self.burn_timer = new_grid, new_timer
-        self.grid_serial_time[]
-        
-        # Calculate and update temperature
-        temperature = calculate_temperature(self.grid, self.burn_timer, self.step)
-        self.temp_heatmap.update_temperature(temperature, self.step)
-        
-        # Update status
-        burning_cells = np.sum(self.grid == BURNING)
-        max_temp = np.max(temperature)
-        self.status_label.setText(f"Step: {self.step} | Burning Cells: {burning_cells} | Max Temp: {max_temp:.1f}°C")
-        
-        self.step += 1
-        self.update()
+            # Update status
+            burning_cells = np.sum(self.grid == BURNING)
+            max_temp = np.max(temperature)
+            self.status_label.setText(f"Step: {self.step} | Burning Cells: {burning_cells} | Max Temp: {max_temp:.1f}°C"
+                                      f" | Skipped Frames: {self.frames.dropped}")
+            
+            self.update()
+        finally:
+            self.showing_frame = False
+    
+    def set_uncapped(self, uncapped):
+        """Let the simulation run as fast as it can; the display keeps its refresh rate"""
+        self.worker.uncapped = uncapped
+    
+    def closeEvent(self, event):
+        """Stop the simulation thread before the window goes away"""
+        self.timer.stop()
+        self.worker.requestInterruption()
+        self.worker.wait()
+        super().closeEvent(event)
     
     def show_temperature_evolution(self):
         """Show temperature evolution plot"""
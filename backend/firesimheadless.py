@@ -3,6 +3,12 @@ import json
 import time
 from datetime import datetime, timedelta
 
+from backend.checkpoint import (
+    CheckpointWriter, META_FILE, has_checkpoint, load_checkpoint, pack_json,
+    pack_rng_state, segment_filename, unpack_rng_state,
+)
+from backend.grid_sampler import GridSampler
+
 """
 Arduino Sensor Network Fire Simulation
 --------------------------------------
@@ -10,6 +16,8 @@ Arduino Sensor Network Fire Simulation
 - 64x64 grid = 4,096 virtual Arduino sensors across forest area
 - Sensors report temperature, fire state, and environmental data
 - Real-time fire spread analysis and prediction
+- attach_sensors() samples a run at any irregular sensor table through a
+  precomputed sparse bilinear operator (backend/grid_sampler.py)
 - WebSocket integration for frontend visualization
 """
 
@@ -20,6 +28,13 @@ burn_time = 5          # Steps a cell burns before turning to ash
 steps = 300            # Extended simulation steps for longer analysis
 n_updates = 24         # More random fire ignition events
 
+# --- Heat Diffusion ---
+heat_radius = 3             # Cells of radiant heat around a burning cell (7x7 window at 30 m)
+heat_decay = 0.6            # Exponential falloff per cell of distance
+heat_combine = 'max'        # 'max' keeps the hottest contribution per cell, 'sum' superposes them
+fft_radius_threshold = 4    # Radii above this use FFT convolution instead of the direct stencil
+heat_softmax_power = 4      # p-norm exponent approximating 'max' on the FFT path
+
 # --- Sensor Network Configuration ---
 CELL_SIZE_METERS = 30  # Each cell = 30x30 meter area
 BASE_LAT = 38.7891     # Eldorado National Forest base latitude
@@ -31,8 +46,10 @@ VEG = 1
 BURNING = 2
 ASH = 3
 
+_kernel_spectra = {}   # (padded shape, radius, power, decay) -> rfft2 of the heat kernel
+
 class FireSimData:
-    def __init__(self):
+    def __init__(self, checkpoint_dir=None, checkpoint_every=100):
         self.grid = np.full((size, size), VEG, dtype=int)
         self.burn_timer = np.zeros((size, size), dtype=int)
         self.elevation = np.zeros((size, size), dtype=int)
@@ -49,9 +66,60 @@ class FireSimData:
         
         # Arduino sensor network data
         self.sensors = self._generate_sensor_network()
+        self.site_ids = []  # Irregular sensors from attach_sensors(), sampled by site_sampler
+        self.site_sampler = None
         self.fire_events = []  # Track fire ignition events
         self.spread_history = []  # Track fire spread over time
 
+        # Live loop state carried between steps (grid, timer, wind, base, update_stream position)
+        self._loop_state = None
+
+        # Periodic checkpoints every `checkpoint_every` steps, written in the background
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_every = checkpoint_every
+        self._checkpointer = CheckpointWriter(checkpoint_dir) if checkpoint_dir else None
+        self._checkpointed_steps = 0
+
+    @classmethod
+    def resume(cls, checkpoint_dir, checkpoint_every=100):
+        """Rebuild a run from the latest checkpoint in checkpoint_dir
+
+        Falls back to a fresh simulation when the directory holds no checkpoint.
+        Calling run() afterwards continues from the checkpointed step.
+        """
+        sim = cls(checkpoint_dir=checkpoint_dir, checkpoint_every=checkpoint_every)
+        if not has_checkpoint(checkpoint_dir):
+            return sim
+
+        meta, head, history = load_checkpoint(checkpoint_dir)
+        # Integer fields are stored narrow; restore the live dtypes so replayed and new steps match
+        sim.grid = meta['grid'].astype(int)
+        sim.burn_timer = meta['burn_timer'].astype(int)
+        sim.elevation = meta['elevation'].astype(int)
+        sim.fuel_type = meta['fuel_type'].astype(int)
+        sim.update_stream = meta['update_stream']
+        for sensor, battery, maintenance in zip(sim.sensors.values(), meta['sensor_battery'], meta['sensor_maintenance']):
+            sensor['battery_level'] = float(battery)
+            sensor['last_maintenance'] = datetime.fromtimestamp(float(maintenance))
+
+        sim.grids = list(history['grids'].astype(int))
+        sim.burn_timers = list(history['burn_timers'].astype(int))
+        sim.wind_fields = list(np.asarray(history['wind_fields'], dtype=float))
+        sim.temperatures = list(np.asarray(history['temperatures'], dtype=float))
+        sim.spread_history = history['spread_history']
+        sim.prev_affected = int(head['head_prev_affected'])
+        sim._loop_state = (
+            head['head_grid'].astype(int),
+            head['head_burn_timer'].astype(int),
+            head['head_wind'],
+            head['head_base'],
+            int(head['head_ns']),
+        )
+        unpack_rng_state(head)
+        sim._checkpointed_steps = head['end_step']
+        print(f"♻️ Resumed simulation at step {head['end_step']} from {checkpoint_dir}")
+        return sim
+
     def _gen_update_stream(self):
         for i in range(n_updates):
             self.update_stream[i, 0] = np.random.randint(0, steps)
@@ -120,65 +188,174 @@ class FireSimData:
         wind[..., 1] = base[1] + drift + fluctuation[..., 1]
         return wind, base
 
-    def _calculate_temperature(self, grid, burn_timer, step):
-        temperature = np.full((size, size), 20.0, dtype=float)
-        for i in range(size):
-            for j in range(size):
-                if grid[i, j] == BURNING:
-                    burn_progress = (burn_time - burn_timer[i, j]) / burn_time
-                    peak_temp = 800 - (burn_progress * 300)
-                    temperature[i, j] = peak_temp
-                    for di in range(-3, 4):
-                        for dj in range(-3, 4):
-                            ni, nj = i + di, j + dj
-                            if 0 <= ni < size and 0 <= nj < size and (di != 0 or dj != 0):
-                                distance = np.sqrt(di*di + dj*dj)
-                                heat_transfer = peak_temp * np.exp(-distance * 0.6)
-                                temperature[ni, nj] = max(temperature[ni, nj], 20 + heat_transfer * 0.4)
-                elif grid[i, j] == ASH:
-                    cooling_rate = 0.97
-                    ash_temp = 400 * (cooling_rate ** step)
-                    temperature[i, j] = max(20, ash_temp)
+    def _heat_kernel(self, radius, power=1):
+        """Radiant heat falloff for every offset in a (2r+1)x(2r+1) window, centre excluded"""
+        offsets = np.arange(-radius, radius + 1)
+        distance = np.sqrt(offsets[:, None] ** 2 + offsets[None, :] ** 2)
+        kernel = np.exp(-distance * heat_decay * power)
+        kernel[radius, radius] = 0.0
+        return kernel
+
+    def _kernel_spectrum(self, shape, radius, power):
+        """FFT of the zero-padded heat kernel, cached per padded grid shape"""
+        key = (shape, radius, power, heat_decay)
+        spectrum = _kernel_spectra.get(key)
+        if spectrum is None:
+            spectrum = np.fft.rfft2(self._heat_kernel(radius, power), s=shape)
+            _kernel_spectra[key] = spectrum
+        return spectrum
+
+    def _heat_field_direct(self, peak, radius):
+        """Combine radiant heat from every burning cell with a shifted-window stencil"""
+        rows, cols = peak.shape
+        padded = np.zeros((rows + 2 * radius, cols + 2 * radius), dtype=float)
+        kernel = self._heat_kernel(radius)
+        for di in range(-radius, radius + 1):
+            for dj in range(-radius, radius + 1):
+                weight = kernel[di + radius, dj + radius]
+                if weight == 0.0:
+                    continue
+                window = padded[radius + di:radius + di + rows, radius + dj:radius + dj + cols]
+                if heat_combine == 'sum':
+                    window += peak * weight
+                else:
+                    np.maximum(window, peak * weight, out=window)
+        return padded[radius:radius + rows, radius:radius + cols]
+
+    def _heat_field_fft(self, peak, radius):
+        """Combine radiant heat with an FFT convolution against a cached kernel spectrum
+
+        'sum' is an exact linear convolution. 'max' cannot be expressed as a
+        convolution, so it is approximated by the p-norm
+        (sum_s (peak_s * k)^p)^(1/p) with p = heat_softmax_power: exact for a
+        single source, overestimating by at most n^(1/p) where n sources
+        contribute equally to a cell.
+        """
+        rows, cols = peak.shape
+        shape = (rows + 2 * radius, cols + 2 * radius)
+        power = 1 if heat_combine == 'sum' else heat_softmax_power
+        scale = peak.max()
+        source = (peak / scale) ** power
+        field = np.fft.irfft2(np.fft.rfft2(source, s=shape) * self._kernel_spectrum(shape, radius, power), s=shape)
+        field = field[radius:radius + rows, radius:radius + cols]
+        # Round-off from the transform is ~1e-16 of the largest term; drop it before the root
+        field[field < 1e-12] = 0.0
+        return scale * field ** (1.0 / power)
+
+    def _calculate_temperature(self, grid, burn_timer, step, method='auto'):
+        """Temperature field from burning/ash cells
+
+        Burning cells radiate peak_temp * exp(-heat_decay * d) to every cell
+        within heat_radius (square window). method is 'direct', 'fft', or
+        'auto', which switches to FFT above fft_radius_threshold.
+        """
+        temperature = np.full(grid.shape, 20.0, dtype=float)
+        burning = grid == BURNING
+        if np.any(burning):
+            burn_progress = (burn_time - burn_timer) / burn_time
+            peak = np.where(burning, 800 - (burn_progress * 300), 0.0)
+            if method == 'auto':
+                method = 'fft' if heat_radius > fft_radius_threshold else 'direct'
+            if method == 'fft':
+                heat = self._heat_field_fft(peak, heat_radius)
+            else:
+                heat = self._heat_field_direct(peak, heat_radius)
+            temperature += heat * 0.4
+            # A burning cell keeps its own peak unless a neighbour radiates more onto it
+            temperature[burning] = np.maximum(peak[burning], temperature[burning])
+        ash = grid == ASH
+        if np.any(ash):
+            cooling_rate = 0.97
+            ash_temp = max(20, 400 * (cooling_rate ** step))
+            temperature[ash] = np.maximum(temperature[ash], ash_temp)
         return temperature
 
     def run(self):
-        grid_sim = self.grid.copy()
-        burn_timer_sim = self.burn_timer.copy()
-        wind_sim = self.wind_speed.copy()
-        base = np.array([1.0, 0.2])
-        ns = 0
-        for step in range(steps):
-            wind_sim, base = self._wind_field(wind_sim, step, base)
-            new_grid = grid_sim.copy()
-            new_timer = burn_timer_sim.copy()
-            if ns < n_updates and step == self.update_stream[ns, 0]:
-                new_grid[int(self.update_stream[ns, 1]), int(self.update_stream[ns, 2])] = BURNING
-                new_timer[int(self.update_stream[ns, 1]), int(self.update_stream[ns, 2])] = burn_time
-                ns += 1
-            for i in range(size):
-                for j in range(size):
-                    if grid_sim[i, j] == BURNING:
-                        for di, dj in [(-1,0), (1,0), (0,-1), (0,1)]:
-                            ni, nj = i + di, j + dj
-                            if 0 <= ni < size and 0 <= nj < size:
-                                if grid_sim[ni, nj] == VEG:
-                                    prob = self._ignite_prob_f(i, j, ni, nj, self.elevation, wind_sim, self.fuel_type)
-                                    if np.random.rand() < prob:
-                                        new_grid[ni, nj] = BURNING
-                                        new_timer[ni, nj] = burn_time
-                        new_timer[i, j] -= 1
-                        if new_timer[i, j] <= 0:
-                            new_grid[i, j] = ASH
-            grid_sim, burn_timer_sim = new_grid, new_timer
-            temp = self._calculate_temperature(grid_sim, burn_timer_sim, step)
-            self.grids.append(grid_sim.copy())
-            self.burn_timers.append(burn_timer_sim.copy())
-            self.wind_fields.append(wind_sim.copy())
-            self.temperatures.append(temp.copy())
-            
-            # Track fire spread metrics
-            spread_data = self._calculate_spread_metrics(step, grid_sim, temp)
-            self.spread_history.append(spread_data)
+        """Run the simulation to `steps`, continuing from the last completed step"""
+        for step in range(len(self.grids), steps):
+            self.step_once(step)
+            if self._checkpointer and (step + 1) % self.checkpoint_every == 0:
+                self.checkpoint()
+        if self._checkpointer:
+            if self._checkpointed_steps < len(self.grids):
+                self.checkpoint()
+            self._checkpointer.flush()
+
+    def step_once(self, step):
+        """Advance the live loop state by one step and record its history"""
+        if self._loop_state is None:
+            self._loop_state = (self.grid.copy(), self.burn_timer.copy(), self.wind_speed.copy(), np.array([1.0, 0.2]), 0)
+        grid_sim, burn_timer_sim, wind_sim, base, ns = self._loop_state
+        wind_sim, base = self._wind_field(wind_sim, step, base)
+        new_grid = grid_sim.copy()
+        new_timer = burn_timer_sim.copy()
+        if ns < n_updates and step == self.update_stream[ns, 0]:
+            new_grid[int(self.update_stream[ns, 1]), int(self.update_stream[ns, 2])] = BURNING
+            new_timer[int(self.update_stream[ns, 1]), int(self.update_stream[ns, 2])] = burn_time
+            ns += 1
+        for i in range(size):
+            for j in range(size):
+                if grid_sim[i, j] == BURNING:
+                    for di, dj in [(-1,0), (1,0), (0,-1), (0,1)]:
+                        ni, nj = i + di, j + dj
+                        if 0 <= ni < size and 0 <= nj < size:
+                            if grid_sim[ni, nj] == VEG:
+                                prob = self._ignite_prob_f(i, j, ni, nj, self.elevation, wind_sim, self.fuel_type)
+                                if np.random.rand() < prob:
+                                    new_grid[ni, nj] = BURNING
+                                    new_timer[ni, nj] = burn_time
+                    new_timer[i, j] -= 1
+                    if new_timer[i, j] <= 0:
+                        new_grid[i, j] = ASH
+        grid_sim, burn_timer_sim = new_grid, new_timer
+        self._loop_state = (grid_sim, burn_timer_sim, wind_sim, base, ns)
+        temp = self._calculate_temperature(grid_sim, burn_timer_sim, step)
+        self.grids.append(grid_sim.copy())
+        self.burn_timers.append(burn_timer_sim.copy())
+        self.wind_fields.append(wind_sim.copy())
+        self.temperatures.append(temp.copy())
+
+        # Track fire spread metrics
+        spread_data = self._calculate_spread_metrics(step, grid_sim, temp)
+        self.spread_history.append(spread_data)
+
+    def checkpoint(self):
+        """Queue a checkpoint of the steps since the last one plus the live loop state"""
+        if self._checkpointer is None or self._loop_state is None:
+            return
+        # Stop at the first failed write rather than stacking segments on a gap
+        self._checkpointer.raise_error()
+        if self._checkpointed_steps == 0:
+            self._checkpointer.submit(META_FILE, {
+                'grid': self.grid.astype(np.uint8),
+                'burn_timer': self.burn_timer.astype(np.int16),
+                'elevation': self.elevation.astype(np.int16),
+                'fuel_type': self.fuel_type.astype(np.uint8),
+                'update_stream': self.update_stream.copy(),
+                'sensor_battery': np.array([s['battery_level'] for s in self.sensors.values()]),
+                'sensor_maintenance': np.array([s['last_maintenance'].timestamp() for s in self.sensors.values()]),
+            })
+
+        start, end = self._checkpointed_steps, len(self.grids)
+        grid_sim, burn_timer_sim, wind_sim, base, ns = self._loop_state
+        arrays = {
+            'start_step': np.array(start),
+            'end_step': np.array(end),
+            'grids': np.stack(self.grids[start:end]).astype(np.uint8),
+            'burn_timers': np.stack(self.burn_timers[start:end]).astype(np.int16),
+            'wind_fields': np.stack(self.wind_fields[start:end]),
+            'temperatures': np.stack(self.temperatures[start:end]),
+            'spread_history': pack_json(self.spread_history[start:end]),
+            'head_grid': grid_sim.astype(np.uint8),
+            'head_burn_timer': burn_timer_sim.astype(np.int16),
+            'head_wind': wind_sim.copy(),
+            'head_base': np.asarray(base, dtype=float),
+            'head_ns': np.array(ns),
+            'head_prev_affected': np.array(getattr(self, 'prev_affected', 0)),
+        }
+        arrays.update(pack_rng_state())
+        self._checkpointer.submit(segment_filename(end), arrays)
+        self._checkpointed_steps = end
 
     def _generate_sensor_network(self):
         """Generate Arduino sensor network across the grid"""
@@ -312,6 +489,36 @@ class FireSimData:
         
         return sensor_data
 
+    def attach_sensors(self, sensors, origin=None):
+        """Attach an arbitrary sensor table (dicts with id, lat, lon) to be sampled by sample_sensors()
+
+        The grid's cell (0, 0) sits at BASE_LAT/BASE_LON, or at origin=(lat, lon) to lay
+        the run over another deployment (e.g. the simple system's forest sensors).
+        """
+        origin_lat, origin_lon = origin or (BASE_LAT, BASE_LON)
+        self.site_ids = [sensor['id'] for sensor in sensors]
+        self.site_sampler = GridSampler(
+            [sensor['lat'] for sensor in sensors],
+            [sensor['lon'] for sensor in sensors],
+            (size, size),
+            (origin_lat, origin_lon, CELL_SIZE_METERS / 111000, CELL_SIZE_METERS / 111000),
+        )
+
+    def sample_sensors(self, step):
+        """Readings of the attached sensors at a step, as arrays aligned with site_ids"""
+        sampler = self.site_sampler
+        wind = self.wind_fields[step]
+        # Directions are blended as unit vectors so angles either side of +-pi do not average out
+        direction_x = sampler.sample(np.cos(wind[..., 1]))
+        direction_y = sampler.sample(np.sin(wind[..., 1]))
+        return {
+            'temperature': sampler.sample(self.temperatures[step]),
+            'state': sampler.sample_nearest(self.grids[step], outside=EMPTY),
+            'wind_speed': sampler.sample(wind[..., 0]),
+            'wind_direction': np.arctan2(direction_y, direction_x),
+            'inside': sampler.inside,
+        }
+
     def _temp_to_pm25(self, temp):
         """Convert temperature to PM2.5 equivalent for visualization"""
         if temp <= 25:
@@ -340,5 +547,13 @@ class FireSimData:
 # Usage:
 # sim_data = FireSimData()
 # sim_data.run()
+#
+# Checkpointed run that survives restarts (re-running the same line resumes):
+# sim_data = FireSimData.resume('checkpoints/run1', checkpoint_every=100)
+# sim_data.run()
 # sensor_data = sim_data.get_sensor_data_for_step(100)
+#
+# Irregular sensors (any table of dicts with id, lat, lon):
+# sim_data.attach_sensors(sensor_table)
+# readings = sim_data.sample_sensors(100)  # arrays aligned with sim_data.site_ids
 # progression = sim_data.get_fire_progression_data()
\ No newline at end of file
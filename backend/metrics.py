@@ -0,0 +1,165 @@
+import asyncio
+import bisect
+import threading
+
+"""
+Server Metrics (Prometheus text format)
+---------------------------------------
+- Counters, gauges and fixed-bucket histograms kept in plain Python numbers;
+  recording is a dict lookup, a bisect and two additions under a lock, so a
+  tick's worth of observations costs microseconds
+- Values the servers already track (client queues, session counts, skipped
+  ticks) are read by callbacks at scrape time instead of being mirrored on the
+  hot path; a callback returns a number, or {label values tuple: number}
+- render() produces the text exposition format (version 0.0.4), served by a
+  tiny asyncio HTTP server at /metrics on a local port next to the WebSocket port
+- REGISTRY is the process-wide default registry
+"""
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from sub-millisecond encodes up to overloaded ticks
+DURATION_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# Bytes, from a single-sensor delta up to a full 100k-sensor JSON keyframe
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A counter or gauge, optionally labelled, optionally read from a callback"""
+
+    def __init__(self, kind, name, help, labelnames=(), function=None):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self.values = {}  # label values tuple -> number
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, labels=()):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def set(self, value, labels=()):
+        self.values[labels] = value
+
+    def samples(self):
+        values = self.function() if self.function else self.values
+        if not isinstance(values, dict):
+            values = {(): values}
+        elif not values and not self.labelnames:
+            values = {(): 0}  # Unlabelled series exist from the start
+        return [(self.name, _format_labels(self.labelnames, labels), value) for labels, value in values.items()]
+
+
+class Histogram:
+    """Fixed-bucket histogram, optionally labelled"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        self.series = {}  # label values tuple -> [per-bucket counts (last is +Inf), sum]
+        self.lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self):
+        samples = []
+        for labels, (counts, total) in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="%s"' % _format_value(bound)
+                samples.append((self.name + "_bucket", _format_labels(self.labelnames, labels, [le]), cumulative))
+            samples.append((self.name + "_sum", _format_labels(self.labelnames, labels), total))
+            samples.append((self.name + "_count", _format_labels(self.labelnames, labels), cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """Named metrics of one process, rendered together"""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=(), function=None):
+        """Monotonic counter; with function, its value is read at scrape time"""
+        return self._register(Metric("counter", name, help, labelnames, function))
+
+    def gauge(self, name, help, labelnames=(), function=None):
+        return self._register(Metric("gauge", name, help, labelnames, function))
+
+    def histogram(self, name, help, buckets=DURATION_BUCKETS, labelnames=()):
+        return self._register(Histogram(name, help, buckets, labelnames))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            try:
+                samples = metric.samples()
+            except Exception as e:  # A broken callback must not take the whole endpoint down
+                print(f"❌ Metric {metric.name} failed: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines += [f"{name}{labels} {_format_value(value)}" for name, labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+async def serve_metrics(host, port, registry=REGISTRY):
+    """Serve registry.render() at http://host:port/metrics; returns the asyncio server"""
+
+    async def handle(reader, writer):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass  # Headers are not needed
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, body, content_type = "200 OK", registry.render().encode("utf-8"), CONTENT_TYPE
+            else:
+                status, body, content_type = "404 Not Found", b"Not found\n", "text/plain"
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+            await writer.drain()
+        except (ConnectionError, UnicodeDecodeError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
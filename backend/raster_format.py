@@ -0,0 +1,115 @@
+import struct
+import zlib
+
+import numpy as np
+
+"""
+Binary Raster Frame Format (WebSocket subprotocol "phoenix.raster.v1")
+----------------------------------------------------------------------
+Opt-in alternative to per-sensor JSON for gridded runs (FireSimData): each step
+is two rasters, sent as one compressed binary frame that a client can upload as
+a single texture. All integers and floats are little-endian. Every frame starts
+with a 60-byte header:
+
+    magic       4s   b"PXR1"
+    version     u8   1
+    kind        u8   KIND_KEYFRAME | KIND_DELTA
+    flags       u16  0 (reserved)
+    step        u32  simulation step the frame shows
+    base_step   u32  KIND_DELTA: the step the delta applies to (always step - 1)
+    width       u16  columns (grid j, west to east)
+    height      u16  rows (grid i, south to north)
+    temp_offset f32  degrees C of temperature level 0
+    temp_scale  f32  degrees C per temperature level
+    origin_lat  f64  latitude of the centre of row 0
+    origin_lon  f64  longitude of the centre of column 0
+    cell_lat    f64  degrees latitude per row
+    cell_lon    f64  degrees longitude per column
+
+followed by a zlib stream of the body:
+
+    temperature u8[height * width]  row-major, degrees C = temp_offset + level * temp_scale
+    state       u8[ceil(height * width / 4)]  2 bits per cell (EMPTY/VEG/BURNING/ASH),
+                cell k in bits 2*(k%4)..2*(k%4)+1 of byte k//4
+
+A KIND_DELTA body is the XOR of this step's body with the body of base_step:
+unchanged cells are zero bytes and compress to almost nothing. The temperature
+scale is fixed, so a cell that keeps its temperature keeps its level.
+"""
+
+SUBPROTOCOL = "phoenix.raster.v1"
+
+MAGIC = b"PXR1"
+VERSION = 1
+KIND_KEYFRAME = 1
+KIND_DELTA = 2
+
+TEMP_OFFSET = 0.0  # Level 0 = 0 C
+TEMP_SCALE = 4.0  # 4 C per level: 0-1020 C in a byte, FireSimData peaks at 800 C
+COMPRESS_LEVEL = 6
+
+HEADER = struct.Struct("<4sBBHIIHHffdddd")
+
+
+def quantize_temperature(temperature):
+    """Temperature levels (uint8) on the fixed scale"""
+    levels = np.rint((np.asarray(temperature, dtype=np.float64) - TEMP_OFFSET) / TEMP_SCALE)
+    return np.clip(levels, 0, 255).astype(np.uint8)
+
+
+def pack_states(grid):
+    """Cell states (0-3) packed four to a byte"""
+    cells = np.asarray(grid, dtype=np.uint8).ravel() & 3
+    cells = np.pad(cells, (0, -len(cells) % 4)).reshape(-1, 4)
+    return (cells[:, 0] | cells[:, 1] << 2 | cells[:, 2] << 4 | cells[:, 3] << 6).astype(np.uint8)
+
+
+def unpack_states(packed, count):
+    packed = np.asarray(packed, dtype=np.uint8)
+    cells = np.stack([packed >> shift & 3 for shift in (0, 2, 4, 6)], axis=1)
+    return cells.ravel()[:count]
+
+
+def raster_body(temperature, grid):
+    """Uncompressed body of one step: temperature levels, then packed states"""
+    return quantize_temperature(temperature).tobytes() + pack_states(grid).tobytes()
+
+
+def encode_frame(step, body, shape, geo, base_body=None):
+    """
+    Frame for a step's body; with base_body (the previous step's body) an XOR delta.
+    geo is (origin_lat, origin_lon, cell_lat, cell_lon).
+    """
+    height, width = shape
+    if base_body is None:
+        kind, base_step, payload = KIND_KEYFRAME, 0, body
+    else:
+        kind, base_step = KIND_DELTA, step - 1
+        payload = np.bitwise_xor(np.frombuffer(body, np.uint8), np.frombuffer(base_body, np.uint8)).tobytes()
+    header = HEADER.pack(MAGIC, VERSION, kind, 0, step, base_step, width, height, TEMP_OFFSET, TEMP_SCALE, *geo)
+    return header + zlib.compress(payload, COMPRESS_LEVEL)
+
+
+def decode_frame(frame, base_body=None):
+    """Decode a frame into a dict; KIND_DELTA needs the body of base_step. Used by test clients and tooling"""
+    (magic, version, kind, flags, step, base_step, width, height,
+     temp_offset, temp_scale, *geo) = HEADER.unpack_from(frame, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a {SUBPROTOCOL} frame")
+    body = zlib.decompress(bytes(frame[HEADER.size:]))
+    if kind == KIND_DELTA:
+        if base_body is None:
+            raise ValueError(f"Delta for step {step} needs the body of step {base_step}")
+        body = np.bitwise_xor(np.frombuffer(body, np.uint8), np.frombuffer(base_body, np.uint8)).tobytes()
+    count = width * height
+    levels = np.frombuffer(body, np.uint8, count=count)
+    return {
+        "kind": kind,
+        "step": step,
+        "base_step": base_step,
+        "shape": (height, width),
+        "geo": tuple(geo),
+        "temperature": (temp_offset + levels * np.float32(temp_scale)).reshape(height, width),
+        "state": unpack_states(np.frombuffer(body, np.uint8, offset=count), count).reshape(height, width),
+        "body": body,
+    }
@@ -0,0 +1,75 @@
+import math
+
+import numpy as np
+
+"""
+Sensor Spatial Index
+--------------------
+- Uniform grid hash over sensor lat/lon (degrees), one bucket per cell_size square
+- Each bucket holds a NumPy array of sensor indices, so box and radius queries
+  gather candidates with one concatenate instead of walking sensors in Python
+- Queries only visit the buckets overlapping the query area, so the cost scales
+  with the sensors near a fire instead of the whole network
+- Rebuild whenever the sensor list changes; queries never mutate the index
+"""
+
+
+class SensorGridIndex:
+    """Uniform grid hash for fire-to-sensor proximity queries"""
+
+    def __init__(self, sensors, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.rebuild(sensors)
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_size), math.floor(lon / self.cell_size))
+
+    def rebuild(self, sensors):
+        """Re-bucket every sensor; call after sensors are added, removed or moved"""
+        self.lat = np.array([s['lat'] for s in sensors], dtype=float)
+        self.lon = np.array([s['lon'] for s in sensors], dtype=float)
+        self.size = len(sensors)
+        self.cells = {}
+        if not self.size:
+            return
+
+        cell_i = np.floor(self.lat / self.cell_size).astype(np.int64)
+        cell_j = np.floor(self.lon / self.cell_size).astype(np.int64)
+        order = np.lexsort((cell_j, cell_i))
+        sorted_i, sorted_j = cell_i[order], cell_j[order]
+        boundaries = np.flatnonzero((np.diff(sorted_i) != 0) | (np.diff(sorted_j) != 0)) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [self.size]))
+        for start, end in zip(starts, ends):
+            self.cells[(int(sorted_i[start]), int(sorted_j[start]))] = order[start:end]
+
+    def _buckets_in_box(self, min_lat, min_lon, max_lat, max_lon):
+        lat_lo, lon_lo = self._cell(min_lat, min_lon)
+        lat_hi, lon_hi = self._cell(max_lat, max_lon)
+        box_cells = (lat_hi - lat_lo + 1) * (lon_hi - lon_lo + 1)
+        if box_cells > len(self.cells):
+            # Huge query: walking the occupied buckets is cheaper than the empty grid
+            return [bucket for (ci, cj), bucket in self.cells.items()
+                    if lat_lo <= ci <= lat_hi and lon_lo <= cj <= lon_hi]
+        buckets = []
+        for ci in range(lat_lo, lat_hi + 1):
+            for cj in range(lon_lo, lon_hi + 1):
+                bucket = self.cells.get((ci, cj))
+                if bucket is not None:
+                    buckets.append(bucket)
+        return buckets
+
+    def query_box(self, min_lat, min_lon, max_lat, max_lon):
+        """Indices of sensors in the buckets overlapping the box (a superset of the box)"""
+        buckets = self._buckets_in_box(min_lat, min_lon, max_lat, max_lon)
+        if not buckets:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(buckets)
+
+    def query_radius(self, lat, lon, radius):
+        """(indices, distances) of every sensor within radius of (lat, lon)"""
+        candidates = self.query_box(lat - radius, lon - radius, lat + radius, lon + radius)
+        distance = np.hypot(self.lat[candidates] - lat, self.lon[candidates] - lon)
+        inside = distance <= radius
+        return candidates[inside], distance[inside]
@@ -0,0 +1,142 @@
+import json
+import math
+import os
+
+"""
+Sensor Layout Engine
+--------------------
+- Bridson-style Poisson-disk sampling per forest zone (annulus from
+  sqrt(inner_fraction) * radius out to radius, like the original placement)
+- One background grid with cells of min_distance / sqrt(2) spans every zone, so each
+  distance check looks at a fixed 5x5 block of cells instead of every placed sensor
+- Each zone first grows a maximal Poisson-disk candidate set, then draws its
+  sensor_count sensors from it at random: any subset of a Poisson-disk set keeps the
+  min_distance guarantee and still covers the whole zone
+- All randomness comes from the caller's random.Random, so a seed fixes the layout
+- Layouts can be cached to a JSON file keyed by everything that shaped them
+"""
+
+
+# Neighbour cells that can hold a sample closer than min_distance, nearest first.
+# The (+-2, +-2) corners are at least min_distance away and are skipped.
+_NEIGHBOURS = sorted(
+    ((di, dj) for di in range(-2, 3) for dj in range(-2, 3) if abs(di) + abs(dj) < 4),
+    key=lambda offset: offset[0] ** 2 + offset[1] ** 2,
+)
+
+
+class PoissonGrid:
+    """Background grid holding at most one sample per cell"""
+
+    def __init__(self, min_distance):
+        self.min_distance = min_distance
+        self.cell_size = min_distance / math.sqrt(2)
+        self.cells = {}
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_size), math.floor(lon / self.cell_size))
+
+    def fits(self, lat, lon):
+        """True when no stored sample lies closer than min_distance"""
+        if not self.cells:
+            return True
+        ci, cj = self._cell(lat, lon)
+        min_sq = self.min_distance * self.min_distance
+        cells = self.cells
+        for di, dj in _NEIGHBOURS:
+            point = cells.get((ci + di, cj + dj))
+            if point and (point[0] - lat) ** 2 + (point[1] - lon) ** 2 < min_sq:
+                return False
+        return True
+
+    def add(self, lat, lon):
+        self.cells[self._cell(lat, lon)] = (lat, lon)
+
+
+def _in_zone(zone, lat, lon, inner_fraction):
+    d_sq = (lat - zone['center_lat']) ** 2 + (lon - zone['center_lon']) ** 2
+    radius_sq = zone['radius'] ** 2
+    return inner_fraction * radius_sq <= d_sq <= radius_sq
+
+
+def _random_zone_point(zone, rng, inner_fraction):
+    angle = rng.uniform(0, 2 * math.pi)
+    distance = zone['radius'] * math.sqrt(rng.uniform(inner_fraction, 1.0))
+    return zone['center_lat'] + distance * math.cos(angle), zone['center_lon'] + distance * math.sin(angle)
+
+
+def zone_candidates(zone, placed, rng, inner_fraction=0.2, k=30):
+    """Grow a maximal Poisson-disk set inside one zone around already placed sensors"""
+    min_distance = placed.min_distance
+    local = PoissonGrid(min_distance)
+    candidates = []
+    active = []
+
+    def try_add(lat, lon):
+        if _in_zone(zone, lat, lon, inner_fraction) and local.fits(lat, lon) and placed.fits(lat, lon):
+            local.add(lat, lon)
+            candidates.append((lat, lon))
+            active.append((lat, lon))
+            return True
+        return False
+
+    # Dart-throw seeds so zones split up by neighbouring sensors still get covered
+    for _ in range(k):
+        if try_add(*_random_zone_point(zone, rng, inner_fraction)):
+            while active:
+                slot = rng.randrange(len(active))
+                lat, lon = active[slot]
+                for _ in range(k):
+                    angle = rng.uniform(0, 2 * math.pi)
+                    distance = rng.uniform(min_distance, 2 * min_distance)
+                    if try_add(lat + distance * math.cos(angle), lon + distance * math.sin(angle)):
+                        break
+                else:
+                    active[slot] = active[-1]
+                    active.pop()
+    return candidates
+
+
+def poisson_disk_layout(zones, min_distance, rng, inner_fraction=0.2):
+    """Place zone['sensor_count'] sensors per zone, returning a list of (lat, lon) lists
+
+    Zones that cannot hold their sensor_count at min_distance are topped up with
+    unconstrained points and a warning, matching the old rejection sampler.
+    """
+    placed = PoissonGrid(min_distance)
+    layout = []
+    for zone in zones:
+        candidates = zone_candidates(zone, placed, rng, inner_fraction)
+        count = zone['sensor_count']
+        if len(candidates) >= count:
+            chosen = rng.sample(candidates, count)
+        else:
+            print(f"Warning: zone {zone['zone']} fits {len(candidates)} of {count} sensors at minimum spacing")
+            chosen = candidates + [_random_zone_point(zone, rng, inner_fraction) for _ in range(count - len(candidates))]
+        for lat, lon in chosen:
+            placed.add(lat, lon)
+        layout.append(chosen)
+    return layout
+
+
+def load_or_build_layout(path, key, build):
+    """Return the cached sensor list at path when its key matches, else build() and cache it"""
+    if path and os.path.exists(path):
+        try:
+            with open(path) as f:
+                cached = json.load(f)
+            if cached.get('key') == key:
+                return cached['sensors']
+        except (OSError, ValueError):
+            pass
+
+    sensors = build()
+    if path:
+        try:
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'key': key, 'sensors': sensors}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: could not cache sensor layout to {path}: {e}")
+    return sensors
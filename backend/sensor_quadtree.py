@@ -0,0 +1,145 @@
+import copy
+import math
+
+import numpy as np
+
+"""
+Sensor Quadtree (level-of-detail aggregation)
+---------------------------------------------
+- Implicit quadtree over a square covering every sensor: level L splits it into
+  2^L x 2^L nodes, stored as dense flat arrays (node = i * 2^L + j)
+- Each node aggregates its sensors: count, centroid, max temperature and the
+  number of sensors detecting fire (max PM2.5 follows from max temperature, since
+  the readings derive PM2.5 from temperature monotonically)
+- update() recomputes only the leaves holding changed sensors, then walks up one
+  level at a time, re-aggregating a parent only when one of its children changed
+- Nodes whose aggregates changed are flagged per level until take_changes(),
+  so zoomed-out clients get cluster deltas instead of raw sensor deltas
+- fork() gives another simulation on the same sensors its own aggregates while
+  sharing the (read-only) layout arrays
+"""
+
+
+class SensorQuadtree:
+    """Per-node reading summaries for zoomed-out map views"""
+
+    def __init__(self, lat, lon, max_depth=8):
+        self.max_depth = max_depth
+        side = 2 ** max_depth
+        if len(lat):
+            self.origin_lat, self.origin_lon = float(lat.min()), float(lon.min())
+            self.extent = max(float(lat.max()) - self.origin_lat, float(lon.max()) - self.origin_lon, 1e-6)
+        else:
+            self.origin_lat, self.origin_lon, self.extent = 0.0, 0.0, 1e-6
+        leaf_i = np.clip(((lat - self.origin_lat) / self.extent * side).astype(np.int64), 0, side - 1)
+        leaf_j = np.clip(((lon - self.origin_lon) / self.extent * side).astype(np.int64), 0, side - 1)
+        self.leaf = leaf_i * side + leaf_j
+
+        # Sensors grouped by leaf, so a leaf's members are order[start[leaf]:start[leaf + 1]]
+        self.order = np.argsort(self.leaf, kind='stable')
+        self.start = np.searchsorted(self.leaf[self.order], np.arange(side * side + 1))
+
+        self.count = [None] * (max_depth + 1)
+        self.center_lat = [None] * (max_depth + 1)
+        self.center_lon = [None] * (max_depth + 1)
+        count = np.bincount(self.leaf, minlength=side * side)
+        lat_sum = np.bincount(self.leaf, weights=lat, minlength=side * side)
+        lon_sum = np.bincount(self.leaf, weights=lon, minlength=side * side)
+        for level in range(max_depth, -1, -1):
+            with np.errstate(invalid='ignore', divide='ignore'):
+                self.center_lat[level] = lat_sum / count
+                self.center_lon[level] = lon_sum / count
+            self.count[level] = count
+            if level:
+                count, lat_sum, lon_sum = (self._reduce(values, level, np.sum) for values in (count, lat_sum, lon_sum))
+        self.occupied = [np.flatnonzero(count) for count in self.count]
+
+        self.max_temperature = [np.full(4 ** level, -np.inf) for level in range(max_depth + 1)]
+        self.fire_detected = [np.zeros(4 ** level, dtype=np.int64) for level in range(max_depth + 1)]
+        self.dirty = [np.zeros(4 ** level, dtype=bool) for level in range(max_depth + 1)]
+
+    def fork(self):
+        """A quadtree sharing this one's layout arrays, with its own copy of the aggregates"""
+        tree = copy.copy(self)
+        tree.max_temperature = [values.copy() for values in self.max_temperature]
+        tree.fire_detected = [values.copy() for values in self.fire_detected]
+        tree.dirty = [values.copy() for values in self.dirty]
+        return tree
+
+    def aggregate_nbytes(self):
+        """Bytes held by the per-tree aggregates (the part fork() copies)"""
+        return sum(values.nbytes for arrays in (self.max_temperature, self.fire_detected, self.dirty)
+                   for values in arrays)
+
+    @staticmethod
+    def _reduce(values, level, op):
+        """Combine each 2x2 block of children at level into their parent at level - 1"""
+        side = 2 ** (level - 1)
+        return op(values.reshape(side, 2, side, 2), axis=(1, 3)).reshape(-1)
+
+    def refresh(self, temperature, fire_detected):
+        """Recompute every node from scratch (after a reset or a new layout)"""
+        level = self.max_depth
+        size = 4 ** level
+        self.max_temperature[level] = np.full(size, -np.inf)
+        np.maximum.at(self.max_temperature[level], self.leaf, temperature)
+        self.fire_detected[level] = np.bincount(self.leaf, weights=fire_detected, minlength=size).astype(np.int64)
+        for level in range(self.max_depth, 0, -1):
+            self.max_temperature[level - 1] = self._reduce(self.max_temperature[level], level, np.max)
+            self.fire_detected[level - 1] = self._reduce(self.fire_detected[level], level, np.sum)
+        for level, nodes in enumerate(self.occupied):
+            self.dirty[level][nodes] = True
+
+    def update(self, rows, temperature, fire_detected):
+        """Re-aggregate the leaves holding `rows` and every ancestor whose children changed"""
+        if not len(rows):
+            return
+        level = self.max_depth
+        nodes = np.unique(self.leaf[rows])
+        lengths = self.start[nodes + 1] - self.start[nodes]
+        offsets = np.repeat(self.start[nodes] - (np.cumsum(lengths) - lengths), lengths)
+        members = self.order[np.arange(lengths.sum()) + offsets]
+        slot = np.repeat(np.arange(len(nodes)), lengths)
+
+        max_temperature = np.full(len(nodes), -np.inf)
+        np.maximum.at(max_temperature, slot, temperature[members])
+        fires = np.bincount(slot, weights=fire_detected[members], minlength=len(nodes)).astype(np.int64)
+
+        while True:
+            changed = (max_temperature != self.max_temperature[level][nodes]) | (fires != self.fire_detected[level][nodes])
+            nodes = nodes[changed]
+            if not len(nodes):
+                return
+            self.max_temperature[level][nodes] = max_temperature[changed]
+            self.fire_detected[level][nodes] = fires[changed]
+            self.dirty[level][nodes] = True
+            if level == 0:
+                return
+
+            # Parents of the changed nodes, recombined from all four children
+            side = 2 ** level
+            nodes = np.unique((nodes // side // 2) * (side // 2) + (nodes % side) // 2)
+            parent_i, parent_j = nodes // (side // 2), nodes % (side // 2)
+            children = [(2 * parent_i + a) * side + 2 * parent_j + b for a in (0, 1) for b in (0, 1)]
+            max_temperature = np.max([self.max_temperature[level][c] for c in children], axis=0)
+            fires = np.sum([self.fire_detected[level][c] for c in children], axis=0)
+            level -= 1
+
+    def take_changes(self):
+        """Per level, the nodes whose aggregates changed since the last call"""
+        changes = [np.flatnonzero(dirty) for dirty in self.dirty]
+        for dirty in self.dirty:
+            dirty[:] = False
+        return changes
+
+    def level_for_zoom(self, zoom, node_pixels):
+        """Deepest level whose nodes span at least node_pixels on a web-map at zoom"""
+        node_degrees = node_pixels * 360 / (256 * 2 ** zoom)
+        level = math.floor(math.log2(self.extent / node_degrees))
+        return min(max(level, 0), self.max_depth)
+
+    def nodes_in_box(self, level, min_lat, min_lon, max_lat, max_lon):
+        """Sorted occupied nodes at level whose centroid lies inside the box"""
+        nodes = self.occupied[level]
+        lat, lon = self.center_lat[level][nodes], self.center_lon[level][nodes]
+        return nodes[(lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)]
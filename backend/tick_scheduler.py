@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+"""
+Tick Scheduler
+--------------
+- Deadlines advance on the monotonic clock by exactly one interval per tick, so
+  work time never stretches the period and there is no cumulative drift
+- When a tick overruns by whole intervals the missed ticks are skipped (not
+  replayed in a burst), counted and reported
+- The interval can change between ticks (fast while fires burn, slow heartbeat
+  when quiet); wake() cuts the current wait short, e.g. when a command arrives
+"""
+
+
+class TickScheduler:
+    """Fixed-rate, drift-compensating scheduler for an asyncio update loop"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.deadline = None
+        self.ticks = 0
+        self.skipped = 0
+        self.last_work = 0.0      # Seconds the last tick spent working
+        self.max_work = 0.0       # Longest tick since start
+        self._work_started = None
+        self._wake = asyncio.Event()
+
+    def set_interval(self, interval):
+        """Change the period; takes effect from the next deadline"""
+        self.interval = interval
+
+    def wake(self):
+        """Start the next tick now instead of at its deadline"""
+        self._wake.set()
+
+    def begin_tick(self):
+        self._work_started = time.monotonic()
+        if self.deadline is None:
+            self.deadline = self._work_started
+
+    def end_tick(self):
+        self.ticks += 1
+        if self._work_started is not None:
+            self.last_work = time.monotonic() - self._work_started
+            self.max_work = max(self.max_work, self.last_work)
+
+    async def sleep_until_next(self):
+        """Sleep until the next deadline, skipping any ticks the last one overran"""
+        if self.deadline is None:
+            self.deadline = time.monotonic()
+        self.deadline += self.interval
+        now = time.monotonic()
+        if now >= self.deadline + self.interval:
+            missed = int((now - self.deadline) // self.interval)
+            self.skipped += missed
+            self.deadline += missed * self.interval
+            print(f"⏱️ Tick overloaded ({self.last_work * 1000:.0f} ms of work at {self.interval:.2f}s interval): "
+                  f"skipped {missed} tick(s), {self.skipped} total")
+
+        delay = self.deadline - now
+        if delay > 0 and not self._wake.is_set():
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+        else:
+            # Running late: still yield so clients and commands get served
+            await asyncio.sleep(0)
+        if self._wake.is_set():
+            # Woken early: restart the cadence from now
+            self._wake.clear()
+            self.deadline = time.monotonic()
+
+    def stats(self):
+        return {
+            'interval_seconds': self.interval,
+            'ticks': self.ticks,
+            'skipped_ticks': self.skipped,
+            'last_work_ms': round(self.last_work * 1000, 3),
+            'max_work_ms': round(self.max_work * 1000, 3),
+        }
@@ -0,0 +1,183 @@
+import struct
+
+import numpy as np
+
+"""
+Binary Sensor Wire Format (WebSocket subprotocol "phoenix.sensors.v1")
+----------------------------------------------------------------------
+Opt-in alternative to the JSON sensor_batch / sensor_delta messages. All
+integers and floats are little-endian. Every frame starts with a 24-byte header:
+
+    magic   4s   b"PHX1"
+    version u8   1
+    kind    u8   KIND_DICTIONARY | KIND_KEYFRAME | KIND_DELTA | KIND_CLUSTERS
+    flags   u16  FLAG_ROWS when a keyframe carries a row index (viewport keyframes),
+                 FLAG_PARTIAL when a cluster frame only holds changed clusters
+    seq     u32  update loop tick the frame was encoded at
+    count   u32  number of sensors (rows) or clusters in the frame
+    ts      u64  epoch milliseconds
+
+KIND_DICTIONARY (sent once per connection, before any keyframe):
+    payload  UTF-8 sensor ids joined by "\n"; row i of every later frame is sensor i
+
+KIND_KEYFRAME / KIND_DELTA, after the header:
+    summary  u32 active_fires, u32 sensors_detecting_fire, u32 sensors_elevated_temp,
+             u32 total_sensors, f32 max_temperature, f32 affected_area_m2
+    index    u32[count]   sensor rows (KIND_DELTA, or KIND_KEYFRAME with FLAG_ROWS;
+                          other keyframes cover rows 0..count-1)
+    columns  f32[count] each, in FLOAT_COLUMNS order
+             u8[count] each, in BYTE_COLUMNS order
+
+KIND_CLUSTERS (zoomed-out viewports), after the header:
+    summary  as above
+    level    u32          quadtree level of every cluster in the frame
+    node     u32[count]   quadtree node ids at that level
+    columns  u32[count] each, in CLUSTER_INT_COLUMNS order
+             f32[count] each, in CLUSTER_FLOAT_COLUMNS order
+
+A keyframe replaces the client's state: with FLAG_ROWS it holds only the sensors
+of the client's subscribed viewport. Column blocks are laid out exactly like
+SensorColumns, so a full keyframe body is the raw bytes of its two arrays with no
+per-value conversion.
+"""
+
+SUBPROTOCOL = "phoenix.sensors.v1"
+
+MAGIC = b"PHX1"
+VERSION = 1
+KIND_DICTIONARY = 0
+KIND_KEYFRAME = 1
+KIND_DELTA = 2
+KIND_CLUSTERS = 3
+
+FLAG_ROWS = 1
+FLAG_PARTIAL = 2
+
+FLOAT_COLUMNS = ("lat", "lon", "temperature", "pm25", "battery_level")
+BYTE_COLUMNS = ("status", "fire_detected")
+CLUSTER_INT_COLUMNS = ("count", "fire_detected")
+CLUSTER_FLOAT_COLUMNS = ("lat", "lon", "max_temperature", "max_pm25")
+
+HEADER = struct.Struct("<4sBBHIIQ")
+SUMMARY = struct.Struct("<IIIIff")
+
+
+class SensorColumns:
+    """Packed little-endian column blocks mirroring a sensor state, updated row by row"""
+
+    def __init__(self, count):
+        self.floats = np.zeros((len(FLOAT_COLUMNS), count), dtype="<f4")
+        self.bytes = np.zeros((len(BYTE_COLUMNS), count), dtype=np.uint8)
+
+    def update(self, rows, lat, lon, temperature, pm25, battery, status, fire_detected):
+        """Copy the given rows' readings (NumPy arrays aligned with rows) into the blocks"""
+        self.floats[0, rows] = lat
+        self.floats[1, rows] = lon
+        self.floats[2, rows] = temperature
+        self.floats[3, rows] = pm25
+        self.floats[4, rows] = battery
+        self.bytes[0, rows] = status
+        self.bytes[1, rows] = fire_detected
+
+
+def _pack_summary(summary):
+    return SUMMARY.pack(
+        summary["active_fires"],
+        summary["sensors_detecting_fire"],
+        summary["sensors_elevated_temp"],
+        summary["total_sensors"],
+        summary["max_temperature"],
+        summary["affected_area_m2"],
+    )
+
+
+def encode_dictionary(sensor_ids, seq, ts):
+    payload = "\n".join(sensor_ids).encode("utf-8")
+    return HEADER.pack(MAGIC, VERSION, KIND_DICTIONARY, 0, seq, len(sensor_ids), ts) + payload
+
+
+def encode_keyframe(columns, summary, seq, ts, rows=None):
+    """Full-state frame for every sensor, or only for `rows` (a viewport)"""
+    if rows is not None:
+        return b"".join((
+            HEADER.pack(MAGIC, VERSION, KIND_KEYFRAME, FLAG_ROWS, seq, len(rows), ts),
+            _pack_summary(summary),
+            rows.astype("<u4").tobytes(),
+            columns.floats[:, rows].tobytes(),
+            columns.bytes[:, rows].tobytes(),
+        ))
+    count = columns.floats.shape[1]
+    return b"".join((
+        HEADER.pack(MAGIC, VERSION, KIND_KEYFRAME, 0, seq, count, ts),
+        _pack_summary(summary),
+        memoryview(columns.floats),
+        memoryview(columns.bytes),
+    ))
+
+
+def encode_delta(columns, rows, summary, seq, ts):
+    return b"".join((
+        HEADER.pack(MAGIC, VERSION, KIND_DELTA, 0, seq, len(rows), ts),
+        _pack_summary(summary),
+        rows.astype("<u4").tobytes(),
+        columns.floats[:, rows].tobytes(),
+        columns.bytes[:, rows].tobytes(),
+    ))
+
+
+def encode_clusters(level, nodes, columns, summary, seq, ts, partial=False):
+    """Cluster summaries for quadtree nodes; columns maps column name -> array aligned with nodes"""
+    parts = [
+        HEADER.pack(MAGIC, VERSION, KIND_CLUSTERS, FLAG_PARTIAL if partial else 0, seq, len(nodes), ts),
+        _pack_summary(summary),
+        struct.pack("<I", level),
+        nodes.astype("<u4").tobytes(),
+    ]
+    parts += [np.asarray(columns[name]).astype("<u4").tobytes() for name in CLUSTER_INT_COLUMNS]
+    parts += [np.asarray(columns[name]).astype("<f4").tobytes() for name in CLUSTER_FLOAT_COLUMNS]
+    return b"".join(parts)
+
+
+def decode_frame(frame):
+    """Decode any frame into a dict; used by test clients and tooling"""
+    magic, version, kind, flags, seq, count, ts = HEADER.unpack_from(frame, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a {SUBPROTOCOL} frame")
+    offset = HEADER.size
+    decoded = {"kind": kind, "seq": seq, "count": count, "ts": ts}
+    if kind == KIND_DICTIONARY:
+        payload = bytes(frame[offset:]).decode("utf-8")
+        decoded["sensor_ids"] = payload.split("\n") if payload else []
+        return decoded
+
+    values = SUMMARY.unpack_from(frame, offset)
+    decoded["fire_summary"] = dict(zip(
+        ("active_fires", "sensors_detecting_fire", "sensors_elevated_temp",
+         "total_sensors", "max_temperature", "affected_area_m2"), values))
+    offset += SUMMARY.size
+    if kind == KIND_CLUSTERS:
+        decoded["level"], = struct.unpack_from("<I", frame, offset)
+        decoded["partial"] = bool(flags & FLAG_PARTIAL)
+        offset += 4
+        decoded["nodes"] = np.frombuffer(frame, dtype="<u4", count=count, offset=offset)
+        offset += 4 * count
+        for name in CLUSTER_INT_COLUMNS:
+            decoded[name] = np.frombuffer(frame, dtype="<u4", count=count, offset=offset)
+            offset += 4 * count
+        for name in CLUSTER_FLOAT_COLUMNS:
+            decoded[name] = np.frombuffer(frame, dtype="<f4", count=count, offset=offset)
+            offset += 4 * count
+        return decoded
+    if kind == KIND_DELTA or flags & FLAG_ROWS:
+        decoded["rows"] = np.frombuffer(frame, dtype="<u4", count=count, offset=offset)
+        offset += 4 * count
+    else:
+        decoded["rows"] = np.arange(count)
+    floats = np.frombuffer(frame, dtype="<f4", count=len(FLOAT_COLUMNS) * count, offset=offset)
+    offset += 4 * len(FLOAT_COLUMNS) * count
+    small = np.frombuffer(frame, dtype=np.uint8, count=len(BYTE_COLUMNS) * count, offset=offset)
+    for name, column in zip(FLOAT_COLUMNS, floats.reshape(len(FLOAT_COLUMNS), count)):
+        decoded[name] = column
+    for name, column in zip(BYTE_COLUMNS, small.reshape(len(BYTE_COLUMNS), count)):
+        decoded[name] = column
+    return decoded
@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+"""
+Arduino Fire Sensor Network WebSocket Server
+- Replays a FireSimData run (64x64 grid = 4,096 Arduino sensors) on ws://localhost:8765
+- Steps are simulated on a worker thread and streamed as soon as they are computed
+- Every step is encoded to its sensor_batch frame exactly once; playback, seeks and
+  timeline scrubbing send those cached bytes, so a client costs no encoding at all
+- Each client has its own playback cursor: play, pause, set_speed, set_step, reset
+- A client's outbound slot holds only the newest step frame, so a fast scrub or a
+  slow link skips intermediate steps instead of queueing them
+- Clients offering the "phoenix.raster.v1" subprotocol get each step as one compressed
+  binary raster (uint8 temperature + 2-bit state, see backend/raster_format.py);
+  during playback a step that follows the one the client holds goes out as an XOR delta
+- Every step frame is followed by a fire_perimeter message: GeoJSON MultiPolygons of the
+  burned area (BURNING | ASH) and the active front (BURNING), traced incrementally
+- Dispatch consoles connect to ws://localhost:8765/alerts instead: a low-volume feed
+  of fire_alerts (risk changes with hysteresis, ignitions, sensors lost) as steps are
+  computed, with ?since=<step> to catch up (a step not computed yet: alerts from that step on)
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import time
+import urllib.parse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import websockets
+
+from backend import metrics, raster_format
+from backend.alert_engine import AlertEngine, RISK_LEVELS
+from backend.fire_perimeter import FirePerimeter
+from backend.firesimheadless import ASH, BASE_LAT, BASE_LON, BURNING, CELL_SIZE_METERS, FireSimData
+from backend.firesimheadless import size as GRID_SIZE
+from backend.firesimheadless import steps as TOTAL_STEPS
+
+try:
+    import orjson  # Optional: several times faster than json for large sensor batches
+except ImportError:
+    orjson = None
+
+def encode_message(message):
+    """Serialize a message to UTF-8 JSON bytes, once, for every client that receives it"""
+    if orjson is not None:
+        return orjson.dumps(message)
+    return json.dumps(message, separators=(',', ':')).encode('utf-8')
+
+PORT = 8765
+METRICS_PORT = 9765  # Prometheus text at http://localhost:9765/metrics
+STEP_INTERVAL = 0.5  # Seconds per simulation step at 1x playback
+MIN_SPEED = 0.1
+MAX_SPEED = 20.0
+# Raster geo-transform, same cell -> lat/lon mapping as FireSimData's sensors
+RASTER_GEO = (BASE_LAT, BASE_LON, CELL_SIZE_METERS / 111000, CELL_SIZE_METERS / 111000)
+PERIMETER_TOLERANCE = 0.5  # Douglas-Peucker tolerance in cells (15 m)
+PERIMETER_MIN_AREA = 1.0  # Perimeter rings enclosing less than one cell are left out
+ALERTS_PATH = '/alerts'
+ALERT_MIN_LEVEL = RISK_LEVELS.index('CRITICAL')  # Risk changes into or out of CRITICAL and EXTREME
+ALERT_DEDUP_STEPS = 20  # Identical alerts for a sensor are not repeated within 20 steps
+ALERT_QUEUE_LIMIT = 256  # Alert messages buffered per console before it is dropped as too slow
+
+STEP_SECONDS = metrics.REGISTRY.histogram(
+    'phoenix_replay_step_seconds', 'Time to simulate one FireSimData step')
+ENCODE_SECONDS = metrics.REGISTRY.histogram(
+    'phoenix_encode_seconds', 'Time to encode one frame', labelnames=('kind', 'format'))
+FRAME_BYTES = metrics.REGISTRY.histogram(
+    'phoenix_frame_bytes', 'Encoded frame size', metrics.SIZE_BUCKETS, labelnames=('kind', 'format'))
+FRAMES_SENT = metrics.REGISTRY.counter('phoenix_frames_sent_total', 'Frames written to client sockets')
+FRAMES_SKIPPED = metrics.REGISTRY.counter(
+    'phoenix_frames_dropped_total', 'Step frames replaced by a newer step before the client got them')
+SEEKS = metrics.REGISTRY.counter('phoenix_replay_seeks_total', 'set_step / reset commands from clients')
+ALERTS = metrics.REGISTRY.counter('phoenix_alerts_total', 'Alert events raised', labelnames=('kind',))
+
+class ReplayFrames:
+    """The run being replayed: its FireSimData plus the encoded frames of every computed step"""
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.frames = []  # step -> encoded sensor_batch
+        self.raster_keyframes = []  # step -> raster frame
+        self.raster_deltas = []  # step -> XOR delta from the previous step, None where it would not be smaller
+        self.raster_body = None  # Uncompressed raster body of the last computed step
+        self.perimeters = []  # step -> encoded fire_perimeter
+        self.burned = FirePerimeter((GRID_SIZE, GRID_SIZE), RASTER_GEO, PERIMETER_TOLERANCE, PERIMETER_MIN_AREA)
+        self.burning = FirePerimeter((GRID_SIZE, GRID_SIZE), RASTER_GEO, PERIMETER_TOLERANCE, PERIMETER_MIN_AREA)
+        self.alerts = []  # step -> encoded fire_alerts, None for steps without events
+        # sim.sensors is in grid row-major order, like the raveled temperature and state arrays
+        self.alert_engine = AlertEngine(
+            sim.sensors.keys(),
+            [sensor['lat'] for sensor in sim.sensors.values()],
+            [sensor['lon'] for sensor in sim.sensors.values()],
+            dedup_window=ALERT_DEDUP_STEPS, min_level=ALERT_MIN_LEVEL)
+        self.alert_subscribers = set()
+        self.computed = asyncio.Condition()  # Notified whenever a step lands
+
+    def __len__(self):
+        return len(self.frames)
+
+    def nbytes(self):
+        return (sum(len(frame) for frame in self.frames)
+                + sum(len(frame) for frame in self.raster_keyframes)
+                + sum(len(frame) for frame in self.raster_deltas if frame is not None)
+                + sum(len(frame) for frame in self.perimeters))
+
+    def compute_step(self, step):
+        """Simulation thread: simulate `step` unless the run already holds it, and encode it"""
+        if step >= len(self.sim.grids):
+            started = time.perf_counter()
+            self.sim.step_once(step)
+            STEP_SECONDS.observe(time.perf_counter() - started)
+        return ((self.encode_step(step),) + self.encode_raster(step)
+                + (self.encode_perimeter(step), self.encode_alerts(step)))
+
+    def encode_step(self, step):
+        started = time.perf_counter()
+        sensors = self.sim.get_sensor_data_for_step(step)
+        spread = self.sim.spread_history[step]
+        frame = encode_message({
+            'type': 'sensor_batch',
+            'timestamp': datetime.now().isoformat(),
+            'step': step,
+            'sensors': sensors,
+            'spread_analysis': spread,
+            'statistics': {
+                'active_sensors': len(sensors),
+                'total_sensors': len(self.sim.sensors),
+                'max_temperature': spread['max_temperature'],
+                'avg_temperature': spread['avg_temperature'],
+                'affected_area_m2': spread['total_affected_area'],
+                'spread_rate_m2_per_step': spread['spread_rate'],
+                'fire_center': spread['fire_center'],
+            },
+        })
+        ENCODE_SECONDS.observe(time.perf_counter() - started, ('step', 'json'))
+        FRAME_BYTES.observe(len(frame), ('step', 'json'))
+        return frame
+
+    def encode_raster(self, step):
+        """(keyframe, delta or None) raster frames of a step"""
+        started = time.perf_counter()
+        grid = self.sim.grids[step]
+        body = raster_format.raster_body(self.sim.temperatures[step], grid)
+        keyframe = raster_format.encode_frame(step, body, grid.shape, RASTER_GEO)
+        delta = None
+        if self.raster_body is not None:
+            delta = raster_format.encode_frame(step, body, grid.shape, RASTER_GEO, self.raster_body)
+            if len(delta) >= len(keyframe):
+                delta = None
+        self.raster_body = body
+        ENCODE_SECONDS.observe(time.perf_counter() - started, ('step', 'raster'))
+        FRAME_BYTES.observe(len(keyframe), ('keyframe', 'raster'))
+        if delta is not None:
+            FRAME_BYTES.observe(len(delta), ('delta', 'raster'))
+        return keyframe, delta
+
+    def encode_perimeter(self, step):
+        """fire_perimeter message of a step; the tracers must see the steps in order"""
+        started = time.perf_counter()
+        grid = self.sim.grids[step]
+        burning = grid == BURNING
+        burned = burning | (grid == ASH)
+        self.burned.update(burned)
+        self.burning.update(burning)
+        cell_area = CELL_SIZE_METERS * CELL_SIZE_METERS
+        frame = encode_message({
+            'type': 'fire_perimeter',
+            'step': step,
+            'perimeter': {
+                'type': 'FeatureCollection',
+                'features': [
+                    self.burned.feature({'kind': 'burned', 'area_m2': int(burned.sum()) * cell_area}),
+                    self.burning.feature({'kind': 'burning', 'area_m2': int(burning.sum()) * cell_area}),
+                ],
+            },
+        })
+        ENCODE_SECONDS.observe(time.perf_counter() - started, ('perimeter', 'json'))
+        FRAME_BYTES.observe(len(frame), ('perimeter', 'json'))
+        return frame
+
+    def encode_alerts(self, step):
+        """fire_alerts message of a step, or None; the engine must see the steps in order"""
+        grid = self.sim.grids[step]
+        # A sensor in a burned-out (ASH) cell is treated as destroyed
+        events = self.alert_engine.update(step, self.sim.temperatures[step], grid == BURNING, grid != ASH)
+        if not events:
+            return None
+        for event in events:
+            ALERTS.inc(labels=(event['kind'],))
+        return encode_message({
+            'type': 'fire_alerts',
+            'step': step,
+            'timestamp': datetime.now().isoformat(),
+            'alerts': events,
+        })
+
+    async def run(self, executor):
+        """Compute every remaining step in order, publishing each frame as it is ready"""
+        loop = asyncio.get_running_loop()
+        for step in range(len(self.frames), TOTAL_STEPS):
+            frame, keyframe, delta, perimeter, alerts = await loop.run_in_executor(executor, self.compute_step, step)
+            self.alerts.append(alerts)
+            if alerts is not None:
+                for subscriber in list(self.alert_subscribers):
+                    if not subscriber.push(step, alerts):
+                        self.alert_subscribers.discard(subscriber)
+            async with self.computed:
+                self.perimeters.append(perimeter)
+                self.frames.append(frame)
+                self.raster_keyframes.append(keyframe)
+                self.raster_deltas.append(delta)
+                self.computed.notify_all()
+        print(f"✅ Simulation complete: {len(self.frames)} steps, {self.nbytes() / 2**20:.1f} MiB of cached frames")
+
+    async def wait_for(self, step):
+        """Block until `step` has been computed"""
+        if step < len(self.frames):
+            return
+        async with self.computed:
+            await self.computed.wait_for(lambda: step < len(self.frames))
+
+class ReplayClient:
+    """One viewer: a playback cursor and an outbound slot where newer step frames replace older ones"""
+
+    def __init__(self, websocket, frames, raster=False):
+        self.websocket = websocket
+        self.frames = frames
+        self.raster = raster  # Binary raster frames instead of sensor_batch JSON
+        self.step = 0
+        self.playing = False
+        self.speed = 1.0
+        self.control = deque()  # simulation_init / control_state, always delivered, in order
+        self.pending = None  # Newest step the writer has not sent yet
+        self.sent_step = None  # Step of the last frame written to the socket
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.wakeup = asyncio.Event()
+        self.changed = asyncio.Event()  # Cursor, speed or play state changed
+        self.writer_task = asyncio.create_task(self.writer())
+        self.player_task = asyncio.create_task(self.player())
+
+    def push_control(self, message):
+        self.control.append(encode_message(message))
+        self.wakeup.set()
+
+    def push_control_state(self):
+        self.push_control({'type': 'control_state', 'data': self.state()})
+
+    def state(self):
+        return {
+            'current_step': self.step,
+            'max_steps': TOTAL_STEPS,
+            'computed_steps': len(self.frames),
+            'is_playing': self.playing,
+            'playback_speed': self.speed,
+        }
+
+    def show(self, step):
+        """Move the cursor to a computed step and queue its frame"""
+        self.step = step
+        if self.pending is not None:
+            self.frames_skipped += 1
+            FRAMES_SKIPPED.inc()
+        self.pending = step
+        self.wakeup.set()
+
+    def frame_for(self, step):
+        """Encoded frame of step for this client; raster clients holding step - 1 get the delta"""
+        if not self.raster:
+            return self.frames.frames[step]
+        delta = self.frames.raster_deltas[step]
+        if delta is not None and self.sent_step == step - 1:
+            return delta
+        return self.frames.raster_keyframes[step]
+
+    def seek(self, step):
+        """Jump to step, clamped to the steps computed so far"""
+        if len(self.frames):
+            self.show(min(max(int(step), 0), len(self.frames) - 1))
+        self.changed.set()
+
+    def set_playing(self, playing):
+        self.playing = playing
+        self.changed.set()
+
+    def set_speed(self, speed):
+        speed = float(speed)
+        if not math.isfinite(speed):
+            raise ValueError(f"Playback speed must be finite, got {speed}")
+        self.speed = min(max(speed, MIN_SPEED), MAX_SPEED)
+        self.changed.set()
+
+    async def player(self):
+        """Advance the cursor every STEP_INTERVAL / speed seconds while playing
+
+        Each step is held for a full interval first; a seek, speed or play
+        state change restarts the hold, so a seek target is shown (not
+        skipped past) and a new speed applies from the moment it was set.
+        """
+        while True:
+            if not self.playing:
+                await self.changed.wait()
+                self.changed.clear()
+                continue
+            self.changed.clear()
+            try:
+                await asyncio.wait_for(self.changed.wait(), STEP_INTERVAL / self.speed)
+                continue  # Something changed: re-check and hold again
+            except asyncio.TimeoutError:
+                pass
+            if self.step + 1 >= TOTAL_STEPS:
+                self.playing = False  # End of the run
+                self.push_control_state()
+                continue
+            step = self.step
+            await self.frames.wait_for(step + 1)  # Playback can catch up with the simulation
+            if not self.playing or self.step != step:
+                continue  # Paused or seeked while waiting
+            self.show(step + 1)
+
+    async def writer(self):
+        try:
+            while True:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                while self.control or self.pending is not None:
+                    if self.control:
+                        await self.websocket.send(self.control.popleft(), text=True)
+                    else:
+                        step, self.pending = self.pending, None
+                        await self.websocket.send(self.frame_for(step), text=not self.raster)
+                        self.sent_step = step
+                        await self.websocket.send(self.frames.perimeters[step], text=True)
+                    self.frames_sent += 1
+                    FRAMES_SENT.inc()
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    def close(self):
+        self.writer_task.cancel()
+        self.player_task.cancel()
+
+class AlertSubscriber:
+    """A dispatch console on the alerts feed: every fire_alerts message, in order"""
+
+    def __init__(self, websocket, since=0, backlog=()):
+        self.websocket = websocket
+        self.since = since  # Alerts of earlier steps are not wanted
+        self.queue = deque(backlog)
+        self.limit = ALERT_QUEUE_LIMIT + len(self.queue)  # The catch-up backlog does not count
+        self.closed = False
+        self.wakeup = asyncio.Event()
+        self.wakeup.set()
+        self.writer_task = asyncio.create_task(self.writer())
+
+    def push(self, step, message):
+        """Queue a step's alerts; returns False once the subscriber is closed and should be dropped"""
+        if self.closed:
+            return False
+        if step < self.since:
+            return True
+        if len(self.queue) >= self.limit:
+            # Alerts must not be dropped silently: a console this far behind reconnects with ?since=
+            self.closed = True
+            self.writer_task.cancel()
+            asyncio.create_task(self.websocket.close(1013, 'alert feed too slow'))
+            return False
+        self.queue.append(message)
+        self.wakeup.set()
+        return True
+
+    async def writer(self):
+        try:
+            while True:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                while self.queue:
+                    await self.websocket.send(self.queue.popleft(), text=True)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+class FireReplayServer:
+    def __init__(self, sim):
+        self.frames = ReplayFrames(sim)
+        self.clients = {}  # websocket -> ReplayClient
+        # Simulation and frame encoding run in order on this one thread, off the event loop
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='fire-sim')
+        metrics.REGISTRY.gauge('phoenix_clients', 'Connected clients', function=lambda: len(self.clients))
+        metrics.REGISTRY.gauge('phoenix_replay_computed_steps', 'Steps simulated and encoded so far',
+                               function=lambda: len(self.frames))
+        metrics.REGISTRY.gauge('phoenix_replay_cache_bytes', 'Bytes of cached step frames',
+                               function=self.frames.nbytes)
+        metrics.REGISTRY.gauge('phoenix_alert_subscribers', 'Consoles on the alerts feed',
+                               function=lambda: len(self.frames.alert_subscribers))
+        metrics.REGISTRY.gauge('phoenix_client_queue_depth', 'Frames queued for all clients together',
+                               function=lambda: sum(len(c.control) + (c.pending is not None)
+                                                    for c in self.clients.values()))
+
+    def simulation_init(self, client):
+        sim = self.frames.sim
+        data = {
+            'total_steps': TOTAL_STEPS,
+            'sensor_count': len(sim.sensors),
+            'grid_size': GRID_SIZE,
+            'simulation_area_km2': (GRID_SIZE * CELL_SIZE_METERS / 1000) ** 2,
+            'base_coordinates': {'lat': BASE_LAT, 'lon': BASE_LON},
+            **client.state(),
+        }
+        if client.raster:
+            origin_lat, origin_lon, cell_lat, cell_lon = RASTER_GEO
+            data['raster'] = {
+                'width': GRID_SIZE,
+                'height': GRID_SIZE,
+                'temperature_offset': raster_format.TEMP_OFFSET,
+                'temperature_scale': raster_format.TEMP_SCALE,
+                # Texture corners [west, south, east, north]: the geo origin is the centre of cell (0, 0)
+                'bounds': [origin_lon - cell_lon / 2, origin_lat - cell_lat / 2,
+                           origin_lon + (GRID_SIZE - 0.5) * cell_lon, origin_lat + (GRID_SIZE - 0.5) * cell_lat],
+            }
+        return {'type': 'simulation_init', 'data': data}
+
+    async def register_client(self, websocket):
+        client = ReplayClient(websocket, self.frames, websocket.subprotocol == raster_format.SUBPROTOCOL)
+        self.clients[websocket] = client
+        print(f"📱 Client connected. Total: {len(self.clients)}")
+        client.push_control(self.simulation_init(client))
+        client.seek(0)  # First step, if it has been computed yet
+        return client
+
+    async def unregister_client(self, websocket):
+        client = self.clients.pop(websocket, None)
+        if client:
+            client.close()
+        print(f"📱 Client disconnected. Total: {len(self.clients)}")
+
+    async def handle_message(self, client, message):
+        """Handle playback commands from the frontend"""
+        try:
+            data = json.loads(message)
+            kind = data.get('type')
+            if kind == 'play':
+                client.set_playing(True)
+            elif kind == 'pause':
+                client.set_playing(False)
+            elif kind == 'set_speed':
+                client.set_speed(data.get('speed', 1.0))
+            elif kind in ('set_step', 'seek'):
+                SEEKS.inc()
+                client.seek(data.get('step', 0))
+            elif kind == 'reset':
+                SEEKS.inc()
+                client.set_playing(False)
+                client.seek(0)
+            else:
+                return
+            client.push_control_state()
+        except (json.JSONDecodeError, TypeError, ValueError, OverflowError):
+            print(f"❌ Invalid message: {message}")
+
+    async def handle_alerts(self, websocket, since):
+        """Alerts feed: the backlog from step `since` on, then alerts as steps are computed
+
+        A `since` beyond the computed steps waits for that step: alerts of the
+        steps computed in between are not sent.
+        """
+        frames = self.frames
+        backlog = [message for message in frames.alerts[since:] if message is not None]
+        subscriber = AlertSubscriber(websocket, since, backlog)
+        frames.alert_subscribers.add(subscriber)
+        print(f"🚨 Alert console connected. Total: {len(frames.alert_subscribers)}")
+        try:
+            await websocket.wait_closed()
+        finally:
+            frames.alert_subscribers.discard(subscriber)
+            subscriber.writer_task.cancel()
+            print(f"🚨 Alert console disconnected. Total: {len(frames.alert_subscribers)}")
+
+    async def handle_client(self, websocket):
+        url = urllib.parse.urlsplit(websocket.request.path)
+        if url.path == ALERTS_PATH:
+            try:
+                since = max(0, int(urllib.parse.parse_qs(url.query).get('since', ['0'])[0]))
+            except ValueError:
+                await websocket.close(1008, 'since must be a step number')
+                return
+            await self.handle_alerts(websocket, since)
+            return
+        client = await self.register_client(websocket)
+        try:
+            async for message in websocket:
+                await self.handle_message(client, message)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            await self.unregister_client(websocket)
+
+def select_subprotocol(connection, subprotocols):
+    """Accept the raster subprotocol when offered; clients offering nothing stay on JSON"""
+    if raster_format.SUBPROTOCOL in subprotocols:
+        return raster_format.SUBPROTOCOL
+    return None
+
+async def main(checkpoint_dir=None):
+    print("🚀 Starting Arduino Fire Sensor Network Server")
+    sim = FireSimData.resume(checkpoint_dir) if checkpoint_dir else FireSimData()
+    print(f"🔥 {len(sim.sensors)} Arduino sensors on a {GRID_SIZE}x{GRID_SIZE} grid, {TOTAL_STEPS} steps")
+    server = FireReplayServer(sim)
+
+    await metrics.serve_metrics("localhost", METRICS_PORT)
+    # Frames are shared bytes; per-message deflate would recompress each one for every client
+    async with websockets.serve(server.handle_client, "localhost", PORT,
+                                select_subprotocol=select_subprotocol, compression=None):
+        print(f"🌐 WebSocket server: ws://localhost:{PORT}")
+        print(f"📈 Metrics: http://localhost:{METRICS_PORT}/metrics")
+        await server.frames.run(server.executor)
+        await asyncio.Future()  # Keep serving the finished run
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arduino Fire Sensor Network WebSocket Server")
+    parser.add_argument('--checkpoint-dir', help="replay (and continue) a checkpointed FireSimData run")
+    args = parser.parse_args()
+    asyncio.run(main(args.checkpoint_dir))
@@ -1,7 +1,7 @@
 import { Layer } from "@deck.gl/core";
 import { HeatmapLayer } from "@deck.gl/aggregation-layers";
-import { ScatterplotLayer, TextLayer } from "@deck.gl/layers";
-import { SensorPoint } from "../(types)/sensor";
+import { GeoJsonLayer, ScatterplotLayer, TextLayer } from "@deck.gl/layers";
+import { FirePerimeterFeature, SensorPoint } from "../(types)/sensor";
 import { getColorRange } from "../(lib)/color";
 
 // Local helper types to avoid using `any`
@@ -47,6 +47,7 @@ interface FireLayersConfig {
     state: number;
     risk_level: string;
   }>;
+  firePerimeter?: FirePerimeterFeature[];
 }
 
 export function createFireLayers({
@@ -54,6 +55,7 @@ export function createFireLayers({
   data,
   fireStatistics,
   temperatureHotspots,
+  firePerimeter = [],
 }: FireLayersConfig): Layer[] {
   // Fire state colors
   const FIRE_STATE_COLORS: Record<number, [number, number, number]> = {
@@ -196,6 +198,24 @@ export function createFireLayers({
     }
   }
 
+  // Fire perimeter: burned area underneath, active front outlined on top
+  if (firePerimeter.length > 0) {
+    layerList.push(
+      new GeoJsonLayer<FirePerimeterFeature["properties"]>({
+        id: "fire-perimeter",
+        data: firePerimeter,
+        stroked: true,
+        filled: true,
+        getFillColor: (f): [number, number, number, number] =>
+          f.properties?.kind === "burning" ? [255, 69, 0, 60] : [47, 79, 79, 40],
+        getLineColor: (f): [number, number, number, number] =>
+          f.properties?.kind === "burning" ? [255, 140, 0, 230] : [200, 200, 200, 160],
+        lineWidthMinPixels: 2,
+        pickable: false,
+      })
+    );
+  }
+
   // Fire center indicator
   if (fireStatistics.fireCenter && fireStatistics.fireCenter.length === 2) {
     const [centerI, centerJ] = fireStatistics.fireCenter;
@@ -3,6 +3,7 @@
 import React, { useMemo } from "react";
 import Map from "react-map-gl/maplibre";
 import DeckGL from "@deck.gl/react";
+import { WebMercatorViewport } from "@deck.gl/core";
 import { ScatterplotLayer, TextLayer } from "@deck.gl/layers";
 import { useStore } from "../(lib)/store";
 import { ViewState, SensorPoint } from "../(types)/sensor";
@@ -30,7 +31,45 @@ const MAPLIBRE_STYLE = {
 };
 
 export default function SimpleFireMap() {
-  const { filteredPoints, actions, wsClient } = useStore();
+  const { filteredPoints, clusters, actions, wsClient } = useStore();
+
+  // Zoomed out: one circle per quadtree cluster, sized by sensor count
+  const clusterLayers = useMemo(() => {
+    if (clusters.length === 0) return [];
+
+    return [
+      new ScatterplotLayer({
+        id: "sensor-clusters",
+        data: clusters,
+        getPosition: (d) => [d.lon, d.lat],
+        getRadius: (d) => 10 + 4 * Math.sqrt(d.count),
+        getFillColor: (d) =>
+          d.fire_detected > 0
+            ? [255, 0, 0, 140]
+            : d.max_temperature > 30
+            ? [255, 165, 0, 120]
+            : [0, 200, 0, 100],
+        stroked: true,
+        getLineColor: [255, 255, 255, 255],
+        lineWidthMinPixels: 1,
+        radiusUnits: "pixels",
+        pickable: false,
+      }),
+      new TextLayer({
+        id: "sensor-cluster-counts",
+        data: clusters,
+        getPosition: (d) => [d.lon, d.lat],
+        getText: (d) =>
+          d.fire_detected > 0 ? `🔥 ${d.fire_detected}/${d.count}` : `${d.count}`,
+        getSize: 12,
+        getColor: [255, 255, 255, 255],
+        getTextAnchor: "middle",
+        getAlignmentBaseline: "center",
+        fontWeight: "bold",
+        pickable: false,
+      }),
+    ];
+  }, [clusters]);
 
   // Optimized sensor visualization with memoization
   const layers = useMemo(() => {
@@ -164,6 +203,15 @@ export default function SimpleFireMap() {
 
   const handleViewStateChange = ({ viewState }: { viewState: unknown }) => {
     actions.setView(viewState as Partial<ViewState>);
+
+    // Only ask the server for the sensors on screen
+    const view = viewState as ViewState & { width?: number; height?: number };
+    if (view.width && view.height) {
+      const [minLon, minLat, maxLon, maxLat] = new WebMercatorViewport(
+        view
+      ).getBounds();
+      actions.subscribeViewport([minLat, minLon, maxLat, maxLon], view.zoom);
+    }
   };
 
   const handleMapClick = (event: { coordinate?: number[] }) => {
@@ -239,7 +287,7 @@ export default function SimpleFireMap() {
           bearing: 0,
         }}
         controller={true}
-        layers={layers}
+        layers={[...clusterLayers, ...layers]}
         onViewStateChange={handleViewStateChange}
         onClick={handleMapClick}
         getTooltip={getTooltip}
@@ -41,6 +41,7 @@ export default function SmartConeMap() {
     fireSimulation,
     fireStatistics,
     temperatureHotspots,
+    firePerimeter,
   } = useStore();
 
   // Use createFireLayers function for advanced fire visualization
@@ -50,8 +51,9 @@ export default function SmartConeMap() {
       data: filteredPoints,
       fireStatistics,
       temperatureHotspots,
+      firePerimeter,
     });
-  }, [layerMode, filteredPoints, fireStatistics, temperatureHotspots]);
+  }, [layerMode, filteredPoints, fireStatistics, temperatureHotspots, firePerimeter]);
 
   const handleViewStateChange = ({ viewState }: { viewState: unknown }) => {
     actions.setView(viewState as Partial<ViewState>);
@@ -6,6 +6,8 @@ import {
   DEFAULT_VIEW,
   FireMessage,
   FireSpread,
+  FirePerimeterFeature,
+  SensorCluster,
 } from "../(types)/sensor";
 import { WSClient, createWSClient, ConnectionStatus } from "./ws";
 import { simulateSmoke } from "./sim";
@@ -14,6 +16,7 @@ interface StoreState {
   // Data
   points: SensorPoint[];
   maxPoints: number;
+  clusters: SensorCluster[]; // Zoomed-out viewport summaries, empty when showing raw sensors
 
   // WebSocket
   wsClient: WSClient | null;
@@ -44,6 +47,7 @@ interface StoreState {
 
   // Fire Spread Analysis
   fireSpread: FireSpread | null;
+  firePerimeter: FirePerimeterFeature[]; // Burned area and active front of the current step
   fireStatistics: {
     activeSensors: number;
     totalSensors: number;
@@ -83,6 +87,10 @@ interface StoreState {
     setTimeWindow: (minutes: number) => void;
     setView: (view: Partial<ViewState>) => void;
     recenter: () => void;
+    subscribeViewport: (
+      bbox: [number, number, number, number],
+      zoom: number
+    ) => void;
 
     // Fire Simulation Controls
     playFireSimulation: () => void;
@@ -101,6 +109,9 @@ interface StoreState {
 }
 
 export const useStore = create<StoreState>((set, get) => {
+  // Viewport subscriptions are sent once the map settles, not on every pan frame
+  let subscribeTimer: ReturnType<typeof setTimeout> | null = null;
+
   const updateFilteredPoints = () => {
     const { points, timeWindowMin } = get();
     const cutoffTime = Date.now() - timeWindowMin * 60 * 1000;
@@ -161,6 +172,7 @@ export const useStore = create<StoreState>((set, get) => {
     // Initial state
     points: [],
     maxPoints: 3000, // Increased for natural Arduino sensor network (82+ sensors)
+    clusters: [],
     wsClient: null,
     wsStatus: "disconnected",
     live: false,
@@ -187,6 +199,7 @@ export const useStore = create<StoreState>((set, get) => {
     },
 
     fireSpread: null,
+    firePerimeter: [],
     fireStatistics: {
       activeSensors: 0,
       totalSensors: 0,
@@ -263,6 +276,20 @@ export const useStore = create<StoreState>((set, get) => {
         set({ view: DEFAULT_VIEW });
       },
 
+      subscribeViewport: (bbox, zoom) => {
+        if (subscribeTimer) {
+          clearTimeout(subscribeTimer);
+        }
+        subscribeTimer = setTimeout(() => {
+          subscribeTimer = null;
+          const { wsClient } = get();
+          if (wsClient && wsClient.ws?.readyState === WebSocket.OPEN) {
+            // bbox is [min_lat, min_lon, max_lat, max_lon]
+            wsClient.ws.send(JSON.stringify({ type: "subscribe", bbox, zoom }));
+          }
+        }, 250);
+      },
+
       simulateSmoke: () => {
         const { simulationCancel, view } = get();
 
@@ -338,6 +365,23 @@ export const useStore = create<StoreState>((set, get) => {
           !("step" in message)
         ) {
           // Handle simple fire system messages
+          if (message.viewport) {
+            // A viewport keyframe replaces the client's state: sensors outside the box go away
+            set({ clusters: [], points: [], filteredPoints: [] });
+          }
+          get().actions.addPoints(message.sensors);
+        } else if (message.type === "sensor_clusters") {
+          if (message.keyframe) {
+            set({ clusters: message.clusters, points: [], filteredPoints: [] });
+          } else {
+            const byId = new Map(get().clusters.map((c) => [c.id, c]));
+            for (const cluster of message.clusters) {
+              byId.set(cluster.id, cluster);
+            }
+            set({ clusters: Array.from(byId.values()) });
+          }
+        } else if (message.type === "sensor_delta") {
+          // Changed sensors only; merged into the existing points by id
           get().actions.addPoints(message.sensors);
         } else if (message.type === "simulation_init") {
           set({
@@ -396,6 +440,8 @@ export const useStore = create<StoreState>((set, get) => {
           }));
         } else if (message.type === "hotspots") {
           set({ temperatureHotspots: message.data });
+        } else if (message.type === "fire_perimeter") {
+          set({ firePerimeter: message.perimeter.features });
         }
       },
     },
@@ -109,9 +109,20 @@ export class WSClient {
         const data = JSON.parse(event.data);
         const message = FireMessageSchema.parse(data);
 
-        // Throttle message processing for performance (max 10fps)
-        if (!this.lastMessageTime || Date.now() - this.lastMessageTime > 100) {
-          this.options.onMessage(message);
+        // Throttle replay step frames for performance (max 10fps): each replaces the last,
+        // so dropping one is harmless. Everything else passes through: simple-system keyframes
+        // are the only resync point, deltas (sensor or cluster) apply on top of them, and
+        // fire perimeters arrive right behind the step frame they outline.
+        const throttled = message.type === "sensor_batch" && "step" in message;
+        if (
+          throttled &&
+          this.lastMessageTime &&
+          Date.now() - this.lastMessageTime <= 100
+        ) {
+          return;
+        }
+        this.options.onMessage(message);
+        if (throttled) {
           this.lastMessageTime = Date.now();
         }
       } catch (error) {
@@ -167,7 +178,15 @@ export function createWSClient(
   onStatusChange?: (status: ConnectionStatus) => void,
   onError?: (error: Error) => void
 ): WSClient {
-  const url = process.env.NEXT_PUBLIC_WS_URL || "ws://localhost:8766";
+  const base = process.env.NEXT_PUBLIC_WS_URL || "ws://localhost:8766";
+  // Opening the map with ?session=team-a joins that team's isolated simulation
+  const session =
+    typeof window !== "undefined"
+      ? new URLSearchParams(window.location.search).get("session")
+      : null;
+  const url = session
+    ? `${base}${base.includes("?") ? "&" : "?"}session=${encodeURIComponent(session)}`
+    : base;
 
   return new WSClient({
     url,
@@ -104,6 +104,29 @@ export const HotspotsSchema = z.object({
   ),
 });
 
+// Fire perimeter of a replay step: GeoJSON MultiPolygons (lon/lat), one feature
+// for the burned area (BURNING + ASH) and one for the active front (BURNING)
+export const FirePerimeterFeatureSchema = z.object({
+  type: z.literal("Feature"),
+  properties: z.object({
+    kind: z.enum(["burned", "burning"]),
+    area_m2: z.number(),
+  }),
+  geometry: z.object({
+    type: z.literal("MultiPolygon"),
+    coordinates: z.array(z.array(z.array(z.array(z.number())))),
+  }),
+});
+
+export const FirePerimeterSchema = z.object({
+  type: z.literal("fire_perimeter"),
+  step: z.number(),
+  perimeter: z.object({
+    type: z.literal("FeatureCollection"),
+    features: z.array(FirePerimeterFeatureSchema),
+  }),
+});
+
 // Simple fire system message schema
 export const SimpleFireBatchSchema = z.object({
   type: z.literal("sensor_batch"),
@@ -118,6 +141,49 @@ export const SimpleFireBatchSchema = z.object({
       affected_area_m2: z.number(),
     })
     .optional(),
+  // Present when the client subscribed to a viewport: sensors holds only that box
+  viewport: z
+    .object({
+      bbox: z.array(z.number()).length(4),
+      zoom: z.number().nullable(),
+      level: z.number().nullable().optional(),
+      sensor_count: z.number(),
+      cluster_count: z.number().optional(),
+    })
+    .nullable()
+    .optional(),
+  timestamp: z.string(),
+});
+
+// Simple fire system delta: only the sensors whose readings changed since the last tick
+export const SimpleFireDeltaSchema = z.object({
+  type: z.literal("sensor_delta"),
+  seq: z.number(),
+  sensors: z.array(SensorPointSchema),
+  fire_summary: SimpleFireBatchSchema.shape.fire_summary,
+  timestamp: z.string(),
+});
+
+// Zoomed-out viewports: quadtree cluster summaries instead of raw sensors.
+// keyframe=true replaces the clusters, otherwise only changed clusters are sent.
+export const SensorClusterSchema = z.object({
+  id: z.string(),
+  lat: z.number(),
+  lon: z.number(),
+  count: z.number(),
+  max_temperature: z.number(),
+  max_pm25: z.number(),
+  fire_detected: z.number(),
+});
+
+export const SimpleFireClustersSchema = z.object({
+  type: z.literal("sensor_clusters"),
+  seq: z.number(),
+  level: z.number(),
+  keyframe: z.boolean(),
+  clusters: z.array(SensorClusterSchema),
+  fire_summary: SimpleFireBatchSchema.shape.fire_summary,
+  viewport: SimpleFireBatchSchema.shape.viewport,
   timestamp: z.string(),
 });
 
@@ -126,14 +192,22 @@ export const FireMessageSchema = z.union([
   SimulationInitSchema,
   ControlStateSchema,
   HotspotsSchema,
+  FirePerimeterSchema,
   SimpleFireBatchSchema,
+  SimpleFireDeltaSchema,
+  SimpleFireClustersSchema,
 ]);
 
 export type SensorBatch = z.infer<typeof SensorBatchSchema>;
 export type SimpleFireBatch = z.infer<typeof SimpleFireBatchSchema>;
+export type SimpleFireDelta = z.infer<typeof SimpleFireDeltaSchema>;
+export type SensorCluster = z.infer<typeof SensorClusterSchema>;
+export type SimpleFireClusters = z.infer<typeof SimpleFireClustersSchema>;
 export type SimulationInit = z.infer<typeof SimulationInitSchema>;
 export type ControlState = z.infer<typeof ControlStateSchema>;
 export type Hotspots = z.infer<typeof HotspotsSchema>;
+export type FirePerimeterFeature = z.infer<typeof FirePerimeterFeatureSchema>;
+export type FirePerimeter = z.infer<typeof FirePerimeterSchema>;
 export type FireMessage = z.infer<typeof FireMessageSchema>;
 
 // UI types
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Load test for the Simple Arduino Fire Detection System
+- Opens thousands of concurrent simulated clients against ws://localhost:8766,
+  spread over several client processes so the load generator is not the bottleneck
+- Mix of JSON and binary-subprotocol clients; some read slowly, a few send
+  start_fire / clear_fires at configurable rates
+- Measures tick-to-receive latency (p50/p95/p99) from the encode timestamp each
+  delta frame carries, bytes and frames per client, and the server's CPU and memory.
+  Slow clients' latency includes their own backlog, so it is reported separately
+- Writes a JSON report; --compare prints the change against an earlier report
+
+Examples:
+    python load-test-simple-system.py --start-server --clients 2000 --duration 60
+    python load-test-simple-system.py --server-pid 4242 --compare load-test-report-main.json
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import websockets
+
+from backend import wire_format
+
+# Fires are started at random inside the sensor network's bounding box
+FIRE_BOX = (34.19, -118.20, 34.33, -118.05)  # (min_lat, min_lon, max_lat, max_lon)
+SAMPLE_INTERVAL = 0.5  # Seconds between server CPU / memory samples
+
+def delta_timestamp(message):
+    """Encode time (epoch seconds) of a delta frame, None for keyframes and control frames
+
+    Keyframes are cached on the server until the state changes or the next
+    keyframe interval starts, so their timestamp can be up to an interval older
+    than the tick that sent them; only deltas are encoded fresh every tick.
+    """
+    if isinstance(message, bytes):
+        magic, version, kind, flags, seq, count, ts = wire_format.HEADER.unpack_from(message, 0)
+        if kind == wire_format.KIND_DELTA or (kind == wire_format.KIND_CLUSTERS and flags & wire_format.FLAG_PARTIAL):
+            return ts / 1000
+        return None
+    data = json.loads(message)
+    if data.get('type') == 'sensor_delta' or (data.get('type') == 'sensor_clusters' and not data.get('keyframe')):
+        return datetime.fromisoformat(data['timestamp']).timestamp()
+    return None
+
+async def send_commands(websocket, rng, args, deadline):
+    """Send start_fire / clear_fires as Poisson processes at the per-commander rates"""
+    rates = {'start_fire': args.fire_rate / args.commanders, 'clear_fires': args.clear_rate / args.commanders}
+    next_at = {kind: time.time() + rng.expovariate(rate) for kind, rate in rates.items() if rate > 0}
+    while next_at:
+        kind = min(next_at, key=next_at.get)
+        if next_at[kind] >= deadline:
+            return
+        await asyncio.sleep(max(0, next_at[kind] - time.time()))
+        if kind == 'start_fire':
+            command = {'type': 'start_fire', 'lat': rng.uniform(FIRE_BOX[0], FIRE_BOX[2]),
+                       'lon': rng.uniform(FIRE_BOX[1], FIRE_BOX[3]), 'intensity': rng.uniform(0.5, 1.0)}
+        else:
+            command = {'type': 'clear_fires'}
+        await websocket.send(json.dumps(command))
+        next_at[kind] += rng.expovariate(rates[kind])
+
+async def run_client(index, args, start_at, deadline, results):
+    """One simulated viewer, recording latency samples and byte counts into results"""
+    rng = random.Random(args.seed * 100003 + index)
+    binary = rng.random() < args.binary_fraction
+    slow = rng.random() < args.slow_fraction
+    commander = index < args.commanders
+    url = f"{args.url}?session={args.session_prefix}{index % args.sessions}" if args.sessions > 1 else args.url
+    kwargs = {'subprotocols': [wire_format.SUBPROTOCOL]} if binary else {}
+    received = frames = 0
+
+    await asyncio.sleep(max(0, start_at - time.time()))
+    try:
+        async with websockets.connect(url, max_size=None, open_timeout=60, **kwargs) as websocket:
+            results['connected'] += 1
+            commands = asyncio.create_task(send_commands(websocket, rng, args, deadline)) if commander else None
+            try:
+                while True:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        message = await asyncio.wait_for(websocket.recv(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                    now = time.time()
+                    received += len(message)
+                    frames += 1
+                    sent_at = delta_timestamp(message)
+                    if sent_at is not None:
+                        results['slow_latencies' if slow else 'latencies'].append(now - sent_at)
+                    if slow:
+                        await asyncio.sleep(args.slow_delay)
+            finally:
+                if commands:
+                    commands.cancel()
+    except websockets.exceptions.ConnectionClosed as e:
+        results['disconnected'] += 1
+        if e.rcvd is not None and e.rcvd.code == 1013:
+            results['dropped_as_slow'] += 1
+    except (OSError, asyncio.TimeoutError, websockets.exceptions.InvalidHandshake):
+        results['failed'] += 1
+    results['bytes'].append(received)
+    results['frames'].append(frames)
+    results['kind'].append('slow' if slow else ('binary' if binary else 'json'))
+
+async def run_clients(indices, args, start_time):
+    results = {'connected': 0, 'failed': 0, 'disconnected': 0, 'dropped_as_slow': 0,
+               'latencies': [], 'slow_latencies': [], 'bytes': [], 'frames': [], 'kind': []}
+    deadline = start_time + args.ramp + args.duration
+    await asyncio.gather(*(
+        run_client(index, args, start_time + args.ramp * index / args.clients, deadline, results)
+        for index in indices
+    ))
+    return results
+
+def client_process(indices, args, start_time):
+    """Entry point of one load-generator process"""
+    raise_file_limit()
+    return asyncio.run(run_clients(indices, args, start_time))
+
+def raise_file_limit():
+    """Thousands of sockets need more than the usual 1024 file descriptors"""
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+def process_tree(pid):
+    """pid plus all its descendants (fan-out workers), read from /proc"""
+    pids = [pid]
+    for child_pid in pids:
+        try:
+            with open(f"/proc/{child_pid}/task/{child_pid}/children") as f:
+                pids += [int(child) for child in f.read().split()]
+        except OSError:
+            pass
+    return pids
+
+def read_process_usage(pid):
+    """(cpu seconds, rss bytes) of a process tree, None where /proc is unavailable"""
+    cpu_ticks = rss_pages = 0
+    for child_pid in process_tree(pid):
+        try:
+            with open(f"/proc/{child_pid}/stat") as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            cpu_ticks += int(fields[11]) + int(fields[12])  # utime + stime
+            rss_pages += int(fields[21])
+        except (OSError, IndexError, ValueError):
+            if child_pid == pid:
+                return None
+    return cpu_ticks / os.sysconf('SC_CLK_TCK'), rss_pages * os.sysconf('SC_PAGE_SIZE')
+
+async def sample_server(pid, samples, stop):
+    """Append (cpu percent, rss bytes) every SAMPLE_INTERVAL until stop is set"""
+    last = read_process_usage(pid)
+    last_time = time.monotonic()
+    while last is not None and not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), SAMPLE_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        usage = read_process_usage(pid)
+        if usage is None:
+            return
+        now = time.monotonic()
+        samples.append(((usage[0] - last[0]) / (now - last_time) * 100, usage[1]))
+        last, last_time = usage, now
+
+def percentile_summary(values, scale=1.0):
+    if not len(values):
+        return None
+    values = np.asarray(values) * scale
+    return {
+        'p50': round(float(np.percentile(values, 50)), 3),
+        'p95': round(float(np.percentile(values, 95)), 3),
+        'p99': round(float(np.percentile(values, 99)), 3),
+        'max': round(float(values.max()), 3),
+        'mean': round(float(values.mean()), 3),
+    }
+
+def build_info():
+    """Git commit of the tree under test, so reports from different builds can be told apart"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True,
+                                    text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip())
+    except OSError:
+        return {'git_commit': None, 'git_dirty': None}
+    return {'git_commit': commit or None, 'git_dirty': dirty}
+
+def build_report(args, merged, samples, elapsed):
+    total_bytes = sum(merged['bytes'])
+    total_frames = sum(merged['frames'])
+    kinds = np.array(merged['kind'])
+    per_kind = {
+        kind: percentile_summary(np.array(merged['bytes'])[kinds == kind])
+        for kind in ('json', 'binary', 'slow') if (kinds == kind).any()
+    }
+    server = None
+    if samples:
+        cpu = [sample[0] for sample in samples]
+        rss = [sample[1] for sample in samples]
+        server = {
+            'cpu_percent_mean': round(float(np.mean(cpu)), 1),
+            'cpu_percent_max': round(float(np.max(cpu)), 1),
+            'rss_mb_mean': round(float(np.mean(rss)) / 2**20, 1),
+            'rss_mb_max': round(float(np.max(rss)) / 2**20, 1),
+        }
+    return {
+        'build': build_info(),
+        'started_at': datetime.now().isoformat(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('report', 'compare')},
+        'clients': {
+            'requested': args.clients,
+            'connected': merged['connected'],
+            'failed': merged['failed'],
+            'disconnected_by_server': merged['disconnected'],
+            'dropped_as_slow': merged['dropped_as_slow'],
+        },
+        'latency_ms': percentile_summary(merged['latencies'], 1000),
+        'latency_samples': len(merged['latencies']),
+        'slow_client_latency_ms': percentile_summary(merged['slow_latencies'], 1000),
+        'bytes_per_client': percentile_summary(merged['bytes']),
+        'bytes_per_client_by_kind': per_kind,
+        'frames_per_client': percentile_summary(merged['frames']),
+        'throughput': {
+            'frames_per_second': round(total_frames / elapsed, 1),
+            'megabytes_per_second': round(total_bytes / elapsed / 2**20, 3),
+        },
+        'server': server,
+    }
+
+def flatten(report, prefix=''):
+    """{'a.b': number} for every number in a nested report"""
+    values = {}
+    for key, value in (report or {}).items():
+        if isinstance(value, dict):
+            values.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[f"{prefix}{key}"] = value
+    return values
+
+def print_comparison(report, baseline):
+    """Print every shared metric with its change against the baseline report"""
+    print(f"\n📊 Compared with {baseline['build'].get('git_commit')} ({baseline.get('started_at')})")
+    old, new = flatten({k: baseline.get(k) for k in ('clients', 'latency_ms', 'bytes_per_client', 'throughput', 'server')}), \
+        flatten({k: report.get(k) for k in ('clients', 'latency_ms', 'bytes_per_client', 'throughput', 'server')})
+    for key in sorted(set(old) & set(new)):
+        change = f"{(new[key] - old[key]) / old[key] * 100:+.1f}%" if old[key] else "n/a"
+        print(f"   {key:<32} {old[key]:>14,.3f} -> {new[key]:>14,.3f}  {change}")
+
+def print_summary(report):
+    clients = report['clients']
+    print(f"👥 Clients: {clients['connected']}/{clients['requested']} connected, {clients['failed']} failed, "
+          f"{clients['disconnected_by_server']} disconnected ({clients['dropped_as_slow']} as too slow)")
+    latency = report['latency_ms']
+    if latency:
+        print(f"⏱️ Tick-to-receive latency: p50 {latency['p50']:.1f} ms, p95 {latency['p95']:.1f} ms, "
+              f"p99 {latency['p99']:.1f} ms, max {latency['max']:.1f} ms ({report['latency_samples']} deltas)")
+    else:
+        print("⏱️ No delta frames received (start fires with --fire-rate to get per-tick deltas)")
+    per_client = report['bytes_per_client']
+    if per_client:
+        print(f"📦 Bytes per client: mean {per_client['mean'] / 1024:.1f} KiB, p99 {per_client['p99'] / 1024:.1f} KiB; "
+              f"{report['throughput']['megabytes_per_second']:.2f} MiB/s total")
+    server = report['server']
+    if server:
+        print(f"🖥️ Server: CPU {server['cpu_percent_mean']:.0f}% mean / {server['cpu_percent_max']:.0f}% max, "
+              f"RSS {server['rss_mb_max']:.0f} MiB max")
+
+async def main(args):
+    raise_file_limit()
+    server_process = None
+    server_pid = args.server_pid
+    if args.start_server:
+        command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'simple-arduino-fire.py')]
+        if args.server_workers:
+            command += ['--workers', str(args.server_workers)]
+        server_process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+        server_pid = server_process.pid
+        await asyncio.sleep(args.server_startup)
+
+    print(f"🔥 Load testing {args.url}: {args.clients} clients over {args.processes} processes, "
+          f"{args.duration:.0f}s after a {args.ramp:.0f}s ramp")
+    samples = []
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_server(server_pid, samples, stop)) if server_pid else None
+
+    start_time = time.time() + 1.0
+    chunks = [range(start, args.clients, args.processes) for start in range(args.processes)]
+    loop = asyncio.get_running_loop()
+    try:
+        with ProcessPoolExecutor(args.processes, mp_context=multiprocessing.get_context('spawn')) as pool:
+            parts = await asyncio.gather(*(
+                loop.run_in_executor(pool, client_process, list(chunk), args, start_time) for chunk in chunks))
+    finally:
+        stop.set()
+        if sampler:
+            await sampler
+        if server_process:
+            server_process.terminate()
+            server_process.wait()
+
+    merged = {key: ([] if isinstance(value, list) else 0) for key, value in parts[0].items()}
+    for part in parts:
+        for key, value in part.items():
+            merged[key] += value
+    report = build_report(args, merged, samples, args.duration + args.ramp)
+    print_summary(report)
+
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Report written to {args.report}")
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(report, json.load(f))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test the Simple Arduino Fire Detection System")
+    parser.add_argument('--url', default='ws://localhost:8766/')
+    parser.add_argument('--clients', type=int, default=1000, help="concurrent simulated clients")
+    parser.add_argument('--processes', type=int, default=max(1, min(8, os.cpu_count() or 1)),
+                        help="load-generator processes the clients are spread over")
+    parser.add_argument('--duration', type=float, default=30.0, help="seconds to measure once every client is connected")
+    parser.add_argument('--ramp', type=float, default=5.0, help="seconds over which clients connect")
+    parser.add_argument('--binary-fraction', type=float, default=0.5, help="share of clients on the binary subprotocol")
+    parser.add_argument('--slow-fraction', type=float, default=0.05, help="share of clients that read slowly")
+    parser.add_argument('--slow-delay', type=float, default=2.0, help="seconds a slow client waits after each frame")
+    parser.add_argument('--commanders', type=int, default=2, help="clients that send fire commands")
+    parser.add_argument('--fire-rate', type=float, default=0.5, help="start_fire commands per second, all commanders together")
+    parser.add_argument('--clear-rate', type=float, default=0.02, help="clear_fires commands per second, all commanders together")
+    parser.add_argument('--sessions', type=int, default=1, help="spread clients over this many server sessions")
+    parser.add_argument('--session-prefix', default='load-')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--server-pid', type=int, help="server process to sample CPU and memory from (Linux /proc)")
+    parser.add_argument('--start-server', action='store_true', help="start simple-arduino-fire.py for the run and sample it")
+    parser.add_argument('--server-workers', type=int, default=0, help="--workers for the started server")
+    parser.add_argument('--server-startup', type=float, default=3.0, help="seconds to wait for the started server")
+    parser.add_argument('--report', default='load-test-report.json', help="where to write the JSON report")
+    parser.add_argument('--compare', help="earlier report to compare against")
+    args = parser.parse_args()
+    args.commanders = min(args.commanders, args.clients)
+    args.processes = max(1, min(args.processes, args.clients))
+    return args
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
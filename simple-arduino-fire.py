@@ -9,16 +9,50 @@ Simple Arduino Fire Detection System
 - Real emergency response simulation with elevation & battery modeling
 """
 
+import argparse
 import asyncio
+import multiprocessing
+import numpy as np
 import websockets
 import random
 import json
 import math
+import os
+import re
+import tempfile
 import time
+import urllib.parse
+import zipfile
+import zlib
 from datetime import datetime
 
-# Arduino sensor network naturally distributed in forest area (~80 sensors)
-FOREST_SENSORS = []
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.checkpoint import CheckpointWriter, pack_json, unpack_json
+from backend.fire_raster import FireInfluenceRaster
+from backend.sensor_index import SensorGridIndex
+from backend.sensor_layout import load_or_build_layout, poisson_disk_layout
+from backend.sensor_quadtree import SensorQuadtree
+from backend.tick_scheduler import TickScheduler
+from backend import fanout_channel, metrics, wire_format
+
+try:
+    import orjson  # Optional: several times faster than json for large sensor batches
+except ImportError:
+    orjson = None
+
+def encode_message(message):
+    """Serialize a message to UTF-8 JSON bytes, once, for every client that receives it"""
+    if orjson is not None:
+        return orjson.dumps(message)
+    return json.dumps(message, separators=(',', ':')).encode('utf-8')
+
+# Sensor status codes (SimpleFireSystem.status_code indexes STATUS_NAMES)
+STATUS_NORMAL = 0
+STATUS_ELEVATED = 1
+STATUS_FIRE = 2
+STATUS_NAMES = ['normal', 'elevated_temp', 'fire_detected']
 
 # Define forest zones in Angeles National Forest - Dense green forest, highly fire-prone, NO OCEAN
 forest_zones = [
@@ -34,177 +68,725 @@ forest_zones = [
     {'center_lat': 34.2100, 'center_lon': -118.1100, 'radius': 0.018, 'sensor_count': 8, 'zone': 'pasadena_watershed'},
 ]
 
-sensor_id = 1
 MIN_DISTANCE = 0.005  # Minimum ~500m between sensors to prevent overlap
+INDEX_CELL_SIZE = 0.005  # ~500m buckets for fire-to-sensor proximity queries
+FIRE_RASTER_CELL_SIZE = 0.001  # ~100m cells of the merged fire-influence grid
+FIRE_START_RADIUS = 0.001  # Fire radius (degrees) at ignition
+FIRE_GROWTH_RATE = 0.0005  # Fire radius growth (degrees per second)
+TICK_INTERVAL_ACTIVE = 0.5  # Seconds between ticks while fires are burning
+TICK_INTERVAL_IDLE = 5.0  # Heartbeat interval when no fires are active
+QUADTREE_DEPTH = 8  # Deepest cluster level: 256x256 nodes over the sensor bounds
+CLUSTER_MAX_ZOOM = 11  # Viewports zoomed out below this get cluster summaries instead of sensors
+CLUSTER_PIXELS = 64  # Target on-screen size of one cluster
+KEYFRAME_INTERVAL = 15  # Full sensor_batch every N ticks; sensor_delta in between
+MAX_PENDING_DELTAS = 8  # Deltas queued per client before they collapse into one fresh keyframe
+CLIENT_LAG_WARN = 10.0  # Seconds behind before a client is reported as lagging
+CLIENT_LAG_LIMIT = 60.0  # Seconds behind before a client is disconnected
+DEFAULT_SESSION = 'default'  # Session for clients that don't ask for one
+SESSION_NAME_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,64}')  # Also the spill file name
+SESSION_MEMORY_LIMIT = 512 * 1024 * 1024  # Bytes of resident session state before idle sessions are spilled
+SESSION_IDLE_TIMEOUT = 600.0  # Seconds without clients before a session is spilled anyway
+SESSION_SWEEP_INTERVAL = 30.0  # Seconds between idle-session sweeps
+LAYOUT_SEED = 65  # Same seed -> same sensor layout on every start
+LAYOUT_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.sensor_layout.json')
+FANOUT_SOCKET = os.path.join(tempfile.gettempdir(), 'phoenix-fire-fanout.sock')  # Simulation process <-> fan-out workers
+SESSION_SPILL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.sessions')
+METRICS_PORT = 9766  # Prometheus text at http://localhost:9766/metrics (fan-out workers use the ports after it)
 
-def calculate_distance(lat1, lon1, lat2, lon2):
-    """Calculate approximate distance between two points"""
-    return math.sqrt((lat2 - lat1)**2 + (lon2 - lon1)**2)
-
-def is_too_close(new_lat, new_lon, existing_sensors, min_dist):
-    """Check if new sensor is too close to existing ones"""
-    for sensor in existing_sensors:
-        if calculate_distance(new_lat, new_lon, sensor['lat'], sensor['lon']) < min_dist:
-            return True
-    return False
-
-for zone in forest_zones:
-    for i in range(zone['sensor_count']):
-        # Try to place sensor with minimum distance enforcement
-        attempts = 0
-        max_attempts = 50
-        
-        while attempts < max_attempts:
-            # Use polar coordinates for natural distribution
-            angle = random.uniform(0, 2 * math.pi)
-            # Use square root for more uniform distribution
-            distance = zone['radius'] * math.sqrt(random.uniform(0.2, 1.0))  # Start further from center
-            
-            lat = zone['center_lat'] + distance * math.cos(angle)
-            lon = zone['center_lon'] + distance * math.sin(angle)
-            
-            # Check if this position is far enough from existing sensors
-            if not is_too_close(lat, lon, FOREST_SENSORS, MIN_DISTANCE):
-                break
+# Process-wide metrics; values the server already tracks are registered as scrape-time callbacks in main()
+TICK_SECONDS = metrics.REGISTRY.histogram(
+    'phoenix_tick_seconds', 'Update loop work per tick: simulation step, encoding and queueing frames')
+STEP_SECONDS = metrics.REGISTRY.histogram(
+    'phoenix_simulation_step_seconds', 'Fire spread and snapshot publish per tick')
+ENCODE_SECONDS = metrics.REGISTRY.histogram(
+    'phoenix_encode_seconds', 'Time to encode one frame', labelnames=('kind', 'format'))
+FRAME_BYTES = metrics.REGISTRY.histogram(
+    'phoenix_frame_bytes', 'Encoded frame size', metrics.SIZE_BUCKETS, labelnames=('kind', 'format'))
+TICKS_SKIPPED = metrics.REGISTRY.counter(
+    'phoenix_ticks_skipped_total', 'Ticks skipped because the previous tick overran')
+FRAMES_SENT = metrics.REGISTRY.counter('phoenix_frames_sent_total', 'Frames written to client sockets')
+FRAMES_DROPPED = metrics.REGISTRY.counter(
+    'phoenix_frames_dropped_total', 'Queued frames superseded by a keyframe before a slow client got them')
+SLOW_DISCONNECTS = metrics.REGISTRY.counter(
+    'phoenix_slow_client_disconnects_total', 'Clients disconnected for lagging past CLIENT_LAG_LIMIT')
+
+def observe_frame(kind, binary, started, frame):
+    """Record the encode time (since started, a perf_counter value) and size of a frame"""
+    labels = (kind, 'binary' if binary else 'json')
+    ENCODE_SECONDS.observe(time.perf_counter() - started, labels)
+    FRAME_BYTES.observe(len(frame), labels)
+    return frame
+
+def build_forest_sensors(seed):
+    """Place sensors per forest zone with Poisson-disk sampling and give them readings"""
+    rng = random.Random(seed)
+    layout = poisson_disk_layout(forest_zones, MIN_DISTANCE, rng)
+    sensors = []
+    sensor_id = 1
+    for zone, positions in zip(forest_zones, layout):
+        for lat, lon in positions:
+            # Add elevation-based variation (higher elevation = cooler)
+            elevation_factor = rng.uniform(-1, 1)  # Simulated elevation difference
+            base_temp = 20 + elevation_factor * 3 + rng.uniform(-2, 2)
             
-            attempts += 1
-        
-        # If we couldn't find a good spot, use the last attempt anyway
-        if attempts >= max_attempts:
-            print(f"Warning: Sensor {sensor_id} may be close to others")
-        
-        # Add elevation-based variation (higher elevation = cooler)
-        elevation_factor = random.uniform(-1, 1)  # Simulated elevation difference
-        base_temp = 20 + elevation_factor * 3 + random.uniform(-2, 2)
-        
-        # Different battery levels based on accessibility
-        if zone['zone'] == 'ridgeline':
-            battery_range = (70, 90)  # Harder to maintain
-        elif zone['zone'] == 'valley':
-            battery_range = (85, 100)  # Easier access
+            # Different battery levels based on accessibility
+            if zone['zone'] == 'ridgeline':
+                battery_range = (70, 90)  # Harder to maintain
+            elif zone['zone'] == 'valley':
+                battery_range = (85, 100)  # Easier access
+            else:
+                battery_range = (75, 95)  # Normal access
+                
+            sensor = {
+                'id': f'ARDUINO_{sensor_id:03d}_{zone["zone"].upper()}',
+                'lat': lat,
+                'lon': lon,
+                'temperature': max(15, min(25, base_temp)),  # Keep realistic range
+                'battery': rng.randint(battery_range[0], battery_range[1]),
+                'status': 'normal',
+                'fire_detected': False,
+                'zone': zone['zone'],
+                'elevation': 1200 + elevation_factor * 200,  # Simulated elevation in meters
+            }
+            sensors.append(sensor)
+            sensor_id += 1
+    return sensors
+
+# Layout is cached next to this script and rebuilt whenever the seed, zones or spacing change
+FOREST_SENSORS = load_or_build_layout(
+    LAYOUT_CACHE,
+    {'seed': LAYOUT_SEED, 'zones': forest_zones, 'min_distance': MIN_DISTANCE},
+    lambda: build_forest_sensors(LAYOUT_SEED),
+)
+
+def pm25_from_temperature(temperature):
+    """Convert to PM2.5 equivalent for visualization"""
+    return np.maximum(0, (temperature - 20) * 2)
+
+class SensorLayout:
+    """Sensor placement and initial readings, shared by every simulation on the same sensors
+
+    Everything here is read-only once built: positions, ids, the proximity
+    index, each sensor's fire-raster cell and the quadtree structure. A
+    SimpleFireSystem on the layout copies only what it writes to (readings and
+    cluster aggregates), so hundreds of sessions cost one layout plus their
+    own state.
+    """
+
+    def __init__(self, sensors):
+        self.sensors = sensors
+        self.sensor_ids = [s['id'] for s in sensors]
+        self.lat = np.array([s['lat'] for s in sensors], dtype=float)
+        self.lon = np.array([s['lon'] for s in sensors], dtype=float)
+        self.ambient = 20 + (self.lat - 38.7891) * 10
+        self.temperature = np.array([s['temperature'] for s in sensors], dtype=float)
+        self.battery = np.array([s['battery'] for s in sensors], dtype=float)
+        self.status_code = np.array([STATUS_NAMES.index(s['status']) for s in sensors], dtype=np.uint8)
+        self.fire_detected = np.array([s['fire_detected'] for s in sensors], dtype=bool)
+        self.sensor_index = SensorGridIndex(sensors, INDEX_CELL_SIZE)
+        if len(sensors):
+            self.bounds = (self.lat.min(), self.lon.min(), self.lat.max(), self.lon.max())
         else:
-            battery_range = (75, 95)  # Normal access
-            
-        sensor = {
-            'id': f'ARDUINO_{sensor_id:03d}_{zone["zone"].upper()}',
-            'lat': lat,
-            'lon': lon,
-            'temperature': max(15, min(25, base_temp)),  # Keep realistic range
-            'battery': random.randint(battery_range[0], battery_range[1]),
-            'status': 'normal',
-            'fire_detected': False,
-            'zone': zone['zone'],
-            'elevation': 1200 + elevation_factor * 200,  # Simulated elevation in meters
-        }
-        FOREST_SENSORS.append(sensor)
-        sensor_id += 1
+            self.bounds = (0.0, 0.0, 0.0, 0.0)
+        self.sensor_cells = self.new_fire_raster().cell_of(self.lat, self.lon)
+
+        # Aggregates for the initial readings; each system forks its own copy
+        self.quadtree = SensorQuadtree(self.lat, self.lon, QUADTREE_DEPTH)
+        self.quadtree.refresh(self.temperature, self.fire_detected)
+        self.quadtree.take_changes()
+
+        # Identifies the layout in spilled session files
+        self.key = zlib.crc32('\n'.join(self.sensor_ids).encode('utf-8'))
+
+        shared = [self.lat, self.lon, self.ambient, self.temperature, self.battery, self.status_code,
+                  self.fire_detected, self.sensor_cells, self.quadtree.leaf, self.quadtree.order, self.quadtree.start]
+        shared += self.quadtree.count + self.quadtree.center_lat + self.quadtree.center_lon + self.quadtree.occupied
+        for array in shared:
+            array.flags.writeable = False
+
+    def new_fire_raster(self):
+        return FireInfluenceRaster(*self.bounds, FIRE_RASTER_CELL_SIZE, FIRE_START_RADIUS, FIRE_GROWTH_RATE)
 
 class SimpleFireSystem:
-    def __init__(self):
-        self.sensors = FOREST_SENSORS.copy()
+    def __init__(self, layout=None):
         self.active_fires = []  # List of fire locations
         self.clients = set()
+        self.state_version = 0  # Bumped on every change visible to clients
+        self.layout_version = 0  # Bumped when the sensor list itself changes
+        self.use_layout(layout or SensorLayout(FOREST_SENSORS.copy()))
+
+    def set_sensors(self, sensors):
+        """Replace the sensor network with a new layout of its own"""
+        self.use_layout(SensorLayout(sensors))
+
+    def use_layout(self, layout):
+        """Switch to a sensor layout and reload the state arrays from its initial readings
+
+        self.sensors keeps the static metadata (id, position, zone); live readings
+        live in the NumPy arrays below, indexed like self.sensors. Positions and
+        the proximity index are the layout's own (read-only) arrays.
+        """
+        self.layout = layout
+        self.sensors = layout.sensors
+        self.sensor_ids = layout.sensor_ids
+        self.lat = layout.lat
+        self.lon = layout.lon
+        self.ambient = layout.ambient
+        self.sensor_index = layout.sensor_index
+        self.sensor_cells = layout.sensor_cells
+        self.temperature = layout.temperature.copy()
+        self.battery = layout.battery.copy()
+        self.status_code = layout.status_code.copy()
+        self.fire_detected = layout.fire_detected.copy()
+        self.build_fire_raster()
+        self.dirty = np.zeros(len(self.sensors), dtype=bool)  # Readings changed since take_changes()
+        self.state_version += 1
+        self.layout_version += 1
+
+        # Packed float32/uint8 mirror of the readings for the binary wire format
+        self.columns = wire_format.SensorColumns(len(self.sensors))
+        self.sync_columns(np.arange(len(self.sensors)))
+        self.recount()
+
+        # Level-of-detail aggregates for zoomed-out viewports
+        self.quadtree = layout.quadtree.fork()
+        self.quadtree.refresh(self.temperature, self.fire_detected)
+
+        # Double-buffered copies of the readings for the broadcaster; see publish()
+        self.snapshots = [SensorSnapshot(self), SensorSnapshot(self)]
+        self.back_snapshot = 0
+
+    def recount(self):
+        """Recompute the summary counters, kept up to date as sensor states change"""
+        self.status_counts = np.bincount(self.status_code, minlength=len(STATUS_NAMES))
+        self.fire_detected_count = int(np.count_nonzero(self.fire_detected))
+        self.max_temperature = float(self.temperature.max()) if len(self.sensors) else 20.0
         
+    def build_fire_raster(self):
+        """Lay the fire-influence grid over the sensors and fold the active fires back in"""
+        self.fire_raster = self.layout.new_fire_raster()
+        fires, self.active_fires = self.active_fires, []
+        for fire in fires:
+            self.add_fire(fire)
+
+    def add_fire(self, fire):
+        """Fold a fire into the raster; returns False when it merged into an existing fire"""
+        fire_id, merged = self.fire_raster.add_fire(fire['lat'], fire['lon'], fire['intensity'], fire['start_time'])
+        if merged:
+            self.active_fires[fire_id]['intensity'] = float(self.fire_raster.fire_intensity[fire_id])
+        else:
+            self.active_fires.append(fire)
+        return not merged
+
     def start_fire(self, lat, lon, intensity=1.0):
-        """Start a fire at specific coordinates"""
+        """Start a fire at specific coordinates, merging it into any fire already in that raster cell"""
         fire = {
             'lat': lat,
             'lon': lon,
             'intensity': intensity,
-            'start_time': time.time(),
-            'radius': 0.001  # Start small, grows over time
+            'start_time': time.time(),  # Radius grows from FIRE_START_RADIUS, see FireInfluenceRaster
         }
-        self.active_fires.append(fire)
-        print(f"🔥 Fire started at {lat:.4f}, {lon:.4f}")
-        
+        self.state_version += 1
+        if self.add_fire(fire):
+            print(f"🔥 Fire started at {lat:.4f}, {lon:.4f}")
+        else:
+            print(f"🔥 Fire at {lat:.4f}, {lon:.4f} merged into an existing fire")
+
+    def clear_fires(self):
+        """Remove all fires and reset every sensor to ambient"""
+        self.active_fires = []
+        self.fire_raster.clear()
+        self.dirty |= (self.temperature != self.ambient) | (self.status_code != STATUS_NORMAL) | self.fire_detected
+        self.state_version += 1
+        self.temperature[:] = self.ambient
+        self.status_code[:] = STATUS_NORMAL
+        self.fire_detected[:] = False
+        self.recount()
+        self.sync_columns(np.arange(len(self.sensors)))
+        self.quadtree.refresh(self.temperature, self.fire_detected)
+
     def update_fire_spread(self):
-        """Update fire spread and sensor detection"""
-        current_time = time.time()
-        
-        for fire in self.active_fires:
-            # Fire grows over time
-            age = current_time - fire['start_time']
-            fire['radius'] = 0.001 + (age * 0.0005)  # Grows ~50m per minute
-            
-            # Check which sensors detect this fire
-            for sensor in self.sensors:
-                distance = self.calculate_distance(
-                    fire['lat'], fire['lon'],
-                    sensor['lat'], sensor['lon']
-                )
-                
-                if distance <= fire['radius']:
-                    # Sensor detects fire!
-                    sensor['temperature'] = min(200, 50 + (fire['intensity'] * 100))
-                    sensor['status'] = 'fire_detected'
-                    sensor['fire_detected'] = True
-                elif distance <= fire['radius'] * 2:
-                    # Sensor detects heat from nearby fire
-                    heat_factor = 1 - (distance / (fire['radius'] * 2))
-                    sensor['temperature'] = 20 + (heat_factor * 30)
-                    sensor['status'] = 'elevated_temp'
-                else:
-                    # Normal temperature
-                    if not sensor['fire_detected']:
-                        sensor['temperature'] = 20 + (sensor['lat'] - 38.7891) * 10
-                        sensor['status'] = 'normal'
+        """Update fire spread and sensor detection
+
+        Each sensor reads its cell of the fire raster, where overlapping fires
+        are already merged; detection wins over heat.
+        """
+        if not self.active_fires:
+            return
+        intensity, heat = self.fire_raster.sample(self.sensor_cells, self.lat, self.lon, time.time())
+
+        # Sensor detects fire!
+        detected = intensity >= 0
+        # Sensor detects heat from nearby fire
+        elevated = (heat >= 0) & ~detected
+        # Sensors that cooled off go back to normal
+        cooled = (self.status_code == STATUS_ELEVATED) & ~elevated & ~detected & ~self.fire_detected
+
+        changed = detected | elevated | cooled
+        if not changed.any():
+            return
+        old_status = self.status_code[changed]
+        old_temperature = self.temperature[changed]
+        old_fire_detected = self.fire_detected[changed]
+        self.fire_detected_count += int(np.count_nonzero(detected & ~self.fire_detected))
+
+        self.temperature[detected] = np.minimum(200, 50 + (intensity[detected] * 100))
+        self.status_code[detected] = STATUS_FIRE
+        self.fire_detected[detected] = True
+        self.temperature[elevated] = 20 + (heat[elevated] * 30)
+        self.status_code[elevated] = STATUS_ELEVATED
+        self.temperature[cooled] = self.ambient[cooled]
+        self.status_code[cooled] = STATUS_NORMAL
+
+        self.status_counts += (np.bincount(self.status_code[changed], minlength=len(STATUS_NAMES))
+                               - np.bincount(old_status, minlength=len(STATUS_NAMES)))
+        self.max_temperature = float(self.temperature.max())
+        modified = ((self.temperature[changed] != old_temperature)
+                    | (self.status_code[changed] != old_status)
+                    | (self.fire_detected[changed] != old_fire_detected))
+        if modified.any():
+            self.dirty[changed] |= modified
+            self.state_version += 1
+            rows = np.flatnonzero(changed)[modified]
+            self.sync_columns(rows)
+            self.quadtree.update(rows, self.temperature, self.fire_detected)
+
+    def sync_columns(self, rows):
+        """Mirror the readings of `rows` into the packed binary wire columns"""
+        temperature = self.temperature[rows]
+        self.columns.update(rows, self.lat[rows], self.lon[rows], temperature, pm25_from_temperature(temperature),
+                            self.battery[rows], self.status_code[rows], self.fire_detected[rows])
+
+    def sensors_in_box(self, min_lat, min_lon, max_lat, max_lon):
+        """Sorted indices of the sensors inside the box"""
+        candidates = self.sensor_index.query_box(min_lat, min_lon, max_lat, max_lon)
+        lat, lon = self.lat[candidates], self.lon[candidates]
+        inside = (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+        return np.sort(candidates[inside])
+
+    def take_changes(self):
+        """Indices of sensors whose readings changed since the last call, resetting the tracker"""
+        changed = np.flatnonzero(self.dirty)
+        self.dirty[:] = False
+        return changed
+
+    def take_cluster_changes(self):
+        """Per quadtree level, the clusters whose summaries changed since the last call"""
+        return self.quadtree.take_changes()
+
+    def publish(self):
+        """Copy the readings and pending changes into the back snapshot and return it
+
+        The two snapshots alternate, so the one returned by the previous call
+        (which the broadcaster may still be reading) is never overwritten. Only
+        one publish() may be in flight at a time.
+        """
+        snapshot = self.snapshots[self.back_snapshot]
+        snapshot.fill(self, self.take_changes(), self.take_cluster_changes())
+        self.back_snapshot = 1 - self.back_snapshot
+        return snapshot
+
+    def step(self):
+        """One simulation tick: spread the fires and publish the result"""
+        self.update_fire_spread()
+        return self.publish()
     
     def calculate_distance(self, lat1, lon1, lat2, lon2):
         """Calculate distance between two coordinates"""
         return math.sqrt((lat2 - lat1)**2 + (lon2 - lon1)**2)
     
-    def get_sensor_data(self):
-        """Get current sensor readings for frontend"""
-        sensor_data = []
-        for sensor in self.sensors:
-            # Convert to PM2.5 equivalent for visualization
-            pm25 = max(0, (sensor['temperature'] - 20) * 2)
-            
-            sensor_reading = {
-                'id': sensor['id'],
-                'lat': sensor['lat'],
-                'lon': sensor['lon'],
-                'temperature': sensor['temperature'],
-                'pm25': pm25,
-                'battery_level': sensor['battery'],
-                'status': sensor['status'],
-                'fire_detected': sensor['fire_detected'],
-                'timestamp': datetime.now().isoformat(),
-                'ts': int(time.time() * 1000)
-            }
-            sensor_data.append(sensor_reading)
-        
-        return sensor_data
-    
     def get_fire_summary(self):
         """Get summary of active fires and affected sensors"""
-        affected_sensors = [s for s in self.sensors if s['fire_detected']]
-        elevated_sensors = [s for s in self.sensors if s['status'] == 'elevated_temp']
-        
         return {
             'active_fires': len(self.active_fires),
-            'sensors_detecting_fire': len(affected_sensors),
-            'sensors_elevated_temp': len(elevated_sensors),
+            'sensors_detecting_fire': self.fire_detected_count,
+            'sensors_elevated_temp': int(self.status_counts[STATUS_ELEVATED]),
             'total_sensors': len(self.sensors),
-            'max_temperature': max([s['temperature'] for s in self.sensors]),
-            'affected_area_m2': len(affected_sensors) * 10000  # ~100m radius per sensor
+            'max_temperature': self.max_temperature,
+            'affected_area_m2': self.fire_detected_count * 10000  # ~100m radius per sensor
+        }
+
+    def memory_usage(self):
+        """Approximate bytes of state this system owns (not counting its shared layout)"""
+        arrays = [self.temperature, self.battery, self.status_code, self.fire_detected, self.dirty,
+                  self.columns.floats, self.columns.bytes, self.fire_raster.detect_time,
+                  self.fire_raster.detect_owner, self.fire_raster.heat_time, self.fire_raster.heat_owner]
+        for snapshot in self.snapshots:
+            arrays += [snapshot.temperature, snapshot.battery, snapshot.status_code, snapshot.fire_detected,
+                       snapshot.columns.floats, snapshot.columns.bytes]
+            arrays += snapshot.cluster_max_temperature + snapshot.cluster_fire_detected
+        return sum(array.nbytes for array in arrays) + self.quadtree.aggregate_nbytes()
+
+    def export_state(self):
+        """Readings and fires as arrays, for spilling an idle session to disk"""
+        return {
+            'layout_key': np.array(self.layout.key),
+            'temperature': self.temperature,
+            'battery': self.battery,
+            'status_code': self.status_code,
+            'fire_detected': self.fire_detected,
+            'active_fires': pack_json(self.active_fires),
+            'state_version': np.array(self.state_version),
+            'saved_at': np.array(time.time()),
+        }
+
+    def restore_state(self, state):
+        """Load readings and fires written by export_state(); False if they belong to another layout
+
+        Fire start times move forward by the time spent on disk, so a
+        rehydrated session carries on where it stopped instead of jumping ahead.
+        """
+        if int(state['layout_key']) != self.layout.key:
+            return False
+        paused = time.time() - float(state['saved_at'])
+        self.active_fires = unpack_json(state['active_fires'])
+        for fire in self.active_fires:
+            fire['start_time'] += paused
+        np.copyto(self.temperature, state['temperature'])
+        np.copyto(self.battery, state['battery'])
+        np.copyto(self.status_code, state['status_code'])
+        np.copyto(self.fire_detected, state['fire_detected'])
+        self.state_version = int(state['state_version']) + 1
+        self.build_fire_raster()
+        self.sync_columns(np.arange(len(self.sensors)))
+        self.recount()
+        self.quadtree.refresh(self.temperature, self.fire_detected)
+        self.quadtree.take_changes()
+        return True
+
+class SensorSnapshot:
+    """Frozen copy of one tick's readings, which the broadcaster encodes from
+
+    The simulation mutates SimpleFireSystem on its worker thread while the
+    event loop encodes frames from the last published snapshot. Positions, ids
+    and the quadtree layout never change for a given layout_version, so they
+    are shared instead of copied.
+    """
+
+    def __init__(self, fire_system):
+        count = len(fire_system.sensor_ids)
+        self.sensor_ids = fire_system.sensor_ids
+        self.lat = fire_system.lat
+        self.lon = fire_system.lon
+        self.quadtree = fire_system.quadtree
+        self.layout_version = fire_system.layout_version
+        self.temperature = np.empty(count)
+        self.battery = np.empty(count)
+        self.status_code = np.empty(count, dtype=np.uint8)
+        self.fire_detected = np.empty(count, dtype=bool)
+        self.columns = wire_format.SensorColumns(count)
+        self.cluster_max_temperature = [np.empty_like(a) for a in fire_system.quadtree.max_temperature]
+        self.cluster_fire_detected = [np.empty_like(a) for a in fire_system.quadtree.fire_detected]
+        self.state_version = None
+        self.fire_summary = None
+        self.changed = np.empty(0, dtype=np.int64)
+        self.cluster_changes = [np.empty(0, dtype=np.int64)] * len(self.cluster_max_temperature)
+        self.delta_frames = {}
+        self.keyframes = {}
+
+    def fill(self, fire_system, changed, cluster_changes):
+        """Overwrite this snapshot with the system's current readings"""
+        np.copyto(self.temperature, fire_system.temperature)
+        np.copyto(self.battery, fire_system.battery)
+        np.copyto(self.status_code, fire_system.status_code)
+        np.copyto(self.fire_detected, fire_system.fire_detected)
+        np.copyto(self.columns.floats, fire_system.columns.floats)
+        np.copyto(self.columns.bytes, fire_system.columns.bytes)
+        for target, source in zip(self.cluster_max_temperature, fire_system.quadtree.max_temperature):
+            np.copyto(target, source)
+        for target, source in zip(self.cluster_fire_detected, fire_system.quadtree.fire_detected):
+            np.copyto(target, source)
+        self.state_version = fire_system.state_version
+        self.fire_summary = fire_system.get_fire_summary()
+        self.changed = changed
+        self.cluster_changes = cluster_changes
+        self.delta_frames = {}  # binary flag -> pre-encoded full-network sensor_delta
+        self.keyframes = {}  # binary flag -> (keyframe_version, pre-encoded full-network sensor_batch)
+
+    def get_sensor_data(self, indices=None):
+        """Get current sensor readings for frontend (all sensors, or only `indices`)"""
+        if indices is None:
+            indices = np.arange(len(self.sensor_ids))
+        timestamp = datetime.now().isoformat()
+        ts = int(time.time() * 1000)
+        temperature = self.temperature[indices]
+        pm25 = pm25_from_temperature(temperature).tolist()
+        temperature = temperature.tolist()
+        battery = self.battery[indices].tolist()
+        status = [STATUS_NAMES[code] for code in self.status_code[indices].tolist()]
+        fire_detected = self.fire_detected[indices].tolist()
+        lat = self.lat[indices].tolist()
+        lon = self.lon[indices].tolist()
+
+        return [
+            {
+                'id': self.sensor_ids[index],
+                'lat': lat[k],
+                'lon': lon[k],
+                'temperature': temperature[k],
+                'pm25': pm25[k],
+                'battery_level': battery[k],
+                'status': status[k],
+                'fire_detected': fire_detected[k],
+                'timestamp': timestamp,
+                'ts': ts
+            }
+            for k, index in enumerate(indices.tolist())
+        ]
+    
+    def get_cluster_columns(self, level, nodes):
+        """Cluster summary arrays (aligned with nodes) for quadtree nodes at level"""
+        tree = self.quadtree
+        max_temperature = self.cluster_max_temperature[level][nodes]
+        return {
+            'count': tree.count[level][nodes],
+            'fire_detected': self.cluster_fire_detected[level][nodes],
+            'lat': tree.center_lat[level][nodes],
+            'lon': tree.center_lon[level][nodes],
+            'max_temperature': max_temperature,
+            'max_pm25': pm25_from_temperature(max_temperature),
+        }
+
+    def get_cluster_data(self, level, nodes):
+        """Cluster summaries for frontend"""
+        columns = {name: values.tolist() for name, values in self.get_cluster_columns(level, nodes).items()}
+        return [
+            {
+                'id': f"{level}/{node}",
+                'lat': columns['lat'][k],
+                'lon': columns['lon'][k],
+                'count': columns['count'][k],
+                'max_temperature': columns['max_temperature'][k],
+                'max_pm25': columns['max_pm25'][k],
+                'fire_detected': columns['fire_detected'][k],
+            }
+            for k, node in enumerate(nodes.tolist())
+        ]
+
+class SensorViewport:
+    """A client's subscribed bounding box and the sensor rows (or clusters) inside it
+
+    Below CLUSTER_MAX_ZOOM the viewport holds quadtree nodes at the level
+    matching its zoom instead of sensor rows.
+    """
+
+    def __init__(self, bbox, zoom):
+        self.bbox = bbox  # (min_lat, min_lon, max_lat, max_lon)
+        self.zoom = zoom
+        self.level = None  # Quadtree level when showing clusters, None for raw sensors
+        self.rows = None  # Sorted sensor rows, or quadtree nodes at self.level
+        self.layout_version = None
+        self.keyframe_cache = {}  # 'json' | 'binary' -> (keyframe_version, encoded viewport sensor_batch)
+
+    def select(self, fire_system):
+        """Sorted rows (or nodes) inside the box, re-queried only when the sensor layout changed"""
+        if self.layout_version != fire_system.layout_version:
+            if self.zoom is not None and self.zoom < CLUSTER_MAX_ZOOM:
+                self.level = fire_system.quadtree.level_for_zoom(self.zoom, CLUSTER_PIXELS)
+                self.rows = fire_system.quadtree.nodes_in_box(self.level, *self.bbox)
+            else:
+                self.level = None
+                self.rows = fire_system.sensors_in_box(*self.bbox)
+            self.layout_version = fire_system.layout_version
+        return self.rows
+
+    def visible(self, changed, cluster_changes, fire_system):
+        """The subset of changed rows (or changed clusters at our level) inside the box"""
+        rows = self.select(fire_system)
+        if self.level is not None:
+            changed = cluster_changes[self.level]
+        if not len(rows) or not len(changed):
+            return changed[:0]
+        position = np.minimum(np.searchsorted(rows, changed), len(rows) - 1)
+        return changed[rows[position] == changed]
+
+    def describe(self):
+        count = len(self.rows) if self.rows is not None else 0
+        return {
+            'bbox': list(self.bbox),
+            'zoom': self.zoom,
+            'level': self.level,
+            'sensor_count': count if self.level is None else 0,
+            'cluster_count': count if self.level is not None else 0,
+        }
+
+class ClientChannel:
+    """Bounded outbound queue and writer task for one client
+
+    Holds at most one control frame queue (sent first, never dropped), the
+    newest pending keyframe and up to MAX_PENDING_DELTAS deltas. A new keyframe
+    supersedes everything queued before it; overflowing deltas are dropped and
+    replaced by a keyframe encoded from the current state when the writer gets
+    to it. websocket.send() only returns once the transport has drained, so a
+    slow link stalls its own writer instead of growing server buffers.
+    """
+
+    def __init__(self, websocket, binary, keyframe_source):
+        self.websocket = websocket
+        self.binary = binary
+        self.keyframe_source = keyframe_source  # () -> current encoded keyframe for this format and view
+        self.view = None  # SensorViewport, or None for the whole network
+        self.control = deque()  # (enqueued_at, frame)
+        self.keyframe = None    # (enqueued_at, frame) | None
+        self.deltas = deque()   # (enqueued_at, frame)
+        self.resync_since = None  # Set when overflowing deltas were dropped for a fresh keyframe
+        self.sending_since = None
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.lag_reported = False
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self.writer())
+
+    def push_control(self, frame):
+        self.control.append((time.monotonic(), frame))
+        self.wakeup.set()
+
+    def push_keyframe(self, frame):
+        now = time.monotonic()
+        enqueued_at = min(t for t in (now, self.resync_since, self.keyframe and self.keyframe[0]) if t)
+        dropped = len(self.deltas) + (1 if self.keyframe else 0)
+        self.frames_dropped += dropped
+        FRAMES_DROPPED.inc(dropped)
+        self.deltas.clear()
+        self.keyframe = (enqueued_at, frame)
+        self.resync_since = None
+        self.wakeup.set()
+
+    def push_delta(self, frame):
+        if len(self.deltas) >= MAX_PENDING_DELTAS:
+            self.frames_dropped += len(self.deltas) + 1
+            FRAMES_DROPPED.inc(len(self.deltas) + 1)
+            self.resync_since = self.deltas[0][0]
+            self.deltas.clear()
+            self.keyframe = None
+        elif self.resync_since is None:
+            self.deltas.append((time.monotonic(), frame))
+        else:
+            self.frames_dropped += 1  # The pending resync keyframe will include it
+            FRAMES_DROPPED.inc()
+        self.wakeup.set()
+
+    def pending(self):
+        return len(self.control) + len(self.deltas) + (1 if self.keyframe or self.resync_since else 0)
+
+    def lag(self):
+        """Seconds since the oldest frame this client has not yet received was queued"""
+        oldest = [t for t in (self.sending_since, self.resync_since) if t]
+        oldest += [queue[0][0] for queue in (self.control, self.deltas) if queue]
+        if self.keyframe:
+            oldest.append(self.keyframe[0])
+        return time.monotonic() - min(oldest) if oldest else 0.0
+
+    def next_frame(self):
+        if self.control:
+            return self.control.popleft()[1]
+        if self.resync_since is not None:
+            self.resync_since = None
+            return self.keyframe_source()
+        if self.keyframe:
+            frame = self.keyframe[1]
+            self.keyframe = None
+            return frame
+        if self.deltas:
+            return self.deltas.popleft()[1]
+        return None
+
+    async def writer(self):
+        try:
+            while True:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                while True:
+                    frame = self.next_frame()
+                    if frame is None:
+                        break
+                    self.sending_since = time.monotonic()
+                    await self.websocket.send(frame, text=not self.binary)
+                    self.sending_since = None
+                    self.frames_sent += 1
+                    FRAMES_SENT.inc()
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    def stats(self):
+        remote = self.websocket.remote_address
+        return {
+            'client': f"{remote[0]}:{remote[1]}" if remote else 'unknown',
+            'format': 'binary' if self.binary else 'json',
+            'viewport': self.view.describe() if self.view else None,
+            'lag_seconds': round(self.lag(), 3),
+            'pending_frames': self.pending(),
+            'frames_sent': self.frames_sent,
+            'frames_dropped': self.frames_dropped,
         }
 
 class SimpleFireWebSocket:
-    def __init__(self):
-        self.fire_system = SimpleFireSystem()
-        self.clients = set()
+    def __init__(self, fire_system=None, executor=None, name=DEFAULT_SESSION):
+        self.name = name  # Session name, see SessionManager
+        self.fire_system = fire_system or SimpleFireSystem()
+        self.clients = {}  # websocket -> ClientChannel
+        self.tick = 0  # Update loop iterations; keyframes go out when tick % KEYFRAME_INTERVAL == 0
+        self.last_summary = None
+        self.keyframe_cache = {}  # 'json' | 'binary' -> (keyframe_version, encoded sensor_batch)
+        self.dictionary_cache = None  # (layout_version, encoded binary sensor-id dictionary)
+        self.scheduler = TickScheduler(TICK_INTERVAL_IDLE)
+        # All simulation work (ticks and commands) runs in order on this one thread,
+        # keeping the event loop free for pings, commands and new connections
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='fire-sim')
+        self.snapshot = self.fire_system.publish()  # Latest published SensorSnapshot
+        self.fanout = None  # FanoutHub feeding worker processes, when running with --workers
+
+    def uses_binary(self, websocket):
+        """Clients opt into the packed-array format through the WebSocket subprotocol"""
+        return websocket.subprotocol == wire_format.SUBPROTOCOL
+
+    def group_clients(self, channels):
+        """Group channels by format and viewport so each distinct frame is encoded once"""
+        groups = {}
+        for channel in channels:
+            key = (channel.binary, channel.view.bbox, channel.view.zoom) if channel.view else (channel.binary,)
+            groups.setdefault(key, []).append(channel)
+        return groups.values()
         
     async def register_client(self, websocket):
-        self.clients.add(websocket)
-        print(f"📱 Client connected. Total: {len(self.clients)}")
+        binary = self.uses_binary(websocket)
+        channel = ClientChannel(websocket, binary, lambda: self.encode_keyframe(binary, channel.view))
+        self.clients[websocket] = channel
+        print(f"📱 Client connected to session '{self.name}'. Total: {len(self.clients)}")
+
+        if binary:
+            # Binary rows are positional: the id dictionary goes out once, before any frame
+            channel.push_control(self.encode_dictionary())
         
         # Send initial sensor data
-        await self.send_sensor_data([websocket])
+        await self.send_sensor_data([channel])
         
     async def unregister_client(self, websocket):
-        self.clients.discard(websocket)
-        print(f"📱 Client disconnected. Total: {len(self.clients)}")
+        channel = self.clients.pop(websocket, None)
+        if channel:
+            channel.task.cancel()
+        print(f"📱 Client disconnected from session '{self.name}'. Total: {len(self.clients)}")
+
+    def check_client_lag(self):
+        """Report clients falling behind and disconnect those past CLIENT_LAG_LIMIT"""
+        for websocket, channel in list(self.clients.items()):
+            lag = channel.lag()
+            if lag > CLIENT_LAG_LIMIT:
+                print(f"🐢 Disconnecting client {channel.stats()['client']}: {lag:.1f}s behind")
+                channel.task.cancel()
+                del self.clients[websocket]
+                SLOW_DISCONNECTS.inc()
+                asyncio.create_task(websocket.close(code=1013, reason='client too slow'))
+            elif lag > CLIENT_LAG_WARN and not channel.lag_reported:
+                print(f"🐢 Client {channel.stats()['client']} lagging: {lag:.1f}s behind, "
+                      f"{channel.pending()} frames pending, {channel.frames_dropped} coalesced")
+                channel.lag_reported = True
+            elif lag <= CLIENT_LAG_WARN:
+                channel.lag_reported = False
+
+    def get_client_stats(self):
+        """Per-client lag, queue depth and frame counters"""
+        return [channel.stats() for channel in self.clients.values()]
     
     async def handle_message(self, websocket, message):
         """Handle commands from frontend"""
@@ -215,43 +797,589 @@ class SimpleFireWebSocket:
                 lat = data.get('lat', 38.7900)
                 lon = data.get('lon', -120.4240)
                 intensity = data.get('intensity', 1.0)
-                self.fire_system.start_fire(lat, lon, intensity)
+                await self.simulate(self.fire_system.start_fire, lat, lon, intensity)
+                self.scheduler.wake()  # Show the new fire now, not at the next heartbeat
                 
             elif data['type'] == 'clear_fires':
-                self.fire_system.active_fires = []
-                # Reset all sensors
-                for sensor in self.fire_system.sensors:
-                    sensor['fire_detected'] = False
-                    sensor['status'] = 'normal'
-                    sensor['temperature'] = 20 + (sensor['lat'] - 38.7891) * 10
+                await self.simulate(self.fire_system.clear_fires)
+                self.scheduler.wake()
+
+            elif data['type'] == 'subscribe':
+                await self.subscribe(websocket, data.get('bbox'), data.get('zoom'))
+
+            elif data['type'] == 'unsubscribe':
+                await self.subscribe(websocket, None, None)
                 
         except json.JSONDecodeError:
             print(f"❌ Invalid message: {message}")
-    
-    async def send_sensor_data(self, target_clients=None):
-        """Send current sensor data to clients"""
-        clients = target_clients or self.clients
-        if not clients:
+
+    async def subscribe(self, websocket, bbox, zoom):
+        """Restrict a client to the sensors inside bbox ([min_lat, min_lon, max_lat, max_lon]);
+        below CLUSTER_MAX_ZOOM it gets cluster summaries instead. None subscribes it to
+        the whole network again. The client gets a fresh keyframe."""
+        channel = self.clients.get(websocket)
+        if channel is None:
             return
-            
-        sensor_data = self.fire_system.get_sensor_data()
-        fire_summary = self.fire_system.get_fire_summary()
-        
+        if bbox is None:
+            channel.view = None
+        else:
+            try:
+                lat_a, lon_a, lat_b, lon_b = (float(value) for value in bbox)
+                zoom = float(zoom) if zoom is not None else None
+            except (TypeError, ValueError):
+                print(f"❌ Invalid subscribe bbox/zoom: {bbox}, {zoom}")
+                return
+            box = (min(lat_a, lat_b), min(lon_a, lon_b), max(lat_a, lat_b), max(lon_a, lon_b))
+            channel.view = SensorViewport(box, zoom)
+            channel.view.select(self.fire_system)
+        await self.send_sensor_data([channel])
+
+    async def simulate(self, function, *args):
+        """Run simulation work on the simulation thread"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    def simulate_tick(self, formats):
+        """Simulation thread: advance one tick and pre-encode the full-network frames it will broadcast
+
+        formats holds the `binary` flag of every client format that gets
+        full-network frames; viewport frames are small and encoded on the loop.
+        """
+        started = time.perf_counter()
+        snapshot = self.fire_system.step()
+        STEP_SECONDS.observe(time.perf_counter() - started)
+        for binary in formats:
+            if self.tick % KEYFRAME_INTERVAL == 0:
+                # Handed back with the snapshot; only the event loop touches keyframe_cache
+                snapshot.keyframes[binary] = (self.keyframe_version(snapshot),
+                                              self.build_keyframe(binary, None, snapshot))
+            else:
+                snapshot.delta_frames[binary] = self.encode_delta(binary, snapshot.changed, snapshot)
+        return snapshot
+
+    def encode_dictionary(self):
+        """Binary sensor-id dictionary, rebuilt only when the sensor list changes"""
+        version = self.snapshot.layout_version
+        if self.dictionary_cache is None or self.dictionary_cache[0] != version:
+            started = time.perf_counter()
+            frame = wire_format.encode_dictionary(self.snapshot.sensor_ids, self.tick, int(time.time() * 1000))
+            observe_frame('dictionary', True, started, frame)
+            self.dictionary_cache = (version, frame)
+        return self.dictionary_cache[1]
+
+    def keyframe_version(self, snapshot):
+        """Cache key of a keyframe: the state it shows and the keyframe interval it was built in
+
+        Keyframes carry their build time (timestamp, per-sensor ts), so even an
+        unchanged state is re-encoded once per KEYFRAME_INTERVAL; otherwise a
+        quiet network would keep serving readings the client ages out.
+        """
+        return (snapshot.state_version, self.tick // KEYFRAME_INTERVAL)
+
+    def encode_keyframe(self, binary=False, view=None, snapshot=None):
+        """Encoded sensor_batch for a snapshot (the latest by default), rebuilt when its keyframe_version changes
+
+        With a view only the sensors inside it are included (or, zoomed out, a
+        sensor_clusters frame); those frames are cached on the view itself.
+        """
+        snapshot = snapshot or self.snapshot
+        fmt = 'binary' if binary else 'json'
+        cache = self.keyframe_cache if view is None else view.keyframe_cache
+        version = self.keyframe_version(snapshot)
+        cached = cache.get(fmt)
+        if cached is None or cached[0] != version:
+            cached = cache[fmt] = (version, self.build_keyframe(binary, view, snapshot))
+        return cached[1]
+
+    def build_keyframe(self, binary, view, snapshot):
+        """Encode a sensor_batch (or zoomed-out sensor_clusters) keyframe; no caching, safe off the loop"""
+        fire_summary = snapshot.fire_summary
+        rows = view.select(self.fire_system) if view else None
+        started = time.perf_counter()
+        if view and view.level is not None:
+            return self.encode_clusters(binary, view, rows, fire_summary, partial=False)
+        if binary:
+            return observe_frame('keyframe', binary, started, wire_format.encode_keyframe(
+                snapshot.columns, fire_summary, self.tick, int(time.time() * 1000), rows))
         message = {
             'type': 'sensor_batch',
-            'sensors': sensor_data,
+            'seq': self.tick,
+            'sensors': snapshot.get_sensor_data(rows),
             'fire_summary': fire_summary,
             'timestamp': datetime.now().isoformat()
         }
-        
-        websockets.broadcast(clients, json.dumps(message))
+        if view:
+            message['viewport'] = view.describe()
+        return observe_frame('keyframe', binary, started, encode_message(message))
+
+    def encode_clusters(self, binary, view, nodes, fire_summary, partial):
+        """sensor_clusters frame for quadtree nodes at the view's level"""
+        started = time.perf_counter()
+        if binary:
+            return observe_frame('clusters', binary, started, wire_format.encode_clusters(
+                view.level, nodes, self.snapshot.get_cluster_columns(view.level, nodes),
+                fire_summary, self.tick, int(time.time() * 1000), partial))
+        return observe_frame('clusters', binary, started, encode_message({
+            'type': 'sensor_clusters',
+            'seq': self.tick,
+            'level': view.level,
+            'keyframe': not partial,
+            'clusters': self.snapshot.get_cluster_data(view.level, nodes),
+            'fire_summary': fire_summary,
+            'viewport': view.describe(),
+            'timestamp': datetime.now().isoformat()
+        }))
+
+    async def send_sensor_data(self, target_clients=None):
+        """Queue a full sensor_batch keyframe for clients (all clients by default)"""
+        channels = target_clients or list(self.clients.values())
+        if not channels:
+            return
+
+        for group in self.group_clients(channels):
+            frame = self.encode_keyframe(group[0].binary, group[0].view)
+            for channel in group:
+                channel.push_keyframe(frame)
+
+    def encode_delta(self, binary, rows, snapshot=None):
+        """Encoded sensor_delta holding `rows` of a snapshot (the latest by default)"""
+        snapshot = snapshot or self.snapshot
+        started = time.perf_counter()
+        if binary:
+            return observe_frame('delta', binary, started, wire_format.encode_delta(
+                snapshot.columns, rows, snapshot.fire_summary, self.tick, int(time.time() * 1000)))
+        return observe_frame('delta', binary, started, encode_message({
+            'type': 'sensor_delta',
+            'seq': self.tick,
+            'sensors': snapshot.get_sensor_data(rows),
+            'fire_summary': snapshot.fire_summary,
+            'timestamp': datetime.now().isoformat()
+        }))
+
+    async def send_sensor_delta(self, changed, cluster_changes):
+        """Send only the sensors whose readings changed this tick
+
+        Quiet ticks (no changed sensors, same summary) send nothing at all.
+        Subscribed clients only get the changed sensors inside their viewport,
+        or the changed clusters when zoomed out.
+        """
+        fire_summary = self.snapshot.fire_summary
+        if not len(changed) and fire_summary == self.last_summary:
+            return
+        self.last_summary = fire_summary
+        if not self.clients:
+            return
+
+        for group in self.group_clients(self.clients.values()):
+            binary, view = group[0].binary, group[0].view
+            if view is None:
+                # Usually pre-encoded on the simulation thread
+                frame = self.snapshot.delta_frames.get(binary) or self.encode_delta(binary, changed)
+            elif view.level is not None:
+                nodes = view.visible(changed, cluster_changes, self.fire_system)
+                frame = self.encode_clusters(binary, view, nodes, fire_summary, partial=True)
+            else:
+                frame = self.encode_delta(binary, view.visible(changed, cluster_changes, self.fire_system))
+            for channel in group:
+                channel.push_delta(frame)
+
+    async def broadcast_tick(self):
+        """Keyframe every KEYFRAME_INTERVAL ticks, deltas of changed sensors otherwise"""
+        snapshot = self.snapshot
+        if self.tick % KEYFRAME_INTERVAL == 0:
+            self.last_summary = snapshot.fire_summary
+            await self.send_sensor_data()
+        else:
+            await self.send_sensor_delta(snapshot.changed, snapshot.cluster_changes)
+        self.check_client_lag()
+        self.tick += 1
     
+    def full_network_formats(self):
+        """Formats (binary flags) of the clients receiving the whole network, here or in fan-out workers"""
+        formats = {channel.binary for channel in self.clients.values() if channel.view is None}
+        if self.fanout is not None:
+            formats |= self.fanout.formats_for(self.name)
+        return formats
+
     async def update_loop(self):
-        """Main update loop"""
+        """Main update loop: fast ticks while fires burn, slow heartbeat otherwise
+
+        The tick itself runs on the simulation thread; the loop only swaps in
+        the published snapshot and fans frames out from it.
+        """
         while True:
-            self.fire_system.update_fire_spread()
-            await self.send_sensor_data()
-            await asyncio.sleep(2)  # Update every 2 seconds
+            self.scheduler.begin_tick()
+            self.snapshot = await self.simulate(self.simulate_tick, self.full_network_formats())
+            for binary, cached in self.snapshot.keyframes.items():
+                self.keyframe_cache['binary' if binary else 'json'] = cached
+            if self.fanout is not None:
+                self.fanout.publish(self)
+            await self.broadcast_tick()
+            self.scheduler.end_tick()
+            TICK_SECONDS.observe(self.scheduler.last_work)
+            active = self.snapshot.fire_summary['active_fires']
+            self.scheduler.set_interval(TICK_INTERVAL_ACTIVE if active else TICK_INTERVAL_IDLE)
+            skipped = self.scheduler.skipped
+            await self.scheduler.sleep_until_next()
+            if self.scheduler.skipped != skipped:
+                TICKS_SKIPPED.inc(self.scheduler.skipped - skipped)
+
+class SessionManager:
+    """Isolated, named simulations (one per training team) sharing one sensor layout
+
+    Sessions start on first use and are kept in least-recently-used order.
+    Sessions without clients are spilled to disk, least recently used first,
+    while the resident ones hold more than memory_limit bytes of state, and
+    after idle_timeout seconds regardless; the next client to join a spilled
+    session rehydrates it. Every session's simulation work shares one worker
+    thread, so ticks and commands of different sessions never run concurrently.
+    """
+
+    def __init__(self, layout, spill_dir, memory_limit=SESSION_MEMORY_LIMIT, idle_timeout=SESSION_IDLE_TIMEOUT):
+        self.layout = layout
+        self.memory_limit = memory_limit
+        self.idle_timeout = idle_timeout
+        self.sessions = OrderedDict()  # name -> SimpleFireWebSocket, least recently used first
+        self.loops = {}  # name -> update loop task
+        self.members = {}  # name -> connections currently using the session
+        self.last_used = {}  # name -> monotonic time of the last join or leave
+        self.writer = CheckpointWriter(spill_dir)
+        self.spilled = {name[:-len('.npz')] for name in os.listdir(spill_dir) if name.endswith('.npz')}
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='fire-sim')
+        self.lock = asyncio.Lock()  # Serializes loading and spilling
+        self.fanout = None  # FanoutHub given to every session, when running with --workers
+
+    async def acquire(self, name):
+        """Join session `name`, rehydrating or creating it; pair with release()"""
+        async with self.lock:
+            session = self.sessions.get(name)
+            if session is None:
+                session = self.load(name)
+                self.sessions[name] = session
+                self.loops[name] = asyncio.create_task(session.update_loop())
+            self.sessions.move_to_end(name)
+            self.members[name] = self.members.get(name, 0) + 1
+            self.last_used[name] = time.monotonic()
+            await self.evict()
+        return session
+
+    def release(self, name):
+        self.members[name] -= 1
+        self.last_used[name] = time.monotonic()
+
+    def load(self, name):
+        """New session on the shared layout, restored from its spill file if it has one"""
+        fire_system = SimpleFireSystem(self.layout)
+        tick = 0
+        if name in self.spilled:
+            self.spilled.discard(name)
+            path = os.path.join(self.writer.directory, f"{name}.npz")
+            try:
+                with np.load(path) as f:
+                    state = {key: f[key] for key in f.files}
+                os.remove(path)
+            except (OSError, ValueError, EOFError, zipfile.BadZipFile) as e:
+                print(f"⚠️ Session '{name}' spill file is missing or unreadable ({e}); starting fresh")
+            else:
+                if fire_system.restore_state(state):
+                    tick = int(state['tick'])
+                    print(f"♻️ Session '{name}' rehydrated from disk ({len(fire_system.active_fires)} active fires)")
+                else:
+                    print(f"⚠️ Session '{name}' was spilled for a different sensor layout; starting fresh")
+        else:
+            print(f"🆕 Session '{name}' created")
+        session = SimpleFireWebSocket(fire_system, self.executor, name)
+        session.tick = tick
+        session.fanout = self.fanout
+        return session
+
+    async def spill(self, name):
+        """Write an idle session to disk and drop it from memory; False if the write failed
+
+        A session whose write fails stays resident with its update loop restarted.
+        """
+        session = self.sessions.pop(name)
+        self.loops.pop(name).cancel()
+        # Queued behind any tick still running for it on the simulation thread
+        state = await session.simulate(session.fire_system.export_state)
+        state['tick'] = np.array(session.tick)
+        self.writer.submit(f"{name}.npz", state)
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.writer.flush)
+        except Exception as e:
+            self.sessions[name] = session
+            self.loops[name] = asyncio.create_task(session.update_loop())
+            self.last_used[name] = time.monotonic()  # Retry after another idle period
+            print(f"❌ Session '{name}' could not be spilled ({e}); keeping it in memory")
+            return False
+        self.spilled.add(name)
+        del self.members[name], self.last_used[name]
+        print(f"💾 Session '{name}' spilled to disk ({len(self.sessions)} resident, {len(self.spilled)} on disk)")
+        return True
+
+    async def evict(self):
+        """Spill idle sessions, least recently used first, past the memory limit or idle timeout"""
+        now = time.monotonic()
+        usage = self.memory_usage()
+        for name, session in list(self.sessions.items()):
+            if self.members[name]:
+                continue
+            if usage > self.memory_limit or now - self.last_used[name] > self.idle_timeout:
+                if await self.spill(name):
+                    usage -= session.fire_system.memory_usage()
+
+    def memory_usage(self):
+        """Bytes of per-session state held by resident sessions"""
+        return sum(session.fire_system.memory_usage() for session in self.sessions.values())
+
+    def stats(self):
+        return {
+            'resident_sessions': len(self.sessions),
+            'spilled_sessions': len(self.spilled),
+            'memory_bytes': self.memory_usage(),
+            'memory_limit_bytes': self.memory_limit,
+            'clients': {name: len(session.clients) for name, session in self.sessions.items()},
+        }
+
+    def register_metrics(self):
+        metrics.REGISTRY.gauge('phoenix_sessions', 'Sessions in memory and spilled to disk', ('state',),
+                               lambda: {('resident',): len(self.sessions), ('spilled',): len(self.spilled)})
+        metrics.REGISTRY.gauge('phoenix_session_state_bytes', 'Bytes of state held by resident sessions',
+                               function=self.memory_usage)
+
+    async def maintain(self):
+        """Periodically spill sessions that went idle"""
+        while True:
+            await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+            async with self.lock:
+                await self.evict()
+
+class FanoutHub:
+    """Simulation-process end of the fan-out: feeds session updates to the worker processes
+
+    Workers join a session once per client. The first join sends the worker
+    the session's full readings; after that every tick sends the rows that
+    changed plus the full-network frames, encoded once here and shared by all
+    workers. Each worker reports which formats its full-network clients use.
+    """
+
+    def __init__(self, sessions):
+        self.sessions = sessions  # SessionManager
+        self.workers = {}  # StreamWriter -> {session name: clients joined through that worker}
+        self.formats = {}  # (StreamWriter, session name) -> binary flags of its full-network clients
+
+    async def serve_worker(self, reader, writer):
+        """Handle one worker connection (asyncio.start_unix_server callback)"""
+        joined = self.workers[writer] = {}
+        print(f"🧵 Fan-out worker connected. Total: {len(self.workers)}")
+        try:
+            while True:
+                header, _ = await fanout_channel.read_message(reader)
+                name = header['session']
+                if header['type'] == 'join':
+                    session = await self.sessions.acquire(name)
+                    joined[name] = joined.get(name, 0) + 1
+                    if joined[name] == 1:
+                        self.send_update(writer, 'state', session, session.snapshot,
+                                         np.arange(len(session.snapshot.sensor_ids)), {})
+                elif header['type'] == 'leave':
+                    self.sessions.release(name)
+                    joined[name] -= 1
+                    if not joined[name]:
+                        del joined[name]
+                        self.formats.pop((writer, name), None)
+                elif header['type'] == 'formats':
+                    self.formats[(writer, name)] = set(header['formats'])
+                elif header['type'] == 'command':
+                    session = self.sessions.sessions.get(name)
+                    if session is not None:
+                        await session.handle_message(None, json.dumps(header['command']))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for name, count in joined.items():
+                for _ in range(count):
+                    self.sessions.release(name)
+                self.formats.pop((writer, name), None)
+            del self.workers[writer]
+            writer.close()
+            print(f"🧵 Fan-out worker disconnected. Total: {len(self.workers)}")
+
+    def formats_for(self, name):
+        formats = set()
+        for (writer, session_name), binaries in self.formats.items():
+            if session_name == name:
+                formats |= binaries
+        return formats
+
+    def send_update(self, writer, kind, session, snapshot, rows, frames):
+        """Write a 'state' or 'tick' message; frames maps binary flag -> encoded frame"""
+        fanout_channel.write_message(writer, *self.encode_update(kind, session, snapshot, rows, frames))
+
+    def encode_update(self, kind, session, snapshot, rows, frames):
+        specs, blobs = fanout_channel.pack_arrays({
+            'rows': rows,
+            'temperature': snapshot.temperature[rows],
+            'battery': snapshot.battery[rows],
+            'status_code': snapshot.status_code[rows],
+            'fire_detected': snapshot.fire_detected[rows],
+        })
+        header = {
+            'type': kind,
+            'session': session.name,
+            'tick': session.tick,
+            'keyframe': session.tick % KEYFRAME_INTERVAL == 0,
+            'state_version': snapshot.state_version,
+            'fire_summary': snapshot.fire_summary,
+            'layout_key': session.fire_system.layout.key,
+            'arrays': specs,
+            'frames': list(frames),
+        }
+        return header, blobs + list(frames.values())
+
+    def publish(self, session):
+        """Send this tick's changed rows and full-network frames to every worker in the session"""
+        writers = [writer for writer, joined in self.workers.items() if session.name in joined]
+        if not writers:
+            return
+        snapshot = session.snapshot
+        frames = {}
+        for binary in self.formats_for(session.name):
+            if session.tick % KEYFRAME_INTERVAL == 0:
+                frames[binary] = session.encode_keyframe(binary)  # Built by simulate_tick, cached by update_loop
+            else:
+                frames[binary] = snapshot.delta_frames.get(binary) or session.encode_delta(binary, snapshot.changed)
+        header, blobs = self.encode_update('tick', session, snapshot, snapshot.changed, frames)
+        for writer in writers:
+            fanout_channel.write_message(writer, header, blobs)
+
+class ReplicaFireSystem(SimpleFireSystem):
+    """A fan-out worker's copy of one session's readings, updated from the simulation process"""
+
+    def __init__(self, layout):
+        self.fire_summary = None
+        super().__init__(layout)
+
+    def apply(self, state_version, fire_summary, rows, temperature, battery, status_code, fire_detected):
+        """Overwrite `rows` with readings sent by the simulation process"""
+        self.temperature[rows] = temperature
+        self.battery[rows] = battery
+        self.status_code[rows] = status_code
+        self.fire_detected[rows] = fire_detected
+        self.dirty[rows] = True
+        self.sync_columns(rows)
+        self.quadtree.update(rows, self.temperature, self.fire_detected)
+        self.state_version = state_version
+        self.fire_summary = fire_summary
+
+    def get_fire_summary(self):
+        return self.fire_summary or super().get_fire_summary()
+
+class ReplicaFireWebSocket(SimpleFireWebSocket):
+    """Client-facing half of a session inside a fan-out worker
+
+    Full-network frames arrive pre-encoded from the simulation process;
+    viewport and cluster frames are encoded here from the replicated readings.
+    Fire commands are forwarded to the simulation process.
+    """
+
+    def __init__(self, layout, worker, name):
+        super().__init__(ReplicaFireSystem(layout), worker.executor, name)
+        self.worker = worker
+        self.ready = asyncio.Event()  # Set once the session's full readings have arrived
+        self.reported_formats = set()
+
+    async def handle_message(self, websocket, message):
+        try:
+            data = json.loads(message)
+        except json.JSONDecodeError:
+            print(f"❌ Invalid message: {message}")
+            return
+        if data.get('type') in ('start_fire', 'clear_fires'):
+            self.worker.send({'type': 'command', 'session': self.name, 'command': data})
+        else:
+            await super().handle_message(websocket, message)
+
+    def apply(self, header, blobs):
+        """Load a 'state' or 'tick' message into the replica and publish it"""
+        specs = header['arrays']
+        arrays = fanout_channel.unpack_arrays(specs, blobs)
+        self.fire_system.apply(header['state_version'], header['fire_summary'], arrays['rows'],
+                               arrays['temperature'], arrays['battery'], arrays['status_code'], arrays['fire_detected'])
+        self.snapshot = self.fire_system.publish()
+        self.tick = header['tick']
+        return dict(zip(header['frames'], blobs[len(specs):]))
+
+    async def receive_tick(self, header, blobs):
+        frames = self.apply(header, blobs)
+        if header['keyframe']:
+            for binary, frame in frames.items():
+                self.keyframe_cache['binary' if binary else 'json'] = (self.keyframe_version(self.snapshot), frame)
+        else:
+            self.snapshot.delta_frames = frames
+        await self.broadcast_tick()
+
+        formats = self.full_network_formats()
+        if formats != self.reported_formats:
+            self.worker.send({'type': 'formats', 'session': self.name, 'formats': sorted(formats)})
+            self.reported_formats = formats
+
+class FanoutWorker:
+    """One fan-out worker process: owns client connections, fed by the simulation process"""
+
+    def __init__(self, layout, reader, writer):
+        self.layout = layout
+        self.reader = reader
+        self.writer = writer
+        self.sessions = {}  # name -> ReplicaFireWebSocket
+        self.members = {}  # name -> clients of this worker in the session
+        # One thread shared by every replica session, like SessionManager's
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='fire-replica')
+
+    def send(self, header):
+        fanout_channel.write_message(self.writer, header)
+
+    async def acquire(self, name):
+        """Join session `name` for one client, waiting for its readings; pair with release()"""
+        session = self.sessions.get(name)
+        if session is None:
+            session = self.sessions[name] = ReplicaFireWebSocket(self.layout, self, name)
+        self.members[name] = self.members.get(name, 0) + 1
+        self.send({'type': 'join', 'session': name})
+        await session.ready.wait()
+        return session
+
+    def release(self, name):
+        self.send({'type': 'leave', 'session': name})
+        self.members[name] -= 1
+        if not self.members[name]:
+            del self.members[name], self.sessions[name]
+
+    async def receive(self):
+        """Apply updates from the simulation process until it goes away"""
+        while True:
+            header, blobs = await fanout_channel.read_message(self.reader)
+            session = self.sessions.get(header['session'])
+            if session is None:
+                continue  # Left before this update arrived
+            if header['type'] == 'state':
+                if header['layout_key'] != self.layout.key:
+                    raise RuntimeError("Fan-out worker and simulation process loaded different sensor layouts")
+                session.apply(header, blobs)
+                session.ready.set()
+            elif header['type'] == 'tick' and session.ready.is_set():
+                await session.receive_tick(header, blobs)
+
+def session_name(websocket):
+    """Session requested in the connection URL (ws://host:8766/?session=team-a), None if invalid"""
+    query = urllib.parse.urlsplit(websocket.request.path).query
+    name = urllib.parse.parse_qs(query).get('session', [DEFAULT_SESSION])[0]
+    return name if SESSION_NAME_PATTERN.fullmatch(name) else None
+
+def select_subprotocol(connection, subprotocols):
+    """Accept the binary subprotocol when offered; clients offering nothing stay on JSON"""
+    if wire_format.SUBPROTOCOL in subprotocols:
+        return wire_format.SUBPROTOCOL
+    return None
 
 async def handle_client(websocket):
     server = websocket.server_instance
@@ -265,7 +1393,54 @@ async def handle_client(websocket):
     finally:
         await server.unregister_client(websocket)
 
-async def main():
+def register_client_metrics(sessions):
+    """Scrape-time client gauges; sessions() returns the live {name: SimpleFireWebSocket}"""
+    def channels():
+        return [channel for session in sessions().values() for channel in session.clients.values()]
+    metrics.REGISTRY.gauge('phoenix_clients', 'Connected clients per session', ('session',),
+                           lambda: {(name,): len(session.clients) for name, session in sessions().items()})
+    metrics.REGISTRY.gauge('phoenix_client_queue_depth', 'Frames queued for all clients together',
+                           function=lambda: sum(channel.pending() for channel in channels()))
+    metrics.REGISTRY.gauge('phoenix_client_queue_depth_max', 'Most frames queued for a single client',
+                           function=lambda: max((channel.pending() for channel in channels()), default=0))
+    metrics.REGISTRY.gauge('phoenix_client_lag_seconds_max', 'Seconds the furthest-behind client is lagging',
+                           function=lambda: max((channel.lag() for channel in channels()), default=0.0))
+
+def websocket_handler(sessions):
+    """Connection handler joining each client to the session named in its URL
+
+    sessions is the SessionManager, or a FanoutWorker in a worker process.
+    """
+    async def handler(websocket):
+        name = session_name(websocket)
+        if name is None:
+            await websocket.close(code=1008, reason='invalid session name')
+            return
+        websocket.server_instance = await sessions.acquire(name)
+        try:
+            await handle_client(websocket)
+        finally:
+            sessions.release(name)
+    return handler
+
+async def fanout_worker_main(socket_path, index):
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    worker = FanoutWorker(SensorLayout(FOREST_SENSORS), reader, writer)
+    register_client_metrics(lambda: worker.sessions)
+    await metrics.serve_metrics("localhost", METRICS_PORT + 1 + index)
+    # Every worker listens on the same port; the kernel spreads new connections across them
+    async with websockets.serve(websocket_handler(worker), "localhost", 8766,
+                                select_subprotocol=select_subprotocol, reuse_port=True):
+        try:
+            await worker.receive()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            print(f"🧵 Simulation process gone, fan-out worker {os.getpid()} exiting")
+
+def run_fanout_worker(socket_path, index):
+    """Entry point of a fan-out worker process"""
+    asyncio.run(fanout_worker_main(socket_path, index))
+
+async def main(workers=0):
     print("🚀 Starting Simple Arduino Fire Detection System")
     print(f"🌲 {len(FOREST_SENSORS)} Arduino sensors spread across Angeles National Forest")
     print("🌲 Zones: Angeles Forest (N), San Gabriel Mtns (NE), Altadena Foothills (S), La Cañada Canyon (W), Pasadena Watershed (SE)")
@@ -273,22 +1448,44 @@ async def main():
     print("🔥 Click on map to start fires and watch sensors detect them!")
     print("🌐 WebSocket server: ws://localhost:8766")
     
-    server_instance = SimpleFireWebSocket()
-    
-    async def websocket_handler(websocket):
-        websocket.server_instance = server_instance
-        await handle_client(websocket)
+    # Every session simulates the same sensors; only readings and fires are per session
+    sessions = SessionManager(SensorLayout(FOREST_SENSORS), SESSION_SPILL_DIR)
+    sessions.register_metrics()
+    register_client_metrics(lambda: sessions.sessions)
+    await metrics.serve_metrics("localhost", METRICS_PORT)
+    print(f"📈 Metrics: http://localhost:{METRICS_PORT}/metrics")
     
-    # Start WebSocket server
-    start_server = websockets.serve(websocket_handler, "localhost", 8766)
-    websocket_server = await start_server
+    if workers:
+        # This process only simulates and encodes; worker processes own the client connections
+        sessions.fanout = FanoutHub(sessions)
+        if os.path.exists(FANOUT_SOCKET):
+            os.remove(FANOUT_SOCKET)
+        await asyncio.start_unix_server(sessions.fanout.serve_worker, FANOUT_SOCKET)
+        context = multiprocessing.get_context('spawn')
+        for index in range(workers):
+            context.Process(target=run_fanout_worker, args=(FANOUT_SOCKET, index),
+                            name=f'fanout-{index}', daemon=True).start()
+        print(f"🧵 {workers} fan-out worker processes sharing port 8766, "
+              f"metrics on ports {METRICS_PORT + 1}-{METRICS_PORT + workers}")
+    else:
+        # Start WebSocket server
+        # JSON stays the default; clients asking for the binary subprotocol get packed arrays
+        await websockets.serve(websocket_handler(sessions), "localhost", 8766,
+                               select_subprotocol=select_subprotocol)
     
     print("✅ Arduino Fire Detection System online!")
     print("📡 25 sensors monitoring forest temperature")
     print("🎮 Frontend: Click map to start fires")
     
-    # Start update loop
-    await server_instance.update_loop()
+    print(f"👥 Sessions: ws://localhost:8766/?session=<name> (default '{DEFAULT_SESSION}'), "
+          f"idle ones spilled to {SESSION_SPILL_DIR}")
+    
+    # Session update loops start on first connection; this only spills idle ones
+    await sessions.maintain()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Simple Arduino Fire Detection System")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="fan-out worker processes accepting clients (default 0: serve clients from this process)")
+    args = parser.parse_args()
+    asyncio.run(main(args.workers))